@@ -0,0 +1,160 @@
+# src/benchmark/storage_benchmark.py
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import aiofiles
+import aiosqlite
+
+from storage.csv_storage import CSVStorage
+from storage.sqlite_storage import SQLiteStorage
+
+
+def make_pages(n: int) -> list[dict]:
+    """Синтетические страницы, похожие по размеру на реальные записи краулера"""
+    return [
+        {
+            "url": f"https://example.com/page/{i}",
+            "title": f"Page {i}",
+            "text": "lorem ipsum dolor sit amet " * 40,
+            "links": [f"https://example.com/page/{i + j}" for j in range(1, 21)],
+            "metadata": {"description": f"Description {i}", "keywords": "a, b, c"},
+            "crawled_at": datetime.utcnow(),
+            "status_code": 200,
+            "content_type": "text/html",
+        }
+        for i in range(n)
+    ]
+
+
+# =========================
+# Старый путь записи: execute на каждую строку, журнал по умолчанию
+# =========================
+async def legacy_write(db_path: str, pages: list[dict], batch_size: int):
+    conn = await aiosqlite.connect(db_path)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY, title TEXT, text TEXT, links TEXT, metadata TEXT,
+            crawled_at TEXT, status_code INTEGER, content_type TEXT
+        )
+    """)
+    for start in range(0, len(pages), batch_size):
+        async with conn.execute("BEGIN"):
+            for d in pages[start:start + batch_size]:
+                await conn.execute(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        d["url"], d["title"], d["text"],
+                        json.dumps(d["links"], ensure_ascii=False),
+                        json.dumps(d["metadata"], ensure_ascii=False),
+                        d["crawled_at"].isoformat(), d["status_code"], d["content_type"],
+                    ),
+                )
+        await conn.commit()
+    await conn.close()
+
+
+async def storage_write(db_path: str, pages: list[dict], batch_size: int, **kwargs):
+    storage = SQLiteStorage(db_path, batch_size=batch_size, **kwargs)
+    await storage.init_db()
+    for page in pages:
+        await storage.save(page)
+    await storage.close()
+
+
+# =========================
+# Старый CSV: новый DictWriter + StringIO на каждый flush, вложенные поля — repr
+# =========================
+class LegacyCSVStorage:
+    def __init__(self, path: str, batch_size: int):
+        self.path = path
+        self.batch_size = batch_size
+        self._file = None
+        self._fieldnames = None
+        self._headers_written = False
+        self._buffer = []
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        if not self._file:
+            self._file = await aiofiles.open(self.path, "a", encoding="utf-8", newline="")
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=self._fieldnames, quoting=csv.QUOTE_MINIMAL)
+        if not self._headers_written:
+            writer.writeheader()
+            self._headers_written = True
+        for row in self._buffer:
+            writer.writerow(row)
+        await self._file.write(output.getvalue())
+        self._buffer = []
+
+    async def save(self, data: dict):
+        if not self._fieldnames:
+            self._fieldnames = list(data.keys())
+        self._buffer.append(data)
+        if len(self._buffer) >= self.batch_size:
+            await self._flush()
+
+    async def close(self):
+        await self._flush()
+        if self._file:
+            await self._file.close()
+
+
+async def legacy_csv_write(path: str, pages: list[dict], batch_size: int):
+    storage = LegacyCSVStorage(path, batch_size)
+    for page in pages:
+        await storage.save(page)
+    await storage.close()
+
+
+async def csv_write(path: str, pages: list[dict], batch_size: int, **kwargs):
+    storage = CSVStorage(path, batch_size=batch_size, **kwargs)
+    for page in pages:
+        await storage.save(page)
+    await storage.close()
+
+
+async def run_case(name: str, write, pages: list[dict], batch_size: int, **kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        t0 = time.perf_counter()
+        await write(db_path, pages, batch_size, **kwargs)
+        elapsed = time.perf_counter() - t0
+    rate = len(pages) / elapsed
+    print(f"{name:<28} | {elapsed:>9.2f} | {rate:>12,.0f}")
+    return rate
+
+
+async def run_benchmark(n: int, batch_size: int, backend: str = "all"):
+    pages = make_pages(n)
+    print(f"{'Mode':<28} | {'Time (s)':>9} | {'Rows/s':>12}")
+    print("-" * 56)
+    if backend in ("sqlite", "all"):
+        base = await run_case("legacy (execute per row)", legacy_write, pages, batch_size)
+        fast = await run_case("executemany + WAL", storage_write, pages, batch_size)
+        thread = await run_case("writer thread", storage_write, pages, batch_size, writer_thread=True)
+        print("-" * 56)
+        print(f"speedup: executemany x{fast / base:.1f}, writer thread x{thread / base:.1f}")
+    if backend in ("csv", "all"):
+        base = await run_case("csv legacy (DictWriter)", legacy_csv_write, pages, batch_size)
+        fast = await run_case("csv (flatten=json)", csv_write, pages, batch_size)
+        dotted = await run_case("csv (flatten=dotted)", csv_write, pages, batch_size, flatten="dotted")
+        print("-" * 56)
+        print(f"speedup: csv x{fast / base:.1f}, csv dotted x{dotted / base:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLiteStorage / CSVStorage write benchmark")
+    parser.add_argument("--pages", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--backend", choices=("sqlite", "csv", "all"), default="all")
+    args = parser.parse_args()
+    asyncio.run(run_benchmark(args.pages, args.batch_size, args.backend))
@@ -4,10 +4,14 @@ import asyncio
 import logging
 import time
 import re
+from collections import defaultdict, deque
+from contextlib import aclosing
 import random
 from urllib.parse import urljoin, urldefrag, urlparse
 import async_timeout
-from datetime import datetime
+from aiohttp.abc import AbstractResolver
+from multidict import CIMultiDict
+from datetime import datetime, timezone
 
 from crawler.parser import HTMLParser
 from crawler.logger import setup_crawler_logger
@@ -15,14 +19,29 @@ from crawler.semaphore_manager import SemaphoreManager
 from crawler.queue import CrawlerQueue
 from crawler.rate_limiter import RateLimiter
 from crawler.robots_parser import RobotsParser
+from crawler.sitemap_parser import SitemapParser
 from crawler.retry_strategy import RetryStrategy
+from crawler.retry_queue import RetryQueue, RetryBudget
 from crawler.errors import (
     TransientError,
     PermanentError,
     NetworkError,
     ParseError,
+    RetryLater,
+    RobotsUnavailable,
+    CircuitOpenError,
+    ContentSkipped,
 )
-from crawler.circuit_breaker import CircuitBreaker
+from crawler.circuit_breaker import CircuitBreaker, OPEN, CLOSED
+from crawler.fetch_result import FetchResult, HTML_CONTENT_TYPES, SNIFF_CONTENT_TYPES, looks_like_html
+from crawler.http_cache import HTTPCache, content_hash
+from crawler.encoding import resolve_charset
+from crawler.compression import accept_encoding, make_decoder
+from crawler.dns_resolver import CachingResolver
+from crawler.redirects import RedirectCache
+from crawler.transport import Transport, LiveTransport
+from crawler.url_utils import canonicalize_url
+from crawler.storage_writer import StorageWriter
 from storage.base import DataStorage
 from utils.stats import CrawlerStats
 from crawler.stats_exporter import CrawlerStatsExporter
@@ -47,7 +66,27 @@ class AsyncCrawler:
             connect_timeout=5,
             read_timeout=10,
             total_timeout=15,
-            storage: DataStorage | None = None
+            storage: DataStorage | None = None,
+            retry_budget_ratio: float = 0.2,
+            min_retry_budget: int = 10,
+            breaker_max_errors: int = 5,
+            breaker_reset_timeout: float = 30.0,
+            breaker_probes: int = 1,
+            breaker_max_reopens: int = 3,
+            use_sitemaps: bool = False,
+            http_cache: HTTPCache | None = None,
+            max_body_size: int = 5 * 1024 * 1024,
+            allowed_content_types: tuple[str, ...] = HTML_CONTENT_TYPES,
+            chunk_size: int = 64 * 1024,
+            resolver: AbstractResolver | None = None,
+            dns_ttl: float = 300.0,
+            dns_negative_ttl: float = 30.0,
+            dns_concurrency: int = 50,
+            transport: Transport | None = None,
+            storage_queue_size: int = 1000,
+            storage_batch_size: int = 100,
+            storage_flush_interval: float = 1.0,
+            robots_retries: int = 3
     ):
         self.max_concurrent = max_concurrent
         self.max_depth = max_depth
@@ -84,11 +123,50 @@ class AsyncCrawler:
         )
 
         self.storage = storage
+        # в crawl() запись идёт через фоновый писатель: воркер только кладёт запись в очередь
+        self.storage_writer = StorageWriter(
+            storage,
+            queue_size=storage_queue_size,
+            batch_size=storage_batch_size,
+            flush_interval=storage_flush_interval,
+        ) if storage else None
+
+        # --- Тело ответа: читаем потоково, не больше max_body_size ---
+        self.max_body_size = max_body_size
+        self.allowed_content_types = tuple(allowed_content_types)
+        self.chunk_size = chunk_size
+        self.accept_encoding = accept_encoding()
+
+        # --- DNS: свой кэш с TTL + prefetch хостов из frontier ---
+        self.dns_resolver = CachingResolver(
+            resolver,
+            ttl=dns_ttl,
+            negative_ttl=dns_negative_ttl,
+            max_concurrency=dns_concurrency,
+        )
+
+        # --- Транспорт HTTP: по умолчанию live; Record/Replay — для офлайн-прогонов ---
+        self.transport = transport or LiveTransport()
+
+        # --- Редиректы: страница хранится под финальным URL ---
+        self.redirects = RedirectCache()
+
+        # --- Conditional GET: ETag / Last-Modified из прошлых обходов ---
+        self.http_cache = http_cache
+        # 304 без записи в кэше: следующий запрос URL — без условных заголовков
+        self._unconditional: set[str] = set()
 
         # --- Robots.txt ---
-        self.robots_parser = RobotsParser()
+        self.robots_parser = RobotsParser(user_agent=user_agent, transport=self.transport)
         self.respect_robots = respect_robots
         self.user_agent = user_agent
+        # сколько раз откладывать URL, пока robots.txt хоста недоступен (5xx / 429 / сеть)
+        self.robots_retries = robots_retries
+
+        # --- Sitemaps: URL из sitemap идут в frontier как стартовые ---
+        self.use_sitemaps = use_sitemaps
+        self.sitemap_parser = SitemapParser(transport=self.transport)
+        self.sitemap_lastmod: dict[str, str] = {}
 
         # --- Allowed domains ---
         self.allowed_domains = allowed_domains
@@ -117,6 +195,10 @@ class AsyncCrawler:
             on_retry=_on_retry,
         )
 
+        # --- Отложенные повторы: воркер не спит backoff, URL уходит в heap ---
+        self.retry_queue = RetryQueue()
+        self.retry_budget = RetryBudget(ratio=retry_budget_ratio, min_retries=min_retry_budget)
+
         # # stats
         # self.stats = {
         #     "errors": {},  # количество ошибок по типам, например: {"TransientError": 3}
@@ -133,27 +215,90 @@ class AsyncCrawler:
 
         # for CircuitBreaker
         self.circuit_breaker = CircuitBreaker(
-            max_errors=5,
+            max_errors=breaker_max_errors,
             window=60.0,
-            reset_timeout=30.0
+            reset_timeout=breaker_reset_timeout,
+            half_open_max_probes=breaker_probes,
+            on_state_change=self._on_breaker_state,
         )
-
-    # async def _do_request(self, url: str) -> str:
-    async def _do_request(self, url: str, **kwargs) -> str:
+        self.breaker_max_reopens = breaker_max_reopens
+
+        # URL заблокированных доменов ждут здесь закрытия breaker
+        self._parked: dict[str, deque] = defaultdict(deque)
+        self._probe_scheduled: dict[str, str] = {}  # домен → URL пробы в RetryQueue
+
+    # --- Circuit breaker: парковка URL ---
+    def _park(self, domain: str, url: str, depth: int, attempts: dict):
+        """Откладываем URL открытого домена в его очередь ожидания"""
+        self._parked[domain].append((url, depth, attempts))
+        self.stats.incr("parked_urls")
+        # если проба уже в полёте — её исход сам отпустит или перепланирует очередь
+        if self.circuit_breaker.probes_in_flight(domain) == 0:
+            self._schedule_probe(domain)
+
+    def _schedule_probe(self, domain: str):
+        """Отдаём один припаркованный URL в RetryQueue как пробу к концу блокировки"""
+        parked = self._parked.get(domain)
+        if not parked or domain in self._probe_scheduled:
+            return
+        url, depth, attempts = parked.popleft()
+        self._probe_scheduled[domain] = url
+        self.retry_queue.schedule(url, depth, attempts, self.circuit_breaker.get_remaining_block(domain))
+
+    def _probe_finished(self, domain: str, url: str):
+        """
+        Проба вернулась из RetryQueue и прошла fetch — снимаем отметку при любом
+        исходе: robots.txt, ранний выход, повторная парковка. Если breaker уже
+        не назначил новую пробу и запрос-проба не в полёте, планируем следующую.
+        """
+        if self._probe_scheduled.get(domain) != url:
+            return
+        del self._probe_scheduled[domain]
+        if self.circuit_breaker.probes_in_flight(domain) == 0:
+            self._schedule_probe(domain)
+
+    def _drop_parked(self, domain: str, reason: str):
+        """Припаркованные URL домена — в failed_urls с причиной"""
+        parked = self._parked.pop(domain, deque())
+        for url, _, _ in parked:
+            self.failed_urls[url] = reason
+        self.stats.incr("parked_dropped", len(parked))
+
+    def _on_breaker_state(self, domain: str, state: str):
+        logger.warning(f"⚡ Circuit breaker for {domain}: {state}")
+        if state == OPEN:
+            self._probe_scheduled.pop(domain, None)
+            if self.circuit_breaker.consecutive_opens[domain] > self.breaker_max_reopens:
+                # домен так и не поднялся — отпускаем припаркованные URL как ошибки
+                self._drop_parked(domain, "Blocked by circuit breaker")
+                return
+            self._schedule_probe(domain)
+        elif state == CLOSED:
+            parked = self._parked.pop(domain, deque())
+            for url, depth, attempts in parked:
+                self.retry_queue.schedule(url, depth, attempts, 0)
+            self.stats.incr("parked_released", len(parked))
+
+    async def _do_request(self, url: str, extra_headers: dict | None = None, **kwargs) -> FetchResult:
         """
         Выполняет HTTP GET с обработкой transient/permanent ошибок.
         Устойчиво к разрывам соединения и проблемам с текстом.
+        extra_headers — например If-None-Match / If-Modified-Since; на них сервер может ответить 304.
         """
         if not self.session:
             raise RuntimeError("Session is not initialized. Use 'async with AsyncCrawler()'")
 
-        headers = {"User-Agent": self.user_agent}
+        headers = {"User-Agent": self.user_agent, "Accept-Encoding": self.accept_encoding}
+        if extra_headers:
+            headers.update(extra_headers)
         start_req = time.time()
         timeout = self.total_timeout
+        keep_raw = bool(self.storage and self.storage.wants_raw)
 
         try:
             async with async_timeout.timeout(timeout):
-                async with self.session.get(url, headers=headers) as response:
+                # транспорт: live / запись в архив / воспроизведение из архива
+                async with self.transport.request(url, headers) as response:
                     # --- классификация по статусу ---
                     if response.status in (429, 503):
                         raise TransientError(f"HTTP {response.status}", status=response.status)
@@ -164,16 +309,99 @@ class AsyncCrawler:
 
                     response.raise_for_status()
 
-                    # --- безопасное чтение тела ---
+                    if response.status == 304:
+                        self.request_times.append(time.time() - start_req)
+                        logger.info(f"♻️ Not modified: {url}")
+                        return FetchResult(
+                            url=url,
+                            status=304,
+                            headers=CIMultiDict(response.headers),
+                            not_modified=True,
+                            final_url=str(response.url),
+                            history=tuple(str(r.url) for r in response.history),
+                            raw_body=b"" if keep_raw else None,
+                            request_headers=headers,
+                        )
+
+                    # --- не-HTML отбрасываем до загрузки тела ---
+                    content_type = response.headers.get("Content-Type", "").split(";", 1)[0].strip().lower()
+                    sniff = content_type in SNIFF_CONTENT_TYPES
+                    if not sniff and content_type not in self.allowed_content_types:
+                        self.stats.incr("skipped_content_type")
+                        raise ContentSkipped("content_type", content_type, status=response.status)
+
+                    try:
+                        decoder = make_decoder(response.headers.get("Content-Encoding"))
+                    except ValueError as e:
+                        raise PermanentError(str(e), status=response.status) from e
+
+                    # --- потоковое чтение и распаковка тела с ограничением размера ---
+                    # лимит считается по распакованным байтам: защита и от «zip-бомб» —
+                    # декодер не разворачивает больше, чем осталось до лимита (+1 байт — признак обрезки)
+                    truncated = False
+                    wire = 0
+                    chunks = []
+                    raw_chunks = [] if keep_raw else None
+                    size = 0
                     try:
-                        content = await response.read()  # читаем как bytes
-                        text = content.decode("utf-8", errors="replace")  # безопасное декодирование
+                        async for raw in response.content.iter_chunked(self.chunk_size):
+                            wire += len(raw)
+                            if keep_raw:
+                                raw_chunks.append(raw)
+                            pending = raw
+                            while pending and not truncated:
+                                chunk = decoder.decompress(pending, self.max_body_size - size + 1)
+                                pending = decoder.unconsumed_tail
+                                if not chunk:
+                                    continue
+                                if sniff and not chunks:
+                                    if not looks_like_html(chunk):
+                                        self.stats.incr("skipped_sniffed")
+                                        raise ContentSkipped("sniffed", content_type, status=response.status)
+                                if size + len(chunk) > self.max_body_size:
+                                    chunks.append(chunk[:self.max_body_size - size])
+                                    size = self.max_body_size
+                                    truncated = True
+                                else:
+                                    chunks.append(chunk)
+                                    size += len(chunk)
+                            if truncated:
+                                break
+                        if not truncated:
+                            tail = decoder.flush()
+                            chunks.append(tail[:self.max_body_size - size])
+                            truncated = len(tail) > self.max_body_size - size
+                        content = b"".join(chunks)
+                    except ContentSkipped:
+                        raise
                     except Exception as e:
                         raise TransientError(f"Failed to read/parse response: {e}") from e
+                    finally:
+                        self.stats.record_transfer(url, wire_bytes=wire, decoded_bytes=sum(len(c) for c in chunks))
+
+                    # тело не декодируем: парсер получает байты и кодировку
+                    encoding, source = resolve_charset(response.headers.get("Content-Type"), content)
+                    self.stats.incr(f"charset_{source}")
+
+                    if truncated:
+                        # остаток не дочитываем: соединение закроется при выходе из контекста
+                        self.stats.incr("body_truncated")
+                        logger.warning(f"✂️ Body truncated at {self.max_body_size} bytes: {url}")
 
                     self.request_times.append(time.time() - start_req)
                     logger.info(f"✅ Success {response.status}: {url}")
-                    return text
+                    return FetchResult(
+                        url=url,
+                        status=response.status,
+                        headers=CIMultiDict(response.headers),
+                        body=content,
+                        encoding=encoding,
+                        truncated=truncated,
+                        final_url=str(response.url),
+                        history=tuple(str(r.url) for r in response.history),
+                        raw_body=b"".join(raw_chunks) if keep_raw else None,
+                        request_headers=headers,
+                    )
 
         except PermanentError:
             # фиксируем PermanentError, чтобы не превращать в TransientError
@@ -196,8 +424,17 @@ class AsyncCrawler:
             connect=self.connect_timeout,
             sock_read=self.read_timeout
         )
-        connector = aiohttp.TCPConnector(limit=100, limit_per_host=10, keepalive_timeout=30)
+        connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=10,
+            keepalive_timeout=30,
+            resolver=self.dns_resolver,
+            use_dns_cache=False,  # кэширует CachingResolver
+        )
         self.session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        self.robots_parser.session = self.session
+        self.transport.bind(self.session)
+        self.sitemap_parser.session = self.session
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
@@ -222,27 +459,60 @@ class AsyncCrawler:
         return True
 
     # --- Fetch one page ---
-    async def fetch_url(self, url: str) -> str:
+    async def fetch_url(self, url: str, attempts: dict | None = None) -> str:
+        """Загружает страницу и возвращает её текст ("" при ошибке)"""
+        result = await self.fetch(url, attempts=attempts)
+        if result and result.raw_body is not None:
+            await self._save_raw(result)
+        return result.text if result else ""
+
+    async def fetch(
+        self,
+        url: str,
+        attempts: dict | None = None,
+        extra_headers: dict | None = None,
+        first_attempt: bool = True,
+    ) -> FetchResult | None:
+        """
+        Загружает страницу; None — если запрос заблокирован или провалился.
+        attempts=None — все повторы внутри вызова (execute_with_retry).
+        attempts=dict — одна попытка; при повторяемой ошибке бросается RetryLater,
+        и воркер откладывает URL в RetryQueue, не удерживая слот семафора.
+        first_attempt=False — повтор из RetryQueue или отпущенный с парковки URL:
+        бюджет повторов он не пополняет.
+        """
         domain = urlparse(url).netloc
 
-        # --- Circuit breaker ---
-        if self.circuit_breaker.is_blocked(domain):
-            remaining = self.circuit_breaker.get_remaining_block(domain)
-            logger.warning(f"🚫 Domain {domain} is temporarily blocked ({remaining:.1f}s remaining)")
-            self.failed_urls[url] = f"Blocked by circuit breaker ({remaining:.1f}s)"
-            return ""
-
         # --- robots.txt + rate limiter ---
         crawl_delay = 0
         if self.respect_robots:
-            await self.robots_parser.fetch_robots(domain)
-            allowed = await self.robots_parser.can_fetch(url, self.user_agent)
+            try:
+                allowed = await self.robots_parser.can_fetch(url, self.user_agent)
+                crawl_delay = await self.robots_parser.get_crawl_delay(url, self.user_agent) or 0
+            except RobotsUnavailable as e:
+                # правила неизвестны — это не запрет: URL откладывается до повторной загрузки robots.txt
+                delay = self._robots_retry_delay(url, attempts, e)
+                if delay is None:
+                    return None
+                raise RetryLater(str(e), delay=delay) from e
             if not allowed:
                 logger.info(f"🚫 Blocked by robots.txt: {url}")
                 self.failed_urls[url] = "Blocked by robots.txt"
                 self.blocked_urls_by_robots.add(url)
-                return ""
-            crawl_delay = await self.robots_parser.get_crawl_delay(self.user_agent) or 0
+                return None
+
+        # первичный запрос учитываем до breaker: URL, ушедший на парковку, посчитан один раз
+        if first_attempt:
+            self.retry_budget.record_request()
+
+        # --- Circuit breaker (в half_open занимает слот пробы) ---
+        if not self.circuit_breaker.allow_request(domain):
+            remaining = self.circuit_breaker.get_remaining_block(domain)
+            if attempts is not None:
+                raise CircuitOpenError(domain, remaining)
+            logger.warning(f"🚫 Domain {domain} is temporarily blocked ({remaining:.1f}s remaining)")
+            self.failed_urls[url] = f"Blocked by circuit breaker ({remaining:.1f}s)"
+            return None
 
         await self.rate_limiter.acquire(domain)
         if crawl_delay > 0:
@@ -274,46 +544,189 @@ class AsyncCrawler:
         # --- Semaphore + retry ---
         async with self.semaphore_manager.limit(url):
             try:
-                result = await self.retry_strategy.execute_with_retry(
-                    self._do_request,
-                    url=url,
-                    on_retry=on_retry
-                )
+                if attempts is None:
+                    result = await self.retry_strategy.execute_with_retry(
+                        self._do_request,
+                        url=url,
+                        extra_headers=extra_headers,
+                        on_retry=on_retry
+                    )
+                else:
+                    result = await self._do_request(url, extra_headers=extra_headers)
 
+                self.circuit_breaker.record_success(domain)
                 logger.info(f"🎯 Success | 🔗 {url}")
+                # сырой обмен пишет вызывающий — когда финальный URL принят (см. _process_url)
                 return result
 
+            except ContentSkipped as e:
+                self.circuit_breaker.record_success(domain)
+                self.failed_urls[url] = str(e)
+                logger.info(f"⏭️ {e} | 🔗 {url}")
+                return None
+
             except PermanentError as e:
+                # сервер ответил — для breaker это живой домен
+                self.circuit_breaker.record_success(domain)
                 record_error_stats(e)
                 logger.error(f"🚫 Permanent failure | 🔗 {url} | Reason: {str(e)}")
-                return ""
+                return None
 
             except Exception as e:
+                if attempts is not None:
+                    delay = self.retry_strategy.get_delay(e, attempts)
+                    if delay is not None:
+                        if self.retry_budget.try_acquire():
+                            on_retry(e, attempts[type(e)], type(e), delay=delay)
+                            self.circuit_breaker.record_error(domain)
+                            raise RetryLater(str(e), delay=delay) from e
+                        self.stats.incr("retries_dropped_budget")
+                        logger.warning(f"💸 Retry budget exhausted, dropping {url}")
+
                 record_error_stats(e)
                 logger.exception(f"❌ Failed after retries {url}: {e}")
                 self.circuit_breaker.record_error(domain)
-                return ""
+                return None
 
     # --- Parse HTML ---
-    async def parse_html(self, url: str, html: str) -> dict:
+    async def parse_html(self, url: str, html: str | bytes, encoding: str | None = None) -> dict:
         try:
-            return await self.parser.parse_html(html, url)
+            return await self.parser.parse_html(html, url, encoding=encoding)
         except Exception as e:
             logger.exception(f"Parse error for {url}")
             raise ParseError(str(e)) from e
 
     # --- Process one page ---
-    async def _process_url(self, url: str):
-        if url in self.visited_urls:
+    async def _process_url(self, url: str, depth: int = 0, attempts: dict | None = None, deferred: bool = False):
+        """
+        attempts=None — URL пришёл из frontier впервые.
+        deferred=True — повторы и парковка через RetryQueue (режим crawl()).
+        """
+        first_attempt = attempts is None
+        # страницы хранятся под каноническим URL — и после редиректа, и без него
+        canonical = canonicalize_url(url)
+        if first_attempt:
+            if url in self.visited_urls:
+                return None
+            if canonical in self.visited_urls:
+                # тот же адрес в другой записи (http://A.com → http://a.com/) уже взят другим воркером
+                self.stats.incr("url_duplicates")
+                logger.info(f"🔁 Already claimed as {canonical}: {url}")
+                return None
+            # канонический адрес занимаем до загрузки — иначе два написания одной
+            # страницы, загруженные параллельно, сохранились бы оба
+            self.visited_urls.update((url, canonical))
+
+        if deferred and attempts is None:
+            attempts = {}
+
+        domain = urlparse(url).netloc
+        probe = self._probe_scheduled.get(domain) == url
+        cached = await self.http_cache.get(url) if self.http_cache else None
+        unconditional = url in self._unconditional
+        if unconditional:
+            self._unconditional.discard(url)
+            extra_headers = None
+        else:
+            extra_headers = HTTPCache.conditional_headers(cached)
+
+        try:
+            result = await self.fetch(
+                url,
+                attempts=attempts if deferred else None,
+                extra_headers=extra_headers,
+                first_attempt=first_attempt,
+            )
+        except RetryLater as e:
+            self.retry_queue.schedule(url, depth, attempts, e.delay)
+            self.stats.incr("retries_scheduled")
+            return None
+        except CircuitOpenError as e:
+            self._park(e.domain, url, depth, attempts)
             return None
-        self.visited_urls.add(url)
+        finally:
+            if probe:
+                self._probe_finished(domain, url)
 
-        html = await self.fetch_url(url)
-        if not html:
+        if result is None:
             self.stats.record_page(url=url, status_code=0, success=False)
             return None
 
-        parsed = await self.parse_html(url, html)
+        if result.history:
+            final = self.redirects.record([url, *result.history], result.final_url)
+            self.visited_urls.update(result.history)
+            if final != canonical:
+                if final in self.visited_urls or final in self.processed_urls:
+                    # финальная страница уже обработана по другому пути
+                    self.stats.incr("redirect_duplicates")
+                    logger.info(f"↪️ Redirect to already visited page: {url} → {final}")
+                    return None
+                self.visited_urls.add(final)
+                # финальный URL проходит те же фильтры, что и ссылки перед постановкой в очередь
+                try:
+                    allowed = await self._redirect_allowed(url, final)
+                except RobotsUnavailable as e:
+                    # правила хоста цели пока неизвестны — исходный URL повторяется позже
+                    self.visited_urls.discard(final)
+                    delay = self._robots_retry_delay(url, attempts if deferred else None, e)
+                    if delay is None:
+                        self.stats.record_page(url=url, status_code=0, success=False)
+                    else:
+                        self.retry_queue.schedule(url, depth, attempts, delay)
+                        self.stats.incr("retries_scheduled")
+                    return None
+                if not allowed:
+                    return None
+                self.stats.incr("redirects_followed")
+                url = final
+                if self.http_cache and cached is None:
+                    cached = await self.http_cache.get(url)
+        if url != canonicalize_url(url):
+            # канонический адрес занят ещё до загрузки
+            url = canonical
+
+        if result.raw_body is not None:
+            # в WARC — только принятый обмен: отфильтрованный редирект сюда не доходит
+            await self._save_raw(result)
+
+        if result.not_modified:
+            if cached and cached.get("record"):
+                # 304: страница не изменилась — без парсинга и записи в storage
+                self.stats.incr("http_not_modified")
+                return self._reuse_cached(url, cached["record"], status_code=304)
+            # в кэше нет записи — перезапрашиваем без условных заголовков
+            if deferred and not unconditional:
+                # через RetryQueue: воркер не ждёт повтор и его backoff
+                self._unconditional.add(url)
+                self.retry_queue.schedule(url, depth, attempts, 0)
+                self.stats.incr("not_modified_refetch")
+                return None
+            if not unconditional:
+                result = await self.fetch(url, first_attempt=False)
+                if result is not None and result.raw_body is not None:
+                    await self._save_raw(result)
+            if result is not None and result.not_modified:
+                # 304 и на запрос без условных заголовков — иначе перезапрос шёл бы по кругу
+                logger.warning(f"⚠️ 304 without a cached record even for an unconditional request: {url}")
+                if self.http_cache:
+                    await self.http_cache.invalidate(url)
+            if result is None or result.not_modified:
+                self.stats.record_page(url=url, status_code=0, success=False)
+                return None
+
+        body_hash = content_hash(result.body)
+        if cached and cached.get("record") and cached.get("content_hash") == body_hash:
+            # валидаторов нет (или они сменились), но тело то же — только ссылки в frontier
+            self.stats.incr("content_unchanged")
+            await self.http_cache.touch(
+                url,
+                etag=result.headers.get("ETag"),
+                last_modified=result.headers.get("Last-Modified"),
+                body_hash=body_hash,
+            )
+            return self._reuse_cached(url, cached["record"], status_code=result.status)
+
+        parsed = await self.parse_html(url, result.body, encoding=result.encoding)
 
         # 🔹 Стандартизация структуры данных
         standardized = {
@@ -323,19 +736,34 @@ class AsyncCrawler:
             "links": parsed.get("links", []),
             "metadata": parsed.get("metadata", {}),
             "crawled_at": datetime.utcnow(),
-            "status_code": parsed.get("status_code", 200),
-            "content_type": parsed.get("content_type", "text/html"),
+            "status_code": parsed.get("status_code", result.status),
+            "content_type": parsed.get("content_type", result.content_type),
             # Добавляем ключи для статистики
             "images": parsed.get("images", []),
             "lists": parsed.get("lists", {"ul": [], "ol": []}),
             "tables": parsed.get("tables", []),
             "headers": parsed.get("headers", {"h1": [], "h2": [], "h3": []}),
         }
+        if url in self.sitemap_lastmod:
+            standardized["metadata"]["sitemap_lastmod"] = self.sitemap_lastmod[url]
 
         self.processed_urls[url] = standardized
         # 🔹 Добавляем сохранение данных через retry
         if self.storage:
-            await self._save_with_retry(standardized)
+            if self.storage.wants_body:
+                # тело уходит в BlobStore, в processed_urls его не держим
+                await self._save_with_retry(dict(standardized, body=result.body, body_encoding=result.encoding))
+            else:
+                await self._save_with_retry(standardized)
+
+        if self.http_cache:
+            await self.http_cache.put(
+                url,
+                etag=result.headers.get("ETag"),
+                last_modified=result.headers.get("Last-Modified"),
+                body_hash=body_hash,
+                record=standardized,
+            )
 
         self.stats.record_page(
             url=url,
@@ -346,10 +774,112 @@ class AsyncCrawler:
 
         return standardized
 
+    def _robots_retry_delay(self, url: str, attempts: dict | None, exc: RobotsUnavailable) -> float | None:
+        """
+        Задержка до повтора URL, чей robots.txt недоступен; None — повторов не будет
+        (attempts=None — обход без RetryQueue, или исчерпан robots_retries), URL провален.
+        """
+        if attempts is not None:
+            attempts[RobotsUnavailable] = attempts.get(RobotsUnavailable, 0) + 1
+            if attempts[RobotsUnavailable] <= self.robots_retries:
+                self.stats.incr("robots_deferred")
+                logger.warning(f"⏳ {exc} | 🔗 {url}")
+                return exc.retry_after
+        logger.warning(f"⚠️ {exc}, giving up | 🔗 {url}")
+        self.failed_urls[url] = str(exc)
+        return None
+
+    async def _redirect_allowed(self, url: str, final: str) -> bool:
+        """Редирект за пределы разрешённых доменов / шаблонов или в запрещённое robots.txt — не сохраняем"""
+        if not self._is_allowed_url(final):
+            reason = "not allowed"
+        elif self.respect_robots and not await self.robots_parser.can_fetch(final, self.user_agent):
+            reason = "blocked by robots.txt"
+            self.blocked_urls_by_robots.add(final)
+        else:
+            return True
+        self.stats.incr("redirects_blocked")
+        self.failed_urls[url] = f"Redirect target {reason}: {final}"
+        logger.info(f"🚫 Redirect target {reason}: {url} → {final}")
+        return False
+
+    def _prefetch_dns(self, url: str):
+        """Резолвим хост заранее — к первому запросу адрес уже в кэше"""
+        if self.session:
+            self.dns_resolver.prefetch(urlparse(url).hostname)
+
+    def _reuse_cached(self, url: str, record: dict, status_code: int) -> dict:
+        """Берём разобранную запись из HTTPCache вместо повторного парсинга"""
+        record = dict(record, url=url, crawled_at=datetime.utcnow())
+        self.processed_urls[url] = record
+        self.stats.record_page(
+            url=url,
+            status_code=status_code,
+            success=True,
+            request_time=self.request_times[-1] if self.request_times else 0
+        )
+        return record
+
+    async def _ingest_sitemaps(self, start_urls: list[str], queue: CrawlerQueue, max_pages: int):
+        """
+        Потоково добавляет URL из sitemap стартовых хостов в frontier.
+        Sitemap берутся из строк Sitemap: robots.txt, иначе /sitemap.xml.
+        """
+        origins = {RobotsParser._origin(u) for u in start_urls}
+        found = await asyncio.gather(*(self.robots_parser.get_sitemaps(o) for o in origins), return_exceptions=True)
+
+        sitemap_urls = []
+        for origin, sitemaps in zip(origins, found):
+            if isinstance(sitemaps, Exception) or not sitemaps:
+                sitemap_urls.append(origin + "/sitemap.xml")
+            else:
+                sitemap_urls.extend(sitemaps)
+
+        added = 0
+        # aclosing: после break генератор сразу гасит свои задачи и сессию, а не при сборке мусора
+        async with aclosing(self.sitemap_parser.iter_urls(sitemap_urls)) as entries:
+            async for entry in entries:
+                if queue.added_count >= max_pages:
+                    break
+                if not self._is_allowed_url(entry.loc):
+                    continue
+                if entry.lastmod:
+                    self.sitemap_lastmod[entry.loc] = entry.lastmod
+                rank = -entry.priority if entry.priority is not None else 0.0
+                await queue.add_url(entry.loc, 0, rank=rank)
+                added += 1
+
+        self.stats.incr("sitemap_urls", added)
+        logger.info(f"🗺️ Sitemap ingestion finished: {added} URLs")
+
+    async def _save_raw(self, result: FetchResult):
+        """Сырой HTTP-обмен в storage (WARC): ошибки записи не валят обход"""
+        exchange = {
+            "url": result.final_url or result.url,
+            "status": result.status,
+            "request_headers": result.request_headers,
+            "response_headers": list(result.headers.items()),
+            "body": result.raw_body,
+            "truncated": result.truncated,
+            "fetched_at": datetime.now(timezone.utc),
+        }
+        try:
+            if self.storage_writer and self.storage_writer.running:
+                await self.storage_writer.submit_raw(exchange)
+            else:
+                await self.storage.save_raw(exchange)
+        except Exception as e:
+            logger.error(f"Failed to save raw exchange for {result.url}: {e}")
+
     async def _save_with_retry(self, data, retries=3, delay=1):
         """
         Сохраняет данные через storage с повторными попытками при ошибках.
+        Во время crawl() запись только ставится в очередь StorageWriter — повторы делает он.
         """
+        if self.storage_writer and self.storage_writer.running:
+            await self.storage_writer.submit(data)
+            return
+
         for attempt in range(1, retries + 1):
             try:
                 await self.storage.save(data)
@@ -368,7 +898,7 @@ class AsyncCrawler:
         # 🔹 Запуск таймера статистики
         self.stats.start()
 
-        queue = CrawlerQueue()
+        queue = CrawlerQueue(on_add=self._prefetch_dns)
         results = []
 
         # Добавляем стартовые URL
@@ -376,17 +906,22 @@ class AsyncCrawler:
             if self._is_allowed_url(url):
                 await queue.add_url(url, 0)
 
+        # robots.txt для всех стартовых хостов грузим параллельно, не дожидаясь воркеров
+        robots_task = None
+        if self.respect_robots:
+            robots_task = asyncio.create_task(self.robots_parser.prefetch(start_urls))
+
         async def worker():
             nonlocal results
             while True:
-                url, depth = await queue.get_next()
+                url, depth, attempts = await queue.get_entry()
 
                 try:
-                    if url in self.visited_urls:
+                    if attempts is None and url in self.visited_urls:
                         continue
 
-                    # 🔹 Обработка URL
-                    parsed = await self._process_url(url)
+                    # 🔹 Обработка URL (attempts едут вместе с URL при повторах)
+                    parsed = await self._process_url(url, depth, attempts, deferred=True)
                     if parsed:
                         results.append(parsed)
 
@@ -395,8 +930,10 @@ class AsyncCrawler:
                             if not isinstance(link, str) or not link.strip():
                                 continue
 
-                            absolute = urljoin(url, link)
+                            absolute = urljoin(parsed.get("url") or url, link)
                             absolute, _ = urldefrag(absolute)
+                            # ссылка на известный источник редиректа — сразу на финальный URL
+                            absolute = self.redirects.resolve(absolute)
 
                             if (
                                     self._is_allowed_url(absolute)
@@ -408,22 +945,58 @@ class AsyncCrawler:
                 finally:
                     queue.task_done()
 
+        if self.storage_writer:
+            self.storage_writer.start()
+
         # Создаём воркеры
         workers = [asyncio.create_task(worker()) for _ in range(self.max_concurrent)]
+        retry_task = asyncio.create_task(self.retry_queue.run(queue.requeue))
+        sitemap_task = None
+        if self.use_sitemaps:
+            sitemap_task = asyncio.create_task(self._ingest_sitemaps(start_urls, queue, max_pages))
         progress_task = asyncio.create_task(self._progress_logger(queue, interval=progress_interval))
 
         try:
-            # Ждём завершения всех задач в очереди
-            await queue.join()
+            # Sitemap дочитываются параллельно с работой воркеров
+            if sitemap_task:
+                try:
+                    await sitemap_task
+                except Exception as e:
+                    logger.error(f"Sitemap ingestion failed: {e}")
+
+            # Ждём завершения всех задач в очереди и всех отложенных повторов
+            while True:
+                await queue.join()
+                if not self.retry_queue.drained:
+                    await self.retry_queue.join()
+                elif queue.idle:
+                    # join() мог проснуться раньше, чем RetryQueue вернула URL в очередь
+                    break
         finally:
             # Отмена воркеров и ожидание их завершения
-            for w in workers:
+            background = workers + [retry_task] + [t for t in (robots_task, sitemap_task) if t]
+            for w in background:
                 w.cancel()
-            await asyncio.gather(*workers, return_exceptions=True)
+            await asyncio.gather(*background, return_exceptions=True)
             await progress_task
 
+            # Дописываем всё, что воркеры успели поставить в очередь записи
+            if self.storage_writer:
+                await self.storage_writer.close()
+
+        # домены, чей breaker так и не закрылся: их URL не обработаны — это ошибки
+        for domain in list(self._parked):
+            self._drop_parked(domain, "Circuit breaker still open at crawl end")
+        self._probe_scheduled.clear()
+
         # 🔹 Завершаем сбор статистики
         self.stats.stop()
+        for name, value in self.dns_resolver.stats.items():
+            self.stats.counters[f"dns_{name}"] = value
+        self.stats.counters["redirects_rewritten"] = self.redirects.stats["rewritten"]
+        if self.storage_writer:
+            for name, value in self.storage_writer.stats.items():
+                self.stats.counters[f"storage_{name}"] = value
 
         # 🔹 Вывод расширенной статистики краулера
         summary = self.stats.get_summary()
@@ -451,6 +1024,7 @@ class AsyncCrawler:
             failed_count = len(self.failed_urls)
             blocked_count = len(self.blocked_urls_by_robots)
             in_queue = queue._queue.qsize()
+            write_queue = self.storage_writer.depth if self.storage_writer else 0
 
             # скорость и средняя задержка
             speed = (processed_count - prev_count) / interval
@@ -462,6 +1036,7 @@ class AsyncCrawler:
                 f"⏳ In queue: {in_queue} | "
                 f"❌ Failed: {failed_count} | "
                 f"🚫 Blocked: {blocked_count} | "
+                f"💾 Write queue: {write_queue} | "
                 f"⚡️ Speed: {speed:.2f} pages/sec | "
                 f"⏱️ Avg delay: {avg_delay:.2f}s"
             )
@@ -481,6 +1056,15 @@ class AsyncCrawler:
         if self.session and not self.session.closed:
             await self.session.close()
 
+        await self.dns_resolver.close()
+        await self.transport.close()
+
+        if self.http_cache:
+            try:
+                await self.http_cache.close()
+            except Exception as e:
+                logger.error(f"Failed to close HTTP cache: {e}")
+
         # 🔹 Закрытие storage
         if self.storage:
             try:
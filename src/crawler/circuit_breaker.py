@@ -1,24 +1,42 @@
 # src/crawler/circuit_breaker.py
 import time
 from collections import defaultdict, deque
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
 
 class CircuitBreaker:
     """
-    Простой circuit breaker для доменов.
-    - Отслеживает ошибки по домену
-    - Блокирует домен, если частота ошибок превышает threshold
-    - Автоматически восстанавливается через reset_timeout
+    Circuit breaker для доменов с тремя состояниями.
+    - closed: запросы идут, ошибки считаются в окне времени
+    - open: домен заблокирован на reset_timeout после превышения порога
+    - half_open: после таймаута пропускаем не больше half_open_max_probes
+      пробных запросов; успех закрывает breaker, ошибка снова открывает
     """
 
-    def __init__(self, max_errors: int = 5, window: float = 60.0, reset_timeout: float = 30.0):
+    def __init__(
+        self,
+        max_errors: int = 5,
+        window: float = 60.0,
+        reset_timeout: float = 30.0,
+        half_open_max_probes: int = 1,
+        on_state_change: Optional[Callable[[str, str], None]] = None,
+    ):
         """
         :param max_errors: максимальное количество ошибок в окне времени
         :param window: окно времени в секундах для подсчёта ошибок
         :param reset_timeout: время блокировки домена в секундах
+        :param half_open_max_probes: одновременных пробных запросов в half_open
+        :param on_state_change: callback(domain, new_state)
         """
         self.max_errors = max_errors
         self.window = window
         self.reset_timeout = reset_timeout
+        self.half_open_max_probes = half_open_max_probes
+        self.on_state_change = on_state_change
 
         # структура: {domain: deque[timestamp ошибок]}
         self.errors = defaultdict(deque)
@@ -26,8 +44,70 @@ class CircuitBreaker:
         # блокировки: {domain: unblock_time}
         self.blocked_domains = {}
 
+        # half_open: {domain: пробных запросов в полёте}
+        self._probes = {}
+
+        # сколько раз подряд домен открывался без успешного запроса
+        self.consecutive_opens = defaultdict(int)
+
+    def _set_state(self, domain: str, state: str):
+        if self.on_state_change:
+            self.on_state_change(domain, state)
+
+    def _open(self, domain: str):
+        self._probes.pop(domain, None)
+        self.blocked_domains[domain] = time.time() + self.reset_timeout
+        self.consecutive_opens[domain] += 1
+        self._set_state(domain, OPEN)
+
+    def get_state(self, domain: str) -> str:
+        """Текущее состояние домена (open → half_open по истечении таймаута)"""
+        if domain in self._probes:
+            return HALF_OPEN
+
+        unblock_time = self.blocked_domains.get(domain)
+        if unblock_time is None:
+            return CLOSED
+
+        if time.time() >= unblock_time:
+            del self.blocked_domains[domain]
+            self._probes[domain] = 0
+            self._set_state(domain, HALF_OPEN)
+            return HALF_OPEN
+        return OPEN
+
+    def allow_request(self, domain: str) -> bool:
+        """Можно ли сейчас слать запрос; в half_open занимает слот пробы"""
+        state = self.get_state(domain)
+        if state == CLOSED:
+            return True
+        if state == OPEN:
+            return False
+
+        if self._probes[domain] < self.half_open_max_probes:
+            self._probes[domain] += 1
+            return True
+        return False
+
+    def probes_in_flight(self, domain: str) -> int:
+        """Сколько пробных запросов half_open сейчас в полёте"""
+        return self._probes.get(domain, 0)
+
+    def record_success(self, domain: str):
+        """Успешный ответ: в half_open закрываем breaker"""
+        self.consecutive_opens.pop(domain, None)
+        if domain in self._probes:
+            del self._probes[domain]
+            self.errors[domain].clear()
+            self._set_state(domain, CLOSED)
+
     def record_error(self, domain: str):
         """Записываем ошибку для домена"""
+        if domain in self._probes:
+            # проба не удалась → снова open
+            self._open(domain)
+            return
+
         now = time.time()
         q = self.errors[domain]
 
@@ -38,21 +118,13 @@ class CircuitBreaker:
         q.append(now)
 
         # если превышен порог → блокируем домен
-        if len(q) >= self.max_errors:
-            self.blocked_domains[domain] = now + self.reset_timeout
+        if len(q) >= self.max_errors and domain not in self.blocked_domains:
+            q.clear()
+            self._open(domain)
 
     def is_blocked(self, domain: str) -> bool:
-        """Проверяем, заблокирован ли домен"""
-        unblock_time = self.blocked_domains.get(domain)
-        if unblock_time is None:
-            return False
-
-        if time.time() >= unblock_time:
-            # сбрасываем блокировку
-            del self.blocked_domains[domain]
-            self.errors[domain].clear()
-            return False
-        return True
+        """Проверяем, заблокирован ли домен (состояние open)"""
+        return self.get_state(domain) == OPEN
 
     def get_remaining_block(self, domain: str) -> float:
         """Возвращает оставшееся время блокировки, если есть"""
@@ -0,0 +1,156 @@
+# src/crawler/compression.py
+import zlib
+
+try:
+    import brotli  # опционально: pip install "brotli>=1.2"
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+
+def _brotli_output_limit() -> bool:
+    """process(..., output_buffer_limit=) есть только в brotli >= 1.2; без него ответ не ограничить"""
+    try:
+        brotli.Decompressor().process(b"", output_buffer_limit=1)
+    except TypeError:
+        return False
+    return True
+
+
+if brotli is not None and not _brotli_output_limit():
+    # старый brotli / brotlicffi: br не объявляем — иначе ответ разворачивался бы без лимита
+    brotli = None
+
+try:
+    import zstandard  # опционально: pip install zstandard
+except ImportError:
+    zstandard = None
+
+
+def supported_encodings() -> list[str]:
+    """Кодировки в порядке предпочтения: br и zstd сжимают HTML лучше gzip"""
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings += ["gzip", "deflate"]
+    return encodings
+
+
+def accept_encoding() -> str:
+    return ", ".join(supported_encodings())
+
+
+# Максимальная степень сжатия zstd: RLE-блок из 4 байт разворачивается в 128 KiB
+_ZSTD_MAX_RATIO = 32 * 1024
+
+
+class _Identity:
+    unconsumed_tail = b""
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Zlib:
+    """gzip и deflate; deflate бывает как zlib-обёрнутым, так и «сырым»"""
+
+    def __init__(self, encoding: str):
+        self._gzip = encoding in ("gzip", "x-gzip")
+        self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS if self._gzip else zlib.MAX_WBITS)
+        self._started = False
+
+    @property
+    def unconsumed_tail(self) -> bytes:
+        return self._obj.unconsumed_tail
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        if not self._started and not self._gzip:
+            self._started = True
+            try:
+                return self._obj.decompress(data, max_length)
+            except zlib.error:
+                # сервер прислал raw deflate без заголовка zlib
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        self._started = True
+        return self._obj.decompress(data, max_length)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _Brotli:
+    """
+    Непрочитанный вход Decompressor держит у себя — unconsumed_tail всегда пуст.
+    output_buffer_limit округляется вверх до внутренних буферов: если выход не влез,
+    отдаётся больше max_length (признак превышения лимита для вызывающего), но не безгранично.
+    """
+
+    unconsumed_tail = b""
+
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        if max_length:
+            return self._obj.process(data, output_buffer_limit=max_length)
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Zstd:
+    """
+    У decompressobj нет ограничения выхода — вход подаём срезами, из которых даже
+    при предельном сжатии не развернётся больше max_length. Блоки zstd отдаются
+    целиком, так что перебор — не больше одного блока (128 KiB).
+    """
+
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+        self.unconsumed_tail = b""
+
+    def decompress(self, data: bytes, max_length: int = 0) -> bytes:
+        if not max_length:
+            self.unconsumed_tail = b""
+            return self._obj.decompress(data)
+        step = max(1, max_length // _ZSTD_MAX_RATIO)
+        out = []
+        size = pos = 0
+        while pos < len(data) and size < max_length:
+            chunk = self._obj.decompress(data[pos:pos + step])
+            pos += step
+            out.append(chunk)
+            size += len(chunk)
+        self.unconsumed_tail = data[pos:]
+        return b"".join(out)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def make_decoder(content_encoding: str | None):
+    """
+    Потоковый декодер для Content-Encoding ответа.
+    decompress(data, max_length) отдаёт не больше max_length байт (0 — без ограничения;
+    zstd — плюс один блок); неподанный вход остаётся в unconsumed_tail, как у zlib.
+    Бросает ValueError, если кодировка не поддерживается (не должна приходить,
+    раз мы её не объявляли в Accept-Encoding).
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("", "identity"):
+        return _Identity()
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        return _Zlib(encoding)
+    if encoding == "br" and brotli is not None:
+        return _Brotli()
+    if encoding == "zstd" and zstandard is not None:
+        return _Zstd()
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
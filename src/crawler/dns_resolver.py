@@ -0,0 +1,132 @@
+# src/crawler/dns_resolver.py
+import asyncio
+import ipaddress
+import socket
+import time
+from collections import OrderedDict
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import ThreadedResolver
+
+from crawler.logger import setup_crawler_logger
+
+logger = setup_crawler_logger()
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+        return True
+    except ValueError:
+        return False
+
+
+class CachingResolver(AbstractResolver):
+    """
+    DNS-резолвер краулера поверх любого AbstractResolver (по умолчанию ThreadedResolver).
+    - положительный кэш с ttl и отрицательный (NXDOMAIN, таймауты) с negative_ttl
+    - single-flight: параллельные запросы одного хоста ждут один lookup
+    - semaphore ограничивает число одновременных lookup (пул потоков getaddrinfo не резиновый)
+    - prefetch(host): резолвим хост в фоне, как только он попал в frontier
+    """
+
+    def __init__(
+        self,
+        resolver: AbstractResolver | None = None,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        max_concurrency: int = 50,
+        max_hosts: int = 10000,
+    ):
+        self._resolver = resolver
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_hosts = max_hosts
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # (host, family) -> (expires_at, addrs | OSError)
+        self._cache: OrderedDict = OrderedDict()
+        self._inflight: dict = {}
+        self._prefetch_tasks: set[asyncio.Task] = set()
+        self.stats = {"hits": 0, "misses": 0, "negative_hits": 0, "prefetched": 0, "errors": 0}
+
+    @property
+    def resolver(self) -> AbstractResolver:
+        # ThreadedResolver требует работающий event loop — создаём лениво
+        if self._resolver is None:
+            self._resolver = ThreadedResolver()
+        return self._resolver
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list:
+        addrs = await self._get(host, family)
+        # кэшируем без учёта порта, порт подставляем в ответ
+        return [dict(addr, port=port) for addr in addrs]
+
+    async def _get(self, host: str, family) -> list:
+        key = (host, family)
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires, value = cached
+            if expires > time.monotonic():
+                self._cache.move_to_end(key)
+                if isinstance(value, OSError):
+                    self.stats["negative_hits"] += 1
+                    raise value.with_traceback(None)
+                self.stats["hits"] += 1
+                return value
+            del self._cache[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["misses"] += 1
+            task = asyncio.create_task(self._lookup(host, family))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: отмена одного ожидающего не должна отменять общий lookup
+        return await asyncio.shield(task)
+
+    async def _lookup(self, host: str, family) -> list:
+        key = (host, family)
+        async with self._semaphore:
+            try:
+                addrs = await self.resolver.resolve(host, 0, family)
+            except OSError as e:
+                self.stats["errors"] += 1
+                self._store(key, e, self.negative_ttl)
+                raise
+        self._store(key, addrs, self.ttl)
+        return addrs
+
+    def _store(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_hosts:
+            self._cache.popitem(last=False)
+
+    def prefetch(self, host: str, family: socket.AddressFamily = socket.AF_UNSPEC):
+        """Запускает фоновый lookup, если хоста ещё нет в кэше; ошибки не пробрасываются"""
+        if not host or _is_ip(host):
+            return
+        key = (host, family)
+        cached = self._cache.get(key)
+        if key in self._inflight or (cached and cached[0] > time.monotonic()):
+            return
+
+        async def run():
+            try:
+                await self._get(host, family)
+            except OSError as e:
+                logger.debug(f"DNS prefetch failed for {host}: {e}")
+
+        self.stats["prefetched"] += 1
+        task = asyncio.create_task(run())
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+
+    async def close(self):
+        for task in list(self._prefetch_tasks) + list(self._inflight.values()):
+            task.cancel()
+        await asyncio.gather(*self._prefetch_tasks, *self._inflight.values(), return_exceptions=True)
+        if self._resolver is not None:
+            await self._resolver.close()
@@ -0,0 +1,78 @@
+# src/crawler/encoding.py
+import codecs
+import re
+
+DEFAULT_ENCODING = "utf-8"
+
+# BOM проверяются от длинных к коротким: UTF-32 LE начинается с BOM UTF-16 LE
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+# <meta charset="..."> и <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE)
+_HEADER_CHARSET = re.compile(r"""charset\s*=\s*["']?([^"';\s]+)""", re.IGNORECASE)
+
+# по стандарту HTML meta ищется только в начале документа
+META_SCAN_BYTES = 4096
+
+
+def _lookup(name: str | None) -> str | None:
+    """Нормализует имя кодировки ('CP1251' → 'cp1251'); None — если Python её не знает"""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def charset_from_content_type(content_type: str | None) -> str | None:
+    if not content_type:
+        return None
+    match = _HEADER_CHARSET.search(content_type)
+    return _lookup(match.group(1)) if match else None
+
+
+def sniff_bom(body: bytes) -> str | None:
+    for bom, name in _BOMS:
+        if body.startswith(bom):
+            return name
+    return None
+
+
+def sniff_meta_charset(body: bytes) -> str | None:
+    match = _META_CHARSET.search(body[:META_SCAN_BYTES])
+    return _lookup(match.group(1).decode("ascii", "ignore")) if match else None
+
+
+def resolve_charset(content_type: str | None, body: bytes) -> tuple[str, str]:
+    """
+    Определяет кодировку страницы.
+    Порядок: BOM → charset из Content-Type → <meta charset> → UTF-8.
+    BOM важнее заголовка (так делают браузеры): сервер часто отдаёт charset по умолчанию.
+    Возвращает (кодировка, источник) — источник пишется в статистику.
+    """
+    bom = sniff_bom(body)
+    if bom:
+        return bom, "bom"
+
+    header = charset_from_content_type(content_type)
+    if header:
+        return header, "header"
+
+    meta = sniff_meta_charset(body)
+    if meta:
+        # utf-16 в meta ASCII-совместимого документа — заведомая ошибка автора
+        return ("utf-8", "meta") if meta.startswith("utf-16") else (meta, "meta")
+
+    return DEFAULT_ENCODING, "default"
+
+
+def decode_body(body: bytes, encoding: str) -> str:
+    """Декодирует тело; битые байты заменяются, а не роняют обход"""
+    return body.decode(encoding, errors="replace")
@@ -26,3 +26,38 @@ class NetworkError(CrawlerError):
 
 class ParseError(CrawlerError):
     """HTML parsing error."""
+
+
+class RetryLater(CrawlerError):
+    """Повтор отложен: URL нужно вернуть в очередь через delay секунд."""
+
+    def __init__(self, message, delay: float = 0.0):
+        super().__init__(message)
+        self.delay = delay
+
+
+class RobotsUnavailable(CrawlerError):
+    """robots.txt временно недоступен (5xx, 429, ошибка сети): правила неизвестны, URL нужно отложить."""
+
+    def __init__(self, origin: str, retry_after: float = 0.0):
+        super().__init__(f"robots.txt unavailable for {origin} (retry in {retry_after:.1f}s)")
+        self.origin = origin
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(CrawlerError):
+    """Домен заблокирован circuit breaker; URL нужно припарковать."""
+
+    def __init__(self, domain: str, remaining: float = 0.0):
+        super().__init__(f"Circuit open for {domain} ({remaining:.1f}s remaining)")
+        self.domain = domain
+        self.remaining = remaining
+
+
+class ContentSkipped(PermanentError):
+    """Ответ отброшен до загрузки тела (не HTML по Content-Type или по первым байтам)."""
+
+    def __init__(self, reason: str, content_type: str = "", status=None):
+        super().__init__(f"Skipped {reason}: {content_type or 'unknown'}", status=status)
+        self.reason = reason
+        self.content_type = content_type
@@ -0,0 +1,46 @@
+# src/crawler/fetch_result.py
+from dataclasses import dataclass, field
+from typing import Mapping
+
+from crawler.encoding import DEFAULT_ENCODING, decode_body
+
+# Content-Type, которые краулер разбирает
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+# Content-Type, по которым нельзя судить о содержимом — решаем по первому чанку
+SNIFF_CONTENT_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+
+_HTML_MARKERS = (b"<!doctype html", b"<html", b"<head", b"<body", b"<title")
+
+
+def looks_like_html(chunk: bytes) -> bool:
+    """Грубая проверка первых байт ответа (упрощённый MIME sniffing)"""
+    head = chunk[:1024].lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    return any(marker in head for marker in _HTML_MARKERS)
+
+
+@dataclass
+class FetchResult:
+    """
+    Результат одного HTTP-запроса AsyncCrawler._do_request.
+    not_modified=True — сервер ответил 304, тело пустое, берём данные из HTTPCache.
+    Тело хранится байтами; text декодирует его только по запросу.
+    """
+    url: str
+    status: int
+    headers: Mapping[str, str] = field(default_factory=dict)  # CIMultiDict из ответа aiohttp
+    body: bytes = b""
+    encoding: str = DEFAULT_ENCODING
+    not_modified: bool = False
+    truncated: bool = False  # тело обрезано по max_body_size
+    final_url: str = ""  # URL после редиректов
+    history: tuple[str, ...] = ()  # URL, с которых был редирект (по порядку)
+    raw_body: bytes | None = None  # тело «с провода», если storage.wants_raw
+    request_headers: dict = field(default_factory=dict)
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "text/html").split(";", 1)[0].strip().lower()
+
+    @property
+    def text(self) -> str:
+        return decode_body(self.body, self.encoding)
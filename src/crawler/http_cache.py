@@ -0,0 +1,164 @@
+# src/crawler/http_cache.py
+import asyncio
+import hashlib
+import json
+import zlib
+from datetime import datetime
+
+import aiosqlite
+
+from crawler.url_utils import canonicalize_url
+
+try:
+    import xxhash  # опционально: заметно быстрее blake2b на больших страницах
+except ImportError:
+    xxhash = None
+
+
+def content_hash(body: bytes) -> str:
+    """
+    Короткий некриптографический хэш тела ответа (16 hex-символов).
+    xxh3_64, если установлен xxhash, иначе blake2b(digest_size=8).
+    Смена алгоритма между запусками лишь вызовет однократный повторный парсинг.
+    """
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(body)
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+class HTTPCache:
+    """
+    Персистентный HTTP-кэш для повторных обходов (SQLite).
+    Ключ — канонический URL; хранятся ETag, Last-Modified, хэш тела
+    и сжатая разобранная запись страницы, чтобы ответ 304 (или 200
+    с тем же хэшем тела) не требовал ни парсинга, ни записи в storage.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 100):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._conn = None
+        self._pending = []
+        self._touched: dict[str, tuple] = {}  # url → (etag, last_modified, content_hash, updated_at)
+        self._lock = asyncio.Lock()
+
+    async def _ensure_open(self):
+        if self._conn:
+            return
+        self._conn = await aiosqlite.connect(self.db_path)
+        await self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                record BLOB,
+                updated_at TEXT
+            )
+        """)
+        await self._conn.commit()
+
+    @staticmethod
+    def _encode_record(record: dict) -> bytes:
+        def default(value):
+            if isinstance(value, datetime):
+                return value.isoformat()
+            raise TypeError(f"Not serializable: {type(value).__name__}")
+
+        return zlib.compress(json.dumps(record, ensure_ascii=False, default=default).encode("utf-8"))
+
+    async def get(self, url: str) -> dict | None:
+        """Запись кэша: {etag, last_modified, content_hash, record} или None"""
+        await self._ensure_open()
+        key = canonicalize_url(url)
+
+        # запись ещё может лежать в буфере
+        for item in reversed(self._pending):
+            if item[0] == key:
+                row = item[1:5]
+                break
+        else:
+            async with self._conn.execute(
+                "SELECT etag, last_modified, content_hash, record FROM http_cache WHERE url = ?", (key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        if not row:
+            return None
+
+        etag, last_modified, body_hash, blob = row
+        if key in self._touched:
+            # валидаторы обновлены touch(), но ещё не записаны
+            etag, last_modified, body_hash, _ = self._touched[key]
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": body_hash,
+            "record": json.loads(zlib.decompress(blob)) if blob else None,
+        }
+
+    @staticmethod
+    def conditional_headers(entry: dict | None) -> dict:
+        """Заголовки If-None-Match / If-Modified-Since для записи кэша"""
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    async def put(self, url: str, etag: str | None, last_modified: str | None, body_hash: str | None, record: dict | None):
+        """Добавляем/обновляем запись (пишется пачками по batch_size)"""
+        await self._ensure_open()
+        blob = self._encode_record(record) if record is not None else None
+        key = canonicalize_url(url)
+        async with self._lock:
+            self._touched.pop(key, None)  # put новее — иначе UPDATE в _flush затёр бы его валидаторы
+            self._pending.append((key, etag, last_modified, body_hash, blob, datetime.utcnow().isoformat()))
+            if len(self._pending) + len(self._touched) >= self.batch_size:
+                await self._flush()
+
+    async def touch(self, url: str, etag: str | None, last_modified: str | None, body_hash: str):
+        """
+        Обновляет валидаторы без перезаписи сжатой записи (тело не изменилось).
+        Копится в той же пачке, что и put: повторный обход без изменений — один commit на batch_size страниц.
+        """
+        await self._ensure_open()
+        async with self._lock:
+            self._touched[canonicalize_url(url)] = (etag, last_modified, body_hash, datetime.utcnow().isoformat())
+            if len(self._pending) + len(self._touched) >= self.batch_size:
+                await self._flush()
+
+    async def invalidate(self, url: str):
+        """Удаляет запись: её валидаторы больше не помогают (сервер отвечает 304 без тела в кэше)"""
+        await self._ensure_open()
+        key = canonicalize_url(url)
+        async with self._lock:
+            self._pending = [item for item in self._pending if item[0] != key]
+            self._touched.pop(key, None)
+            await self._conn.execute("DELETE FROM http_cache WHERE url = ?", (key,))
+            await self._conn.commit()
+
+    async def _flush(self):
+        if not self._conn or not (self._pending or self._touched):
+            return
+        if self._pending:
+            await self._conn.executemany(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?)", self._pending
+            )
+        if self._touched:
+            # после INSERT: touch записи из этой же пачки тоже применится
+            await self._conn.executemany(
+                "UPDATE http_cache SET etag = ?, last_modified = ?, content_hash = ?, updated_at = ? WHERE url = ?",
+                [(*values, url) for url, values in self._touched.items()]
+            )
+        await self._conn.commit()
+        self._pending = []
+        self._touched = {}
+
+    async def close(self):
+        async with self._lock:
+            await self._flush()
+        if self._conn:
+            await self._conn.close()
+            self._conn = None
@@ -4,11 +4,20 @@ from crawler.logger import setup_crawler_logger
 import logging
 logger = setup_crawler_logger(level=logging.INFO)
 
+try:
+    import lxml  # noqa: F401
+    BYTES_FEATURES = "lxml"  # lxml декодирует байты сам, без промежуточной str-копии
+except ImportError:
+    BYTES_FEATURES = "html.parser"
+
+
 class HTMLParser:
     # html parsing method
-    async def parse_html(self, html: str, url: str) -> dict:
+    async def parse_html(self, html: str | bytes, url: str, encoding: str | None = None) -> dict:
         """
         Main method of parsing HTML / Основной метод парсинга HTML.
+        html может быть байтами тела ответа — тогда encoding берётся
+        из crawler.encoding.resolve_charset и передаётся парсеру как есть.
         Returns: / Возвращает:
         {
             url: str,
@@ -31,7 +40,10 @@ class HTMLParser:
             "lists": {},
         }
         try:
-            soup = BeautifulSoup(html, "html.parser")
+            if isinstance(html, bytes):
+                soup = BeautifulSoup(html, BYTES_FEATURES, from_encoding=encoding)
+            else:
+                soup = BeautifulSoup(html, "html.parser")
         except Exception as e:
             logger.warning(f"⚠️ Failed to create BeautifulSoup for {url}: {e}")
             return result
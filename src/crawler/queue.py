@@ -1,22 +1,28 @@
 import asyncio
-from typing import Optional, Tuple
+import itertools
+from typing import Callable, Optional, Tuple
 
 
 class CrawlerQueue:
     """
     Очередь URL с приоритетом = depth.
-    Меньший depth = выше приоритет.
+    Меньший depth = выше приоритет; при равном depth меньший rank идёт раньше
+    (rank = -priority из sitemap).
+    on_add(url) вызывается для каждого нового URL (например, DNS prefetch).
     """
 
-    def __init__(self):
+    def __init__(self, on_add: Optional[Callable[[str], None]] = None):
         self._queue = asyncio.PriorityQueue()
         self._seen = set()
         self._processed = set()
         self._failed = {}
         self._lock = asyncio.Lock()
         self._added_count = 0
+        self._counter = itertools.count()  # порядок при равном depth
+        self._on_add = on_add
+        self._unfinished = 0  # в очереди + выданы воркерам и ещё не task_done()
 
-    async def add_url(self, url: str, depth: int = 0, priority: int = None):
+    async def add_url(self, url: str, depth: int = 0, priority: int = None, rank: float = 0.0):
         """
         Добавляем URL.
         Можно передать depth или priority (для совместимости с тестами).
@@ -30,20 +36,40 @@ class CrawlerQueue:
             if url in self._seen:
                 return
 
-            await self._queue.put((depth, url))
+            await self._queue.put((depth, rank, next(self._counter), url, None))
+            self._unfinished += 1
             self._seen.add(url)
             self._added_count += 1
 
+        if self._on_add:
+            self._on_add(url)
+
+    async def requeue(self, url: str, depth: int, attempts: dict):
+        """
+        Возвращаем URL на повтор (минуя проверку _seen).
+        attempts — счётчики попыток по типам ошибок, едут вместе с URL.
+        """
+        await self._queue.put((depth, 0.0, next(self._counter), url, attempts))
+        self._unfinished += 1
+
     async def get_next(self) -> Optional[Tuple[str, int]]:
         """
         Возвращает (url, depth)
         """
 
-        depth, url = await self._queue.get()
+        url, depth, _ = await self.get_entry()
         return url, depth
 
+    async def get_entry(self) -> Tuple[str, int, Optional[dict]]:
+        """
+        Возвращает (url, depth, attempts); attempts=None для первой попытки
+        """
+        depth, _, _, url, attempts = await self._queue.get()
+        return url, depth, attempts
+
     def task_done(self):
         self._queue.task_done()
+        self._unfinished -= 1
 
     async def join(self):
         await self._queue.join()
@@ -54,6 +80,15 @@ class CrawlerQueue:
     def mark_failed(self, url: str, error: str):
         self._failed[url] = error
 
+    @property
+    def idle(self) -> bool:
+        """Нет ни URL в очереди, ни URL в обработке у воркеров"""
+        return self._unfinished == 0
+
+    @property
+    def added_count(self) -> int:
+        return self._added_count
+
     def get_stats(self) -> dict:
         return {
             "total_added": self._added_count,
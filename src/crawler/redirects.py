@@ -0,0 +1,54 @@
+# src/crawler/redirects.py
+from collections import OrderedDict
+
+from crawler.url_utils import canonicalize_url
+
+
+class RedirectCache:
+    """
+    Карта редиректов «исходный канонический URL → финальный канонический URL».
+    Заполняется по цепочкам ответов (response.history); ссылки на известные
+    источники редиректа переписываются до попадания в очередь,
+    так что http→https, /a→/a/ и www-редиректы не запрашиваются повторно.
+    """
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._map: OrderedDict[str, str] = OrderedDict()
+        self.stats = {"recorded": 0, "rewritten": 0}
+
+    def record(self, chain: list[str], final_url: str) -> str:
+        """Запоминает цепочку; возвращает канонический финальный URL"""
+        final = canonicalize_url(final_url)
+        for url in chain:
+            source = canonicalize_url(url)
+            if source == final:
+                continue
+            self._map[source] = final
+            self._map.move_to_end(source)
+            self.stats["recorded"] += 1
+        while len(self._map) > self.max_entries:
+            self._map.popitem(last=False)
+        return final
+
+    def resolve(self, url: str) -> str:
+        """Финальный URL для известного источника редиректа, иначе url без изменений"""
+        if not self._map:
+            return url
+        current = canonicalize_url(url)
+        if current not in self._map:
+            return url
+        seen = {current}
+        while current in self._map:
+            current = self._map[current]
+            if current in seen:  # петля редиректов — оставляем как есть
+                break
+            seen.add(current)
+        self.stats["rewritten"] += 1
+        return current
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalize_url(url) in self._map
+
+    def __len__(self) -> int:
+        return len(self._map)
@@ -0,0 +1,107 @@
+# src/crawler/retry_queue.py
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable
+
+
+class RetryBudget:
+    """
+    Глобальный бюджет повторов.
+    Разрешает не больше min_retries + ratio * requests повторов,
+    чтобы шквал 503 не съедал пропускную способность краулера.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10):
+        """
+        :param ratio: доля повторов относительно числа первичных запросов
+        :param min_retries: повторы, доступные всегда (для малых краулов)
+        """
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def record_request(self):
+        """Учитываем первичный запрос (пополняет бюджет)"""
+        self.requests += 1
+
+    def try_acquire(self) -> bool:
+        """Пытаемся взять повтор из бюджета"""
+        if self.retries < self.min_retries + self.ratio * self.requests:
+            self.retries += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def get_stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "rejected": self.rejected,
+        }
+
+
+class RetryQueue:
+    """
+    Очередь отложенных повторов: heap по времени, когда URL снова можно брать.
+    Воркер не спит backoff, а кладёт URL сюда и сразу освобождается.
+    Счётчики попыток (attempts) путешествуют вместе с URL.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self._changed = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, url: str, depth: int, attempts: dict, delay: float):
+        """Планируем повтор URL через delay секунд"""
+        due = time.monotonic() + max(0.0, delay)
+        heapq.heappush(self._heap, (due, next(self._counter), url, depth, attempts))
+        self._drained.clear()
+        self._changed.set()
+
+    def next_due(self) -> float | None:
+        """Через сколько секунд созреет ближайший повтор"""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    @property
+    def drained(self) -> bool:
+        """True, если нет ни ожидающих, ни передаваемых в очередь URL"""
+        return self._drained.is_set()
+
+    async def join(self):
+        """Ждём, пока все отложенные URL будут возвращены в очередь"""
+        await self._drained.wait()
+
+    async def run(self, release: Callable[[str, int, dict], Awaitable[None]]):
+        """
+        Фоновая задача: по наступлении срока отдаёт URL в release(url, depth, attempts).
+        """
+        while True:
+            if not self._heap:
+                self._drained.set()
+                self._changed.clear()
+                await self._changed.wait()
+                continue
+
+            delay = self.next_due()
+            if delay > 0:
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, url, depth, attempts = heapq.heappop(self._heap)
+            await release(url, depth, attempts)
@@ -29,6 +29,28 @@ class RetryStrategy:
         self.strategy = strategy
         self.on_retry = on_retry
 
+    def get_delay(self, exc: Exception, attempt_counts: Dict[Type[Exception], int]) -> Optional[float]:
+        """
+        Считает задержку перед следующей попыткой без ожидания.
+        Увеличивает счётчик attempt_counts для типа ошибки.
+
+        :return: задержка в секундах или None, если повтор не положен
+        """
+        exc_type = type(exc)
+        if exc_type not in self.strategy:
+            return None
+
+        cfg = self.strategy[exc_type]
+        attempt_counts[exc_type] = attempt_counts.get(exc_type, 0) + 1
+        attempt = attempt_counts[exc_type]
+
+        if attempt > cfg.get("max_retries", 0):
+            return None
+
+        delay = cfg.get("backoff_factor", 1.0) ** (attempt - 1)
+        jitter = random.random() * 0.5
+        return delay + jitter
+
     async def execute_with_retry(
             self,
             coro: Callable,
@@ -48,25 +70,16 @@ class RetryStrategy:
             except Exception as exc:
                 exc_type = type(exc)
 
-                if exc_type in self.strategy:
-                    cfg = self.strategy[exc_type]
-                    attempt_counts[exc_type] += 1
-                    attempt = attempt_counts[exc_type]
-
-                    if attempt > cfg.get("max_retries", 0):
-                        if callback:
-                            callback(exc, attempt, exc_type, delay=None, url=url)
-                        raise
-
-                    delay = cfg.get("backoff_factor", 1.0) ** (attempt - 1)
-                    jitter = random.random() * 0.5
-                    total_delay = delay + jitter
+                if exc_type not in self.strategy:
+                    raise
 
-                    if callback:
-                        callback(exc, attempt, exc_type, delay=total_delay, url=url)
+                total_delay = self.get_delay(exc, attempt_counts)
+                attempt = attempt_counts[exc_type]
 
-                    await asyncio.sleep(total_delay)
+                if callback:
+                    callback(exc, attempt, exc_type, delay=total_delay, url=url)
 
-                else:
+                if total_delay is None:
                     raise
 
+                await asyncio.sleep(total_delay)
@@ -1,38 +1,166 @@
+import asyncio
+import time
+from collections import OrderedDict
 import aiohttp
-from urllib.parse import urlparse, urljoin
-import urllib.robotparser as robotparser
+from urllib.parse import urlparse
+
+from crawler.compression import accept_encoding, make_decoder
+from crawler.errors import RobotsUnavailable
+from crawler.logger import setup_crawler_logger
+from crawler.robots_rules import RobotsRules, ALLOW_ALL, parse_robots, url_path
+from crawler.transport import Transport, LiveTransport
+
+logger = setup_crawler_logger()
+
+# как у Google: правила дальше 500 KiB не читаются
+MAX_ROBOTS_SIZE = 500 * 1024
 
 
 class RobotsParser:
-    def __init__(self):
-        self._cache = {}
+    """
+    Сервис robots.txt:
+    - запросы идут через транспорт краулера (transport): robots.txt попадает в архив
+      RecordTransport и воспроизводится ReplayTransport; без транспорта — через session
+    - single-flight: одновременные запросы к одному origin ждут одну загрузку
+    - кэш с TTL; 4xx → «всё разрешено» (обычный TTL),
+      5xx / 429 / сетевые ошибки → RobotsUnavailable на короткий error_ttl:
+      правила неизвестны, краулер откладывает URL, а не запрещает хост
+    - правила компилируются один раз на хост в RobotsRules для self.user_agent;
+      кэш ограничен max_hosts (LRU), сам текст robots.txt не хранится
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        ttl: float = 24 * 3600,
+        error_ttl: float = 600,
+        user_agent: str = "AsyncCrawler/1.0",
+        max_hosts: int = 10_000,
+        transport: Transport | None = None,
+    ):
+        """
+        :param session: общая сессия; если None — создаётся временная на каждую загрузку
+        :param transport: транспорт краулера; если задан, session не используется
+        :param ttl: время жизни успешно загруженного robots.txt (и ответов 4xx)
+        :param error_ttl: через сколько повторять robots.txt после 5xx / 429 / ошибки сети
+        :param max_hosts: сколько хостов держать в кэше (старые вытесняются)
+        """
+        self.session = session
+        self.transport = transport
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.user_agent = user_agent
+        self.max_hosts = max_hosts
+
+        self._cache = OrderedDict()  # {origin: (RobotsRules | None, expires_at)}; None — недоступен
+        self._inflight = {}   # {origin: asyncio.Task}
+        self.stats = {"fetches": 0, "cache_hits": 0, "inflight_joins": 0, "errors": 0}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parsed = urlparse(url)
+        return parsed.scheme + "://" + parsed.netloc
+
+    async def fetch_robots(self, url: str) -> RobotsRules:
+        """
+        Возвращает скомпилированные правила для origin данного URL.
+        Бросает RobotsUnavailable, пока не истёк error_ttl после неудачной загрузки.
+        """
+        origin = self._origin(url)
 
-    async def fetch_robots(self, base_url: str):
-        parsed = urlparse(base_url)
-        domain = parsed.scheme + "://" + parsed.netloc
+        entry = self._cache.get(origin)
+        now = time.monotonic()
+        if entry and entry[1] > now:
+            self._cache.move_to_end(origin)
+            self.stats["cache_hits"] += 1
+            if entry[0] is None:
+                raise RobotsUnavailable(origin, entry[1] - now)
+            return entry[0]
 
-        if domain in self._cache:
-            return self._cache[domain]
+        task = self._inflight.get(origin)
+        if task is None:
+            task = asyncio.create_task(self._load(origin))
+            self._inflight[origin] = task
+            task.add_done_callback(lambda _: self._inflight.pop(origin, None))
+        else:
+            self.stats["inflight_joins"] += 1
 
-        robots_url = urljoin(domain, "/robots.txt")
+        # shield: отмена одного ожидающего воркера не отменяет общую загрузку
+        rules = await asyncio.shield(task)
+        if rules is None:
+            raise RobotsUnavailable(origin, self.error_ttl)
+        return rules
+
+    async def _load(self, origin: str) -> RobotsRules | None:
+        robots_url = origin + "/robots.txt"
+        ttl = self.ttl
+        self.stats["fetches"] += 1
 
-        rp = robotparser.RobotFileParser()
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(robots_url) as resp:
-                    text = await resp.text()
-                    rp.parse(text.splitlines())
-        except Exception:
-            rp.parse([])
+            status, text = await self._get(robots_url)
+            if status == 200:
+                rules = parse_robots(text, self.user_agent)
+            elif status == 429 or status >= 500:
+                logger.warning(f"⚠️ robots.txt unavailable for {origin}: HTTP {status}")
+                self.stats["errors"] += 1
+                rules = None
+                ttl = self.error_ttl
+            else:
+                # 4xx: robots.txt отсутствует — ограничений нет
+                rules = ALLOW_ALL
+        except Exception as e:
+            logger.warning(f"⚠️ robots.txt unavailable for {origin}: {e}")
+            self.stats["errors"] += 1
+            rules = None
+            ttl = self.error_ttl
+
+        self._cache[origin] = (rules, time.monotonic() + ttl)
+        self._cache.move_to_end(origin)
+        while len(self._cache) > self.max_hosts:
+            self._cache.popitem(last=False)
+        return rules
+
+    async def _get(self, robots_url: str) -> tuple[int, str]:
+        if self.transport is not None:
+            return await self._read(self.transport, robots_url)
+        if self.session is not None and not self.session.closed:
+            return await self._read(LiveTransport(self.session), robots_url)
 
-        self._cache[domain] = rp
-        return rp
+        async with aiohttp.ClientSession() as session:
+            return await self._read(LiveTransport(session), robots_url)
 
+    async def _read(self, transport: Transport, robots_url: str) -> tuple[int, str]:
+        headers = {"User-Agent": self.user_agent, "Accept-Encoding": accept_encoding()}
+        async with transport.request(robots_url, headers) as resp:
+            if resp.status != 200:
+                return resp.status, ""
+            decoder = make_decoder(resp.headers.get("Content-Encoding"))
+            chunks, size = [], 0
+            async for raw in resp.content.iter_chunked(16 * 1024):
+                chunk = decoder.decompress(raw, MAX_ROBOTS_SIZE - size)
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_ROBOTS_SIZE:
+                    break
+            else:
+                chunks.append(decoder.flush())
+            return resp.status, b"".join(chunks)[:MAX_ROBOTS_SIZE].decode("utf-8", errors="replace")
+
+    async def prefetch(self, urls: list[str]):
+        """Параллельно загружаем robots.txt для всех origin из списка"""
+        origins = {self._origin(u) for u in urls}
+        await asyncio.gather(*(self.fetch_robots(o) for o in origins), return_exceptions=True)
+
+    # user_agent оставлен для совместимости: правила скомпилированы для self.user_agent
     async def can_fetch(self, url: str, user_agent: str = "*") -> bool:
-        rp = await self.fetch_robots(url)
-        return rp.can_fetch(user_agent, url)
+        rules = await self.fetch_robots(url)
+        return rules.allowed(url_path(url))
 
     async def get_crawl_delay(self, url: str, user_agent: str = "*") -> float:
-        rp = await self.fetch_robots(url)
-        delay = rp.crawl_delay(user_agent)
-        return delay if delay else 0
+        rules = await self.fetch_robots(url)
+        return rules.crawl_delay or 0
+
+    async def get_sitemaps(self, url: str) -> tuple[str, ...]:
+        """Sitemap: строки из robots.txt хоста"""
+        rules = await self.fetch_robots(url)
+        return rules.sitemaps
@@ -0,0 +1,165 @@
+# src/crawler/robots_rules.py
+import re
+from bisect import bisect_right
+from urllib.parse import quote, unquote, urlsplit
+
+# символы, которые не экранируем при нормализации путей
+_SAFE = "/%*$?=&;:@+,!~'()"
+
+
+def _normalize(path: str) -> str:
+    """Приводим путь к единому percent-encoding (как и правила)"""
+    return quote(unquote(path), safe=_SAFE)
+
+
+def url_path(url: str) -> str:
+    """Путь + query из URL в виде, в котором с ним сравниваются правила"""
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    return _normalize(path)
+
+
+def _compile_pattern(path: str) -> re.Pattern:
+    anchored = path.endswith("$")
+    if anchored:
+        path = path[:-1]
+    regex = ".*".join(re.escape(piece) for piece in path.split("*"))
+    if anchored:
+        regex += r"\Z"
+    return re.compile(regex)
+
+
+class RobotsRules:
+    """
+    Скомпилированные правила robots.txt для одного хоста и одного user-agent.
+    - обычные префиксы лежат в отсортированном tuple; bisect находит ближайший
+      ключ <= path, дальше идём по цепочке «родителей» (ключей-префиксов) —
+      первый ключ, который является префиксом path, и есть самое длинное совпадение
+    - правила с * и $ компилируются в regex, перед regex проверяются
+      литеральные начало и (для $) конец шаблона
+    Побеждает самое длинное совпавшее правило; при равной длине — Allow.
+    """
+
+    __slots__ = ("_keys", "_allow", "_parent", "_patterns", "crawl_delay", "sitemaps")
+
+    def __init__(self, rules=(), crawl_delay: float | None = None, sitemaps=()):
+        """
+        :param rules: итерируемое (allow: bool, path: str)
+        """
+        prefix = {}
+        patterns = []
+        for allow, path in rules:
+            if not path:
+                # "Disallow:" без значения ничего не запрещает
+                continue
+            path = _normalize(path)
+            if "*" in path or path.endswith("$"):
+                head = path.split("*", 1)[0].rstrip("$")
+                tail = path[:-1].rsplit("*", 1)[-1] if path.endswith("$") else ""
+                patterns.append((len(path), allow, head, tail, _compile_pattern(path)))
+            else:
+                prefix[path] = prefix.get(path, False) or allow
+
+        keys = sorted(prefix)
+        parent = []
+        stack = []  # индексы ключей, каждый следующий — продолжение предыдущего
+        for i, key in enumerate(keys):
+            while stack and not key.startswith(keys[stack[-1]]):
+                stack.pop()
+            parent.append(stack[-1] if stack else -1)
+            stack.append(i)
+
+        self._keys = tuple(keys)
+        self._allow = tuple(prefix[k] for k in keys)
+        self._parent = tuple(parent)
+        # длинные первыми, при равной длине Allow первым
+        self._patterns = tuple(sorted(patterns, key=lambda p: (-p[0], not p[1])))
+        self.crawl_delay = crawl_delay
+        self.sitemaps = tuple(sitemaps)
+
+    def allowed(self, path: str) -> bool:
+        """Решение по уже нормализованному пути (см. url_path)"""
+        best_len = -1
+        best_allow = True
+
+        keys = self._keys
+        i = bisect_right(keys, path) - 1
+        while i >= 0:
+            key = keys[i]
+            if path.startswith(key):
+                best_len, best_allow = len(key), self._allow[i]
+                break
+            i = self._parent[i]
+
+        for length, allow, head, tail, regex in self._patterns:
+            if length < best_len or (length == best_len and not allow):
+                break
+            if not path.startswith(head) or not path.endswith(tail):
+                continue
+            if regex.match(path):
+                if length > best_len or allow:
+                    best_allow = allow
+                break
+
+        return best_allow
+
+    def can_fetch(self, url: str) -> bool:
+        return self.allowed(url_path(url))
+
+
+ALLOW_ALL = RobotsRules()
+DISALLOW_ALL = RobotsRules([(False, "/")])
+
+
+def parse_robots(text: str, user_agent: str) -> RobotsRules:
+    """
+    Разбирает robots.txt и компилирует правила группы, подходящей user_agent.
+    Группы с совпавшим токеном объединяются; если таких нет — используется "*".
+    """
+    token = user_agent.split("/")[0].strip().lower()
+    groups = []       # [(agents, rules, [crawl_delay])]
+    sitemaps = []
+    current = None
+    last_was_agent = False
+
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        key = key.strip().lower()
+        value = value.strip()
+
+        if key == "user-agent":
+            if current is None or not last_was_agent:
+                current = ([], [], [None])
+                groups.append(current)
+            current[0].append(value.lower())
+            last_was_agent = True
+            continue
+
+        last_was_agent = False
+        if key == "sitemap":
+            if value:
+                sitemaps.append(value)
+        elif current is None:
+            continue
+        elif key in ("allow", "disallow"):
+            current[1].append((key == "allow", value))
+        elif key == "crawl-delay":
+            try:
+                current[2][0] = float(value)
+            except ValueError:
+                pass
+
+    matched = [g for g in groups if any(a != "*" and a in token for a in g[0])]
+    if not matched:
+        matched = [g for g in groups if "*" in g[0]]
+
+    rules = [rule for g in matched for rule in g[1]]
+    delays = [g[2][0] for g in matched if g[2][0] is not None]
+    if not rules and not delays and not sitemaps:
+        return ALLOW_ALL
+    return RobotsRules(rules, crawl_delay=delays[0] if delays else None, sitemaps=sitemaps)
@@ -1,61 +1,244 @@
 # src/crawler/sitemap_parser.py
+import asyncio
+import zlib
 import aiohttp
 import xml.etree.ElementTree as ET
-from urllib.parse import urljoin
+from typing import AsyncIterator, NamedTuple, Optional
+from crawler.compression import accept_encoding, make_decoder
 from crawler.logger import setup_crawler_logger
+from crawler.transport import Transport, LiveTransport
 
 logger = setup_crawler_logger()
 
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    lastmod: Optional[str] = None
+    priority: Optional[float] = None
+
+
+def _decompress(decoder, data: bytes, budget: int) -> bytes:
+    """Распаковывает data, но не больше budget + 1 байт: лишний байт — признак превышения лимита"""
+    out = []
+    size = 0
+    while data and size <= budget:
+        chunk = decoder.decompress(data, budget - size + 1)
+        data = decoder.unconsumed_tail
+        out.append(chunk)
+        size += len(chunk)
+    return b"".join(out)
+
+
+def _local(tag: str) -> str:
+    """'{namespace}url' → 'url'"""
+    return tag.rsplit("}", 1)[-1]
+
+
 class SitemapParser:
     """
-    Парсер sitemap.xml и sitemap index.
+    Потоковый парсер sitemap.xml / sitemap.xml.gz и sitemap index.
+    - тело читается чанками, .gz распаковывается на лету, не больше max_size байт
+    - XMLPullParser + очистка элементов: память не растёт с размером sitemap
+    - дочерние sitemap из index загружаются параллельно (max_concurrency)
+    - URL отдаются по мере разбора через async-итератор iter_urls()
+    - запросы идут через транспорт краулера (transport), если он задан — sitemap
+      записываются RecordTransport и воспроизводятся ReplayTransport
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        max_concurrency: int = 4,
+        chunk_size: int = 64 * 1024,
+        buffer_size: int = 1000,
+        transport: Transport | None = None,
+        max_size: int = 50 * 1024 * 1024,
+    ):
+        """
+        :param session: общая сессия краулера; если None — создаётся своя на время обхода
+        :param transport: транспорт краулера; если задан, session не используется
+        :param max_concurrency: сколько sitemap загружается одновременно
+        :param buffer_size: сколько разобранных URL может ждать потребителя
+        :param max_size: предел распакованного размера одного sitemap (по протоколу — 50 MiB)
+        """
+        self.session = session
+        self.transport = transport
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.max_size = max_size
         self.visited_sitemaps = set()  # чтобы не обрабатывать один sitemap несколько раз
 
     async def fetch_sitemap(self, sitemap_url: str) -> list[str]:
         """
         Загружает sitemap или sitemap index и возвращает список всех URL.
         """
-        if sitemap_url in self.visited_sitemaps:
-            return []
-        self.visited_sitemaps.add(sitemap_url)
+        return [entry.loc async for entry in self.iter_urls([sitemap_url])]
 
-        urls = []
+    async def iter_urls(self, sitemap_urls: list[str]) -> AsyncIterator[SitemapEntry]:
+        """
+        Обходит sitemap (и вложенные index) параллельно, отдавая SitemapEntry по мере разбора.
+        """
+        own_session = None
+        transport = self.transport
+        if transport is None:
+            session = self.session
+            if session is None or session.closed:
+                own_session = session = aiohttp.ClientSession()
+            transport = LiveTransport(session)
 
-        # 🔹 Вот сюда добавляем блок с обработкой ошибок
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(sitemap_url) as resp:
-                    if resp.status != 200:
-                        logger.warning(f"Sitemap not found: {sitemap_url} (status {resp.status})")
-                        return []
-                    text = await resp.text()
-        except Exception as e:
-            logger.error(f"Ошибка при загрузке sitemap {sitemap_url}: {e}")
-            return urls
-
-        # Парсинг XML
+        pending = asyncio.Queue()
+        out = asyncio.Queue(maxsize=self.buffer_size)
+        done = object()
+
+        def add_sitemap(url: str):
+            if url not in self.visited_sitemaps:
+                self.visited_sitemaps.add(url)
+                pending.put_nowait(url)
+
+        async def worker():
+            while True:
+                url = await pending.get()
+                try:
+                    await self._stream(transport, url, out.put, add_sitemap)
+                except Exception as e:
+                    logger.error(f"Ошибка при загрузке sitemap {url}: {e}")
+                finally:
+                    pending.task_done()
+
+        async def finish():
+            await pending.join()
+            await out.put(done)
+
+        for url in sitemap_urls:
+            add_sitemap(url)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(self.max_concurrency)]
+        tasks.append(asyncio.create_task(finish()))
         try:
-            root = ET.fromstring(text)
-        except ET.ParseError:
-            logger.error(f"Ошибка парсинга XML: {sitemap_url}")
-            return urls
-
-        ns = {'sm': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-
-        if root.tag.endswith("sitemapindex"):
-            # Sitemap Index → рекурсивно обрабатываем каждый sitemap
-            for sitemap in root.findall("sm:sitemap", ns):
-                loc = sitemap.find("sm:loc", ns).text
-                if loc:
-                    urls.extend(await self.fetch_sitemap(loc))
-        elif root.tag.endswith("urlset"):
-            # Обычный sitemap
-            for url in root.findall("sm:url", ns):
-                loc = url.find("sm:loc", ns).text
-                if loc:
-                    urls.append(loc)
-
-        return urls
+            while True:
+                entry = await out.get()
+                if entry is done:
+                    break
+                yield entry
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if own_session:
+                await own_session.close()
+
+    async def _stream(self, transport: Transport, sitemap_url: str, on_entry, on_child):
+        async with transport.request(sitemap_url, {"Accept-Encoding": accept_encoding()}) as resp:
+            if resp.status != 200:
+                logger.warning(f"Sitemap not found: {sitemap_url} (status {resp.status})")
+                return
+
+            parser = ET.XMLPullParser(events=("start", "end"))
+            # транспорт отдаёт тело как есть: сначала снимаем Content-Encoding
+            encoding = make_decoder(resp.headers.get("Content-Encoding"))
+            decompressor = None
+            root = None
+            first = True
+            # как в _do_request: считаем распакованные байты на каждом слое, декодер
+            # не разворачивает больше остатка лимита — gzip-бомба не раздует память
+            decoded = size = 0
+
+            async def feed(data: bytes, final: bool = False) -> bool:
+                nonlocal root
+                try:
+                    if data:
+                        parser.feed(data)
+                    if final:
+                        parser.close()
+                    events = list(parser.read_events())
+                except ET.ParseError:
+                    logger.error(f"Ошибка парсинга XML: {sitemap_url}")
+                    return False
+
+                for event, elem in events:
+                    if event == "start":
+                        if root is None:
+                            root = elem
+                        continue
+
+                    tag = _local(elem.tag)
+                    if tag == "url":
+                        entry = self._entry(elem)
+                        if entry:
+                            await on_entry(entry)
+                    elif tag == "sitemap":
+                        entry = self._entry(elem)
+                        if entry:
+                            on_child(entry.loc)
+                    else:
+                        continue
+
+                    # выбрасываем разобранные элементы, чтобы не держать весь документ
+                    elem.clear()
+                    if root is not None:
+                        root.clear()
+                return True
+
+            def too_large() -> bool:
+                if decoded > self.max_size or size > self.max_size:
+                    logger.warning(f"✂️ Sitemap larger than {self.max_size} bytes, rest skipped: {sitemap_url}")
+                    return True
+                return False
+
+            async for raw in resp.content.iter_chunked(self.chunk_size):
+                chunk = _decompress(encoding, raw, self.max_size - decoded)
+                decoded += len(chunk)
+                if not chunk:
+                    continue
+                if first:
+                    # .xml.gz отдают как обычный файл без Content-Encoding
+                    if chunk[:2] == GZIP_MAGIC:
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                    first = False
+                if decompressor:
+                    chunk = _decompress(decompressor, chunk, self.max_size - size)
+                size += len(chunk)
+                if size > self.max_size:
+                    # разбираем то, что уместилось в лимит, остальное отбрасываем
+                    chunk = chunk[:self.max_size - size]
+                if not await feed(chunk) or too_large():
+                    return
+
+            # хвосты потоковых декодеров: без них конец документа теряется
+            tail = encoding.flush()
+            decoded += len(tail)
+            if first and tail[:2] == GZIP_MAGIC:
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            if decompressor:
+                budget = self.max_size - size
+                tail = _decompress(decompressor, tail, budget)
+                if len(tail) <= budget:
+                    # вход израсходован целиком — flush отдаст только буфер zlib
+                    tail += decompressor.flush()
+            size += len(tail)
+            if size > self.max_size:
+                tail = tail[:self.max_size - size]
+            # оборванный по лимиту документ не закрываем — это дало бы ошибку парсинга
+            await feed(tail, final=not too_large())
+
+    @staticmethod
+    def _entry(elem) -> Optional[SitemapEntry]:
+        loc = lastmod = priority = None
+        for child in elem:
+            tag = _local(child.tag)
+            text = (child.text or "").strip()
+            if tag == "loc":
+                loc = text
+            elif tag == "lastmod":
+                lastmod = text or None
+            elif tag == "priority":
+                try:
+                    priority = float(text)
+                except ValueError:
+                    pass
+        if not loc:
+            return None
+        return SitemapEntry(loc, lastmod, priority)
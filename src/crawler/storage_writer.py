@@ -0,0 +1,147 @@
+# src/crawler/storage_writer.py
+import asyncio
+
+from storage.base import DataStorage
+from .logger import setup_crawler_logger
+
+logger = setup_crawler_logger()
+
+_STOP = object()
+
+
+class StorageWriter:
+    """
+    Фоновая запись в storage, отвязанная от воркеров краулера.
+    - воркер кладёт запись в ограниченную очередь (submit) и сразу идёт дальше;
+      ждёт только если очередь заполнена (backpressure)
+    - задача-писатель забирает записи пачками до batch_size, повторяет
+      неудачные save() с паузой retry_delay — паузы больше не занимают воркер.
+      Ошибка save() значит, что запись не принята (см. DataStorage.save), поэтому
+      повтор её не задваивает; упавший сброс буфера повторяется только через flush()
+    - storage.flush() — когда с прошлого сброса накопилось batch_size записей
+      или прошло flush_interval секунд
+    - close() дописывает всё, что осталось в очереди, и делает финальный flush
+    """
+
+    def __init__(
+        self,
+        storage: DataStorage,
+        queue_size: int = 1000,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        retries: int = 3,
+        retry_delay: float = 1.0,
+    ):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: asyncio.Task | None = None
+        self._unflushed = 0
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "failed": 0,
+            "retries": 0,
+            "flushes": 0,
+            "queue_max": 0,
+        }
+
+    @property
+    def depth(self) -> int:
+        """Текущая глубина очереди"""
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="storage-writer")
+
+    async def submit(self, data: dict):
+        await self._put(("save", data))
+
+    async def submit_raw(self, exchange: dict):
+        await self._put(("raw", exchange))
+
+    async def _put(self, item):
+        if self._task is None or self._task.done():
+            raise RuntimeError("StorageWriter не запущен")
+        await self._queue.put(item)
+        self.stats["submitted"] += 1
+        self.stats["queue_max"] = max(self.stats["queue_max"], self._queue.qsize())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        last_flush = loop.time()
+        stopping = False
+
+        while not stopping:
+            batch = []
+            timeout = max(0.0, self.flush_interval - (loop.time() - last_flush))
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+            except asyncio.TimeoutError:
+                pass
+
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    await self._write(*item)
+                self._queue.task_done()
+
+            if self._unflushed and (
+                stopping
+                or self._unflushed >= self.batch_size
+                or loop.time() - last_flush >= self.flush_interval
+            ):
+                await self._flush()
+                last_flush = loop.time()
+            elif not self._unflushed:
+                # сбрасывать нечего — таймер отсчитываем от следующей записи
+                last_flush = loop.time()
+
+    async def _write(self, kind: str, data: dict):
+        for attempt in range(1, self.retries + 1):
+            try:
+                if kind == "raw":
+                    await self.storage.save_raw(data)
+                else:
+                    await self.storage.save(data)
+                self.stats["written"] += 1
+                self._unflushed += 1
+                return
+            except Exception as e:
+                if attempt < self.retries:
+                    self.stats["retries"] += 1
+                    logger.warning(f"Save attempt {attempt} failed for {data.get('url')}: {e}")
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    self.stats["failed"] += 1
+                    logger.error(f"Failed to save after {self.retries} attempts: {data.get('url')}")
+
+    async def _flush(self):
+        try:
+            await self.storage.flush()
+            self.stats["flushes"] += 1
+            self._unflushed = 0
+        except Exception as e:
+            # буфер хранилища не потерян — попробуем на следующем сбросе
+            logger.error(f"Storage flush failed: {e}")
+
+    async def close(self):
+        """Дожидаемся записи всего, что уже в очереди, и останавливаем писателя"""
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        if not task.done():
+            await self._queue.put(_STOP)
+        await task
@@ -0,0 +1,225 @@
+# src/crawler/transport.py
+import asyncio
+import json
+import mmap
+import os
+import struct
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+
+import aiofiles
+import aiohttp
+from aiohttp import RequestInfo
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+from crawler.logger import setup_crawler_logger
+
+logger = setup_crawler_logger()
+
+# Формат архива: [4 байта длина заголовка][JSON-заголовок][тело как пришло по сети]
+# В заголовке: url, final_url, status, headers (пары), history, body_len, elapsed
+_LEN = struct.Struct(">I")
+
+
+class Transport(ABC):
+    """
+    Слой под всеми HTTP-запросами краулера (страницы, robots.txt, sitemap):
+    request() — async context manager, отдающий объект с интерфейсом
+    aiohttp.ClientResponse, который использует краулер
+    (status, headers, url, history, content.iter_chunked, raise_for_status).
+    Тело отдаётся как пришло по сети — Content-Encoding снимает вызывающий.
+    """
+
+    def bind(self, session: aiohttp.ClientSession):
+        """Вызывается из AsyncCrawler.__aenter__ с сессией краулера"""
+
+    @abstractmethod
+    def request(self, url: str, headers: dict):
+        pass
+
+    async def close(self):
+        pass
+
+
+class LiveTransport(Transport):
+    """Обычные запросы через aiohttp (поведение по умолчанию)"""
+
+    def __init__(self, session: aiohttp.ClientSession | None = None):
+        self.session = session
+
+    def bind(self, session):
+        self.session = session
+
+    def request(self, url: str, headers: dict):
+        # распаковку делает краулер: так видны байты «на проводе»
+        return self.session.get(url, headers=headers, auto_decompress=False)
+
+
+class _RecordingContent:
+    def __init__(self, content, sink: list):
+        self._content = content
+        self._sink = sink
+
+    async def iter_chunked(self, n: int):
+        async for chunk in self._content.iter_chunked(n):
+            self._sink.append(chunk)
+            yield chunk
+
+
+class _RecordingResponse:
+    """Прокси ClientResponse: всё как у оригинала, но прочитанные чанки копируются"""
+
+    def __init__(self, response, sink: list):
+        self._response = response
+        self.content = _RecordingContent(response.content, sink)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class RecordTransport(LiveTransport):
+    """
+    Live + запись каждого ответа в архив.
+    Пишется ровно то, что прочитал краулер: если тело оборвано по max_body_size
+    или отброшено по Content-Type, в архиве окажется тот же префикс.
+    """
+
+    def __init__(self, path: str, session: aiohttp.ClientSession | None = None):
+        super().__init__(session)
+        self.path = path
+        self._file = None
+        self._lock = asyncio.Lock()
+        self.recorded = 0
+
+    @asynccontextmanager
+    async def request(self, url: str, headers: dict):
+        chunks = []
+        start = time.monotonic()
+        async with self.session.get(url, headers=headers, auto_decompress=False) as response:
+            try:
+                yield _RecordingResponse(response, chunks)
+            finally:
+                await self._write(url, response, b"".join(chunks), time.monotonic() - start)
+
+    async def _write(self, url: str, response, body: bytes, elapsed: float):
+        header = json.dumps({
+            "url": url,
+            "final_url": str(response.url),
+            "status": response.status,
+            "headers": list(response.headers.items()),
+            "history": [str(r.url) for r in response.history],
+            "body_len": len(body),
+            "elapsed": round(elapsed, 4),
+        }, ensure_ascii=False).encode("utf-8")
+
+        async with self._lock:
+            if self._file is None:
+                self._file = await aiofiles.open(self.path, "ab")
+            await self._file.write(_LEN.pack(len(header)) + header + body)
+            self.recorded += 1
+
+    async def close(self):
+        async with self._lock:
+            if self._file:
+                await self._file.close()
+                self._file = None
+
+
+class _ReplayContent:
+    """Тело читается из mmap чанками — целиком в память не копируется"""
+
+    def __init__(self, buf, offset: int = 0, length: int = 0):
+        self._buf = buf
+        self._offset = offset
+        self._length = length
+
+    async def iter_chunked(self, n: int):
+        end = self._offset + self._length
+        for i in range(self._offset, end, n):
+            yield self._buf[i:min(i + n, end)]
+
+
+class _Hop:
+    def __init__(self, url: str):
+        self.url = URL(url)
+
+
+class _ReplayResponse:
+    def __init__(self, meta: dict, content: _ReplayContent):
+        self.status = meta["status"]
+        self.headers = CIMultiDictProxy(CIMultiDict(meta["headers"]))
+        self.url = URL(meta["final_url"])
+        self.history = tuple(_Hop(u) for u in meta["history"])
+        self.content = content
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            info = RequestInfo(self.url, "GET", CIMultiDictProxy(CIMultiDict()), self.url)
+            raise aiohttp.ClientResponseError(info, self.history, status=self.status, headers=self.headers)
+
+
+class ReplayTransport(Transport):
+    """
+    Ответы из архива RecordTransport, без сети.
+    latency — фиксированная задержка на запрос; realtime=True — задержка как при записи.
+    URL, которого нет в архиве, получает 404 (заголовок X-Replay-Miss).
+    """
+
+    def __init__(self, path: str, latency: float = 0.0, realtime: bool = False):
+        self.path = path
+        self.latency = latency
+        self.realtime = realtime
+        self._index: dict[str, tuple[dict, int]] = {}
+        self._mmap = None
+        self._fh = None
+        self.stats = {"hits": 0, "misses": 0}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            logger.warning(f"Replay archive is empty: {self.path}")
+            return
+        self._fh = open(self.path, "rb")
+        self._mmap = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        pos, size = 0, len(self._mmap)
+        while pos + _LEN.size <= size:
+            (header_len,) = _LEN.unpack_from(self._mmap, pos)
+            pos += _LEN.size
+            meta = json.loads(self._mmap[pos:pos + header_len])
+            pos += header_len
+            # последняя запись по URL побеждает (повторы после ошибок)
+            self._index[meta["url"]] = (meta, pos)
+            pos += meta["body_len"]
+
+    def bind(self, session):
+        # архив мог быть закрыт предыдущим краулером — открываем заново
+        if self._mmap is None:
+            self._index.clear()
+            self._load()
+
+    def __len__(self):
+        return len(self._index)
+
+    @asynccontextmanager
+    async def request(self, url: str, headers: dict):
+        entry = self._index.get(url)
+        if entry is None:
+            self.stats["misses"] += 1
+            meta = {"url": url, "final_url": url, "status": 404, "headers": [("X-Replay-Miss", "1")], "history": []}
+            yield _ReplayResponse(meta, _ReplayContent(b""))
+            return
+
+        meta, offset = entry
+        self.stats["hits"] += 1
+        delay = meta["elapsed"] if self.realtime else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        yield _ReplayResponse(meta, _ReplayContent(self._mmap, offset, meta["body_len"]))
+
+    async def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._fh.close()
+            self._mmap = self._fh = None
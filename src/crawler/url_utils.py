@@ -0,0 +1,22 @@
+# src/crawler/url_utils.py
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Канонический вид URL для ключей кэша и дедупликации:
+    - схема и хост в нижнем регистре, порт по умолчанию убирается
+    - фрагмент (#...) отбрасывается, пустой путь → "/"
+    Query не сортируется: порядок параметров может быть значимым для сайта.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    if parts.username:
+        auth = parts.username + (f":{parts.password}" if parts.password else "")
+        host = f"{auth}@{host}"
+    return urlunsplit((scheme, host, parts.path or "/", parts.query, ""))
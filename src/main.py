@@ -4,6 +4,8 @@ from crawler.config_loader import ConfigLoader
 from storage.json_storage import JSONStorage
 from storage.csv_storage import CSVStorage
 from storage.sqlite_storage import SQLiteStorage
+from storage.parquet_storage import ParquetStorage
+from storage.multi_storage import MultiStorage
 
 
 async def main():
@@ -19,11 +21,21 @@ async def main():
 
     if storage_config.get("json", {}).get("enabled"):
         s = storage_config["json"]
-        storages.append(JSONStorage(s["filename"], batch_size=s.get("batch_size", 50)))
+        storages.append(JSONStorage(
+            s["filename"],
+            batch_size=s.get("batch_size", 50),
+            compression=s.get("compression"),
+            max_file_size=s.get("max_file_size"),
+            max_records=s.get("max_records"),
+        ))
 
     if storage_config.get("csv", {}).get("enabled"):
         s = storage_config["csv"]
-        storages.append(CSVStorage(s["filename"], delimiter=s.get("delimiter", ",")))
+        storages.append(CSVStorage(
+            s["filename"],
+            delimiter=s.get("delimiter", ","),
+            flatten=s.get("flatten", "json"),
+        ))
 
     if storage_config.get("sqlite", {}).get("enabled"):
         s = storage_config["sqlite"]
@@ -31,9 +43,20 @@ async def main():
         await sqlite_store.init_db()
         storages.append(sqlite_store)
 
-    # 🔹 Объединяем в один объект (пример: используем JSONStorage, можно добавить MultiStorage)
-    # Для простоты берем первое хранилище
-    storage = storages[0] if storages else None
+    if storage_config.get("parquet", {}).get("enabled"):
+        s = storage_config["parquet"]
+        storages.append(ParquetStorage(
+            s["path"],
+            format=s.get("format", "parquet"),
+            row_group_size=s.get("row_group_size", 10_000),
+            compression=s.get("compression", "zstd"),
+        ))
+
+    # 🔹 Объединяем в один объект: запись во все хранилища параллельно, у каждого своя очередь
+    if len(storages) > 1:
+        storage = MultiStorage(storages, queue_size=storage_config.get("queue_size", 1000))
+    else:
+        storage = storages[0] if storages else None
 
     # 🔹 Инициализация краулера
     crawler = AsyncCrawler(
@@ -7,11 +7,37 @@ from .base import DataStorage
 from .json_storage import JSONStorage
 from .csv_storage import CSVStorage
 from .sqlite_storage import SQLiteStorage
+from .warc_storage import WARCStorage
+from .blob_store import BlobStore
+from .parquet_storage import ParquetStorage
+from .multi_storage import MultiStorage
+
+# Чтение сохранённых результатов
+from .readers import (
+    RecordFilter,
+    JSONLReader,
+    ManifestReader,
+    CSVReader,
+    SQLiteReader,
+    ParquetReader,
+    open_reader,
+)
 
 # Явно указываем, что экспортируется при импорте *
 __all__ = [
     "DataStorage",
     "JSONStorage",
     "CSVStorage",
-    "SQLiteStorage"
+    "SQLiteStorage",
+    "WARCStorage",
+    "BlobStore",
+    "ParquetStorage",
+    "MultiStorage",
+    "RecordFilter",
+    "JSONLReader",
+    "ManifestReader",
+    "CSVReader",
+    "SQLiteReader",
+    "ParquetReader",
+    "open_reader"
 ]
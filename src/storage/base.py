@@ -1,11 +1,70 @@
+import logging
 from abc import ABC, abstractmethod
 
+logger = logging.getLogger(__name__)
+
 
 class DataStorage(ABC):
+    # True — хранилищу нужен сырой HTTP-обмен: краулер сохранит байты «с провода»
+    # и передаст их в save_raw() (см. WARCStorage)
+    wants_raw: bool = False
+    # задаётся, если тела страниц выносятся в BlobStore: краулер передаёт
+    # в save() поле "body", а в запись попадает только body_hash
+    blob_store = None
+
+    @property
+    def wants_body(self) -> bool:
+        return self.blob_store is not None
 
     @abstractmethod
     async def save(self, data: dict) -> None:
-        pass
+        """
+        Принять запись. Исключение из save() значит, что запись НЕ принята и save()
+        можно повторить. Принятая запись уже в буфере: если сброс пачки не удался,
+        пачка остаётся в буфере, а ошибку поднимет flush() / close() — повторять
+        после неё нужно flush(), не save() (иначе запись задвоится).
+        """
+
+    async def save_raw(self, exchange: dict) -> None:
+        """
+        Сырой HTTP-обмен: url, status, request_headers, response_headers (пары),
+        body (байты как пришли по сети), truncated, fetched_at.
+        По умолчанию игнорируется.
+        """
+
+    async def flush(self) -> None:
+        """
+        Сбросить буфер на диск, не закрывая хранилище.
+        Вызывается писателем краулера по таймеру (см. StorageWriter). По умолчанию ничего не делает.
+        """
+
+    async def _flush_accepted(self, flush) -> None:
+        """Сброс, запущенный из save(): запись уже в буфере, поэтому ошибка только логируется"""
+        try:
+            await flush()
+        except Exception as e:
+            logger.error(f"❌ {type(self).__name__}: batch write failed, kept in buffer until next flush: {e}")
+
+    async def _externalize_body(self, data: dict) -> dict:
+        """Сырое тело → BlobStore, в записи вместо него body_hash; извлечённый text остаётся (нужен FTS и выгрузкам)"""
+        if self.blob_store is None or "body" not in data:
+            return data
+        data = dict(data)
+        body = data.pop("body")
+        data["body_hash"] = await self.blob_store.put(data["url"], body)
+        return data
+
+    async def _sync_blob_store(self, close: bool = False) -> None:
+        """
+        Индекс BlobStore пишется пачками по batch_size: без flush / close хвост
+        теряется. Закрытие безопасно и для общего BlobStore — put() откроет его снова.
+        """
+        if self.blob_store is None:
+            return
+        if close:
+            await self.blob_store.close()
+        else:
+            await self.blob_store.flush()
 
     @abstractmethod
     async def close(self) -> None:
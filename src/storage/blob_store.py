@@ -0,0 +1,197 @@
+# crawler/storage/blob_store.py
+import asyncio
+import hashlib
+import os
+import zlib
+from datetime import datetime
+
+import aiofiles
+import aiosqlite
+
+
+def blob_hash(body: bytes) -> str:
+    """Адрес тела: blake2b-160 (40 hex) — коллизии на миллиардах страниц исключены"""
+    return hashlib.blake2b(body, digest_size=20).hexdigest()
+
+
+class BlobStore:
+    """
+    Content-addressed хранилище тел страниц.
+    - тело лежит один раз: <directory>/ab/cd/<hash>.z (zlib)
+    - индекс SQLite: blobs(hash, size, stored_size, refs) и urls(url → hash)
+    - refs = число URL, указывающих на тело; при смене тела у URL старое теряет ссылку,
+      файлы без ссылок удаляет gc()
+    - изменения индекса копятся в памяти и пишутся пачкой (executemany + один commit)
+      каждые batch_size тел, во flush() и close(); сжатие — в потоке, вне event loop
+    Записи JSONStorage / SQLiteStorage хранят только body_hash — страницу можно
+    переразобрать новым экстрактором без повторной загрузки.
+    """
+
+    def __init__(self, directory: str, compression_level: int = 6, batch_size: int = 100):
+        self.directory = directory
+        self.compression_level = compression_level
+        self.batch_size = batch_size
+        self._conn = None
+        self._lock = asyncio.Lock()
+        # ещё не записанные изменения индекса
+        self._new_blobs: dict[str, tuple] = {}   # hash → (size, stored_size, created_at)
+        self._ref_delta: dict[str, int] = {}     # hash → изменение refs
+        self._urls: dict[str, str] = {}          # url → hash
+        self._pending = 0
+        self.stats = {"puts": 0, "dedup_hits": 0, "bytes_in": 0, "bytes_stored": 0}
+
+    async def _ensure_open(self):
+        if self._conn:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = await aiosqlite.connect(os.path.join(self.directory, "index.db"))
+        await self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                size INTEGER,
+                stored_size INTEGER,
+                refs INTEGER,
+                created_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                hash TEXT
+            );
+        """)
+        await self._conn.commit()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest + ".z")
+
+    async def _url_hash(self, url: str) -> str | None:
+        if url in self._urls:
+            return self._urls[url]
+        async with self._conn.execute("SELECT hash FROM urls WHERE url = ?", (url,)) as cur:
+            row = await cur.fetchone()
+        return row[0] if row else None
+
+    async def _blob_exists(self, digest: str) -> bool:
+        if digest in self._new_blobs:
+            return True
+        async with self._conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (digest,)) as cur:
+            return await cur.fetchone() is not None
+
+    async def put(self, url: str, body: bytes) -> str:
+        """Сохраняет тело для URL и возвращает его hash; одинаковые тела пишутся один раз"""
+        await self._ensure_open()
+        digest = blob_hash(body)
+        self.stats["puts"] += 1
+        self.stats["bytes_in"] += len(body)
+
+        async with self._lock:
+            previous = await self._url_hash(url)
+            if previous == digest:
+                self.stats["dedup_hits"] += 1
+                return digest
+
+            if await self._blob_exists(digest):
+                self.stats["dedup_hits"] += 1
+            else:
+                data = await asyncio.to_thread(zlib.compress, body, self.compression_level)
+                await self._write_file(self._path(digest), data)
+                self.stats["bytes_stored"] += len(data)
+                self._new_blobs[digest] = (len(body), len(data), datetime.utcnow().isoformat())
+
+            self._ref_delta[digest] = self._ref_delta.get(digest, 0) + 1
+            if previous:
+                self._ref_delta[previous] = self._ref_delta.get(previous, 0) - 1
+            self._urls[url] = digest
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                await self._flush()
+        return digest
+
+    async def _flush(self):
+        """Накопленные изменения индекса — одной транзакцией"""
+        if not self._pending or not self._conn:
+            return
+        await self._conn.executemany(
+            "INSERT INTO blobs VALUES (?, ?, ?, 0, ?)",
+            [(digest, *meta) for digest, meta in self._new_blobs.items()]
+        )
+        await self._conn.executemany(
+            "UPDATE blobs SET refs = refs + ? WHERE hash = ?",
+            [(delta, digest) for digest, delta in self._ref_delta.items() if delta]
+        )
+        await self._conn.executemany("INSERT OR REPLACE INTO urls VALUES (?, ?)", list(self._urls.items()))
+        await self._conn.commit()
+        self._new_blobs.clear()
+        self._ref_delta.clear()
+        self._urls.clear()
+        self._pending = 0
+
+    async def flush(self):
+        """Записать накопленные изменения индекса, не дожидаясь batch_size"""
+        async with self._lock:
+            await self._flush()
+
+    @staticmethod
+    async def _write_file(path: str, data: bytes):
+        # через временный файл: читатель никогда не увидит недописанное тело
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        async with aiofiles.open(tmp, "wb") as f:
+            await f.write(data)
+        os.replace(tmp, path)
+
+    async def get(self, digest: str) -> bytes | None:
+        path = self._path(digest)
+        if not os.path.exists(path):
+            return None
+        async with aiofiles.open(path, "rb") as f:
+            return zlib.decompress(await f.read())
+
+    async def get_for_url(self, url: str) -> bytes | None:
+        await self._ensure_open()
+        digest = await self._url_hash(url)
+        return await self.get(digest) if digest else None
+
+    async def release(self, url: str):
+        """URL больше не хранится — снимаем его ссылку с тела"""
+        await self._ensure_open()
+        async with self._lock:
+            await self._flush()
+            async with self._conn.execute("SELECT hash FROM urls WHERE url = ?", (url,)) as cur:
+                row = await cur.fetchone()
+            if not row:
+                return
+            await self._conn.execute("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", (row[0],))
+            await self._conn.execute("DELETE FROM urls WHERE url = ?", (url,))
+            await self._conn.commit()
+
+    async def gc(self) -> int:
+        """Удаляет тела без ссылок; возвращает число удалённых"""
+        await self._ensure_open()
+        async with self._lock:
+            await self._flush()
+            async with self._conn.execute("SELECT hash FROM blobs WHERE refs <= 0") as cur:
+                orphans = [row[0] for row in await cur.fetchall()]
+            for digest in orphans:
+                try:
+                    os.remove(self._path(digest))
+                except FileNotFoundError:
+                    pass
+            await self._conn.executemany("DELETE FROM blobs WHERE hash = ?", [(d,) for d in orphans])
+            await self._conn.commit()
+        return len(orphans)
+
+    async def get_stats(self) -> dict:
+        await self._ensure_open()
+        await self.flush()
+        async with self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored_size), 0) FROM blobs") as cur:
+            blobs, size, stored = await cur.fetchone()
+        async with self._conn.execute("SELECT COUNT(*) FROM urls") as cur:
+            (urls,) = await cur.fetchone()
+        return {**self.stats, "blobs": blobs, "urls": urls, "unique_bytes": size, "stored_bytes": stored}
+
+    async def close(self):
+        if self._conn:
+            async with self._lock:
+                await self._flush()
+            await self._conn.close()
+            self._conn = None
@@ -1,13 +1,120 @@
 import aiofiles
 import asyncio
-import csv
-import io
+import glob
+import json
+import os
+import re
+from datetime import datetime
 from .base import DataStorage
 
+try:
+    import orjson  # опционально: быстрее json для ячеек с вложенными полями
+except ImportError:
+    orjson = None
+
+FLATTEN_STRATEGIES = ("json", "dotted", "join")
+
+# json.dumps с параметрами создаёт новый JSONEncoder на каждый вызов — держим один
+_encode_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str).encode
+
+
+def _json_cell(value) -> str:
+    if orjson is not None:
+        return orjson.dumps(value, default=str).decode()
+    return _encode_json(value)
+
+
+def _scalar(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def flatten_record(data: dict, strategy: str = "json", list_separator: str = "|") -> dict:
+    """
+    Запись → плоская строка CSV.
+    - json:   вложенные dict / list — компактный JSON в одной ячейке
+    - dotted: dict раскрывается в колонки parent.child, list — JSON
+    - join:   как dotted, но list скаляров склеивается через list_separator
+    """
+    row = {}
+    _flatten_into(row, "", data, strategy, list_separator)
+    return row
+
+
+def _flatten_into(row: dict, prefix: str, data: dict, strategy: str, sep: str):
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            if strategy == "json" or not value:
+                row[name] = _json_cell(value)
+            else:
+                _flatten_into(row, name + ".", value, strategy, sep)
+        elif isinstance(value, (list, tuple, set)):
+            items = list(value)
+            if strategy == "join" and all(not isinstance(v, (dict, list, tuple, set)) for v in items):
+                row[name] = sep.join(str(_scalar(v)) for v in items)
+            else:
+                row[name] = _json_cell(items)
+        else:
+            row[name] = _scalar(value)
+
+
+def _rotated_path(filepath: str, serial: int) -> str:
+    stem, ext = os.path.splitext(filepath)
+    return f"{stem}-{serial:05d}{ext or '.csv'}"
+
+
+def rotated_files(filepath: str) -> list[str]:
+    """Файлы CSVStorage на диске по порядку: <имя>.csv, <имя>-00001.csv, ... (в том числе прошлых запусков)"""
+    stem, ext = os.path.splitext(filepath)
+    pattern = f"{glob.escape(stem)}-[0-9][0-9][0-9][0-9][0-9]{glob.escape(ext or '.csv')}"
+    files = [filepath] if os.path.exists(filepath) else []
+    return files + sorted(glob.glob(pattern))
+
+
+class RowEncoder:
+    """
+    Кодировщик строк CSV с правилами csv.QUOTE_MINIMAL.
+    Поле в кавычках, только если в нём есть разделитель, кавычка или перевод строки —
+    проверка одним regex-поиском вместо посимвольного прохода csv.writer,
+    что заметно на длинных полях вроде text.
+    """
+
+    def __init__(self, fieldnames: list[str], delimiter: str = ",", lineterminator: str = "\r\n"):
+        self.fieldnames = fieldnames
+        self.delimiter = delimiter
+        self.lineterminator = lineterminator
+        self._needs_quotes = re.compile("[" + re.escape(delimiter) + '"\r\n]').search
+
+    def _cell(self, value) -> str:
+        text = value if type(value) is str else ("" if value is None else str(value))
+        if self._needs_quotes(text):
+            return '"' + text.replace('"', '""') + '"'
+        return text
+
+    def header(self) -> str:
+        return self.delimiter.join(map(self._cell, self.fieldnames)) + self.lineterminator
+
+    def encode(self, rows: list[dict]) -> str:
+        cell, fields, join = self._cell, self.fieldnames, self.delimiter.join
+        lines = [join([cell(row.get(f, "")) for f in fields]) for row in rows]
+        if len(fields) == 1:
+            # как csv.writer: пустое единственное поле — "", иначе строка была бы пустой
+            lines = [line or '""' for line in lines]
+        lines.append("")
+        return self.lineterminator.join(lines)
+
 
 class CSVStorage(DataStorage):
     """
     Асинхронное CSV-хранилище с поддержкой batch-записи.
+    - вложенные поля (links, metadata, headers, ...) раскладываются стратегией flatten
+    - заголовок берётся из первой записи; запись с новыми колонками закрывает текущий
+      файл и открывает следующий (<имя>-00001.csv) с расширенным заголовком
+    - один RowEncoder на файл: строки собираются без DictWriter и StringIO на каждый flush
     """
 
     def __init__(
@@ -16,26 +123,66 @@ class CSVStorage(DataStorage):
         encoding: str = "utf-8",
         delimiter: str = ",",
         batch_size: int = 50,
+        flatten: str = "json",
+        list_separator: str = "|",
     ):
+        if flatten not in FLATTEN_STRATEGIES:
+            raise ValueError(f"Неизвестная стратегия flatten: {flatten}")
         self.filepath = filepath
         self.encoding = encoding
         self.delimiter = delimiter
         self.batch_size = batch_size
+        self.flatten = flatten
+        self.list_separator = list_separator
 
         self._file = None
         self._lock = asyncio.Lock()
         self._headers_written = False
         self._fieldnames = None
+        self._field_set = set()
         self._buffer = []
+        self._encoder = None
+
+        self._serial = 0
+        self.current_path = filepath
+        self.files = [filepath]
 
     async def _ensure_open(self):
-        if not self._file:
-            self._file = await aiofiles.open(
-                self.filepath,
-                mode="a",
-                encoding=self.encoding,
-                newline=""
-            )
+        if self._file:
+            return
+        if not self._headers_written and os.path.exists(self.current_path) and os.path.getsize(self.current_path):
+            # файл прошлого запуска: дописываем в него, только если заголовок тот же,
+            # иначе второй заголовок оказался бы посреди файла
+            async with aiofiles.open(self.current_path, encoding=self.encoding, newline="") as f:
+                first_line = await f.readline()
+            if first_line == RowEncoder(self._fieldnames, self.delimiter).header():
+                self._headers_written = True
+            else:
+                self.files.remove(self.current_path)
+                self._next_file()
+        self._file = await aiofiles.open(
+            self.current_path,
+            mode="a",
+            encoding=self.encoding,
+            newline=""
+        )
+
+    def _next_file(self):
+        # номер — следующий свободный: после перезапуска не дописываем в чужой -00001.csv
+        self._serial += 1
+        while os.path.exists(_rotated_path(self.filepath, self._serial)):
+            self._serial += 1
+        self.current_path = _rotated_path(self.filepath, self._serial)
+        self.files.append(self.current_path)
+
+    def _encode(self, rows: list[dict]) -> str:
+        if self._encoder is None or self._encoder.fieldnames is not self._fieldnames:
+            self._encoder = RowEncoder(self._fieldnames, self.delimiter)
+        data = self._encoder.encode(rows)
+        if not self._headers_written:
+            data = self._encoder.header() + data
+            self._headers_written = True
+        return data
 
     async def _flush(self):
         """
@@ -47,35 +194,48 @@ class CSVStorage(DataStorage):
         await self._ensure_open()
 
         async with self._lock:
-            output = io.StringIO()
-            writer = csv.DictWriter(
-                output,
-                fieldnames=self._fieldnames,
-                delimiter=self.delimiter,
-                quoting=csv.QUOTE_MINIMAL
-            )
-
-            if not self._headers_written:
-                writer.writeheader()
-                self._headers_written = True
+            rows, self._buffer = self._buffer, []
+            headers_written = self._headers_written
+            try:
+                await self._file.write(self._encode(rows))
+            except Exception:
+                # запись не удалась — строки (и заголовок) уйдут в следующий flush
+                self._buffer[:0] = rows
+                self._headers_written = headers_written
+                raise
 
-            for row in self._buffer:
-                writer.writerow(row)
+    async def _rotate(self, new_fields: list[str]):
+        """Новые колонки: дописываем буфер в текущий файл и начинаем следующий с расширенным заголовком"""
+        await self._flush()
+        if self._file:
+            await self._file.close()
+            self._file = None
 
-            await self._file.write(output.getvalue())
-            self._buffer = []
+        self._next_file()
+        self._fieldnames = self._fieldnames + new_fields
+        self._field_set.update(new_fields)
+        self._headers_written = False
 
     async def save(self, data: dict) -> None:
         """
         Добавляем запись в буфер. Если буфер достиг batch_size, сбрасываем в файл.
+        Ошибка этого сброса не поднимается: строки остаются в буфере до flush() / close().
         """
-        if not self._fieldnames:
-            self._fieldnames = list(data.keys())
+        row = flatten_record(data, self.flatten, self.list_separator)
+
+        if self._fieldnames is None:
+            self._fieldnames = list(row)
+            self._field_set = set(row)
+        elif not self._field_set.issuperset(row):
+            await self._rotate([k for k in row if k not in self._field_set])
 
-        self._buffer.append(data)
+        self._buffer.append(row)
 
         if len(self._buffer) >= self.batch_size:
-            await self._flush()
+            await self._flush_accepted(self._flush)
+
+    async def flush(self) -> None:
+        await self._flush()
 
     async def close(self) -> None:
         """
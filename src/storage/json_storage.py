@@ -1,62 +1,143 @@
 import aiofiles
 import asyncio
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from .base import DataStorage
+from .segments import SegmentWriter
 from datetime import datetime
 
+try:
+    import orjson  # опционально: в разы быстрее json.dumps
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    # Преобразуем datetime в ISO строку
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_lines(items: list[dict]) -> bytes:
+    """Пачка записей → один блок JSON Lines (UTF-8, по записи на строку)"""
+    if orjson is not None:
+        option = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+        return b"".join(orjson.dumps(item, default=_default, option=option) for item in items)
+    return "".join(
+        json.dumps(item, ensure_ascii=False, default=_default) + "\n" for item in items
+    ).encode("utf-8")
+
 
 class JSONStorage(DataStorage):
     """
     Асинхронное JSON-хранилище с поддержкой batch-записи.
     Каждая запись сохраняется как отдельная строка JSON.
+    Пачка сериализуется в один блок байт (orjson, если установлен) и пишется одним вызовом;
+    thread_writer=True — сериализация и запись в отдельном потоке, вне event loop.
+
+    Сегментный режим (compression / max_file_size / max_records):
+    вместо одного растущего файла — сегменты <база>-00000.jsonl[.gz|.zst]
+    с атомарной публикацией и манифестом <база>.manifest.json (см. SegmentWriter).
+    Сжатие и ротация всегда выполняются в потоке-писателе.
     """
 
-    def __init__(self, filename: str, batch_size: int = 50):
+    def __init__(
+        self,
+        filename: str,
+        batch_size: int = 50,
+        blob_store=None,
+        thread_writer: bool = False,
+        compression: str | None = None,
+        compression_level: int | None = None,
+        max_file_size: int | None = None,
+        max_records: int | None = None,
+    ):
         self.filename = filename
+        self.blob_store = blob_store
         self._buffer = []
         self.batch_size = batch_size
         self._file = None
         self._lock = asyncio.Lock()  # для потокобезопасности
 
+        # один поток — пачки пишутся строго по порядку
+        self._segments = None
+        if compression or max_file_size or max_records:
+            base = filename[:-len(".jsonl")] if filename.endswith(".jsonl") else os.path.splitext(filename)[0]
+            self._segments = SegmentWriter(
+                base, ".jsonl", compression=compression, level=compression_level,
+                max_bytes=max_file_size, max_records=max_records
+            )
+            thread_writer = True
+
+        self.thread_writer = thread_writer
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="json-writer") if thread_writer else None
+        self._sync_file = None
+
     async def _ensure_open(self):
         if not self._file:
-            self._file = await aiofiles.open(
-                self.filename,
-                mode='a',
-                encoding='utf-8'
-            )
+            self._file = await aiofiles.open(self.filename, mode='ab')
+
+    def _write_sync(self, items: list[dict]):
+        if self._sync_file is None:
+            self._sync_file = open(self.filename, "ab")
+        self._sync_file.write(dumps_lines(items))
 
     async def _flush(self):
         if not self._buffer:
             return
 
-        await self._ensure_open()
-
         async with self._lock:
-            for item in self._buffer:
-                # Преобразуем datetime в ISO строку
-                data_to_write = item.copy()
-                if isinstance(data_to_write.get("crawled_at"), datetime):
-                    data_to_write["crawled_at"] = data_to_write["crawled_at"].isoformat()
-
-                await self._file.write(json.dumps(data_to_write, ensure_ascii=False) + "\n")
-
-            self._buffer = []
+            items, self._buffer = self._buffer, []
+            try:
+                if self._segments:
+                    await asyncio.get_running_loop().run_in_executor(
+                        self._executor, self._segments.write, items, dumps_lines
+                    )
+                elif self._executor:
+                    await asyncio.get_running_loop().run_in_executor(self._executor, self._write_sync, items)
+                else:
+                    await self._ensure_open()
+                    await self._file.write(dumps_lines(items))
+            except Exception:
+                # запись не удалась — в буфер до следующего flush возвращается только
+                # незаписанный хвост: уже попавшее в сегменты иначе задвоилось бы
+                written = self._segments.last_written if self._segments else 0
+                self._buffer[:0] = items[written:]
+                raise
 
     async def save(self, data: dict):
         """
         Добавляем запись в буфер и сбрасываем при достижении batch_size.
+        Запись принята, как только попала в буфер: ошибка сброса не поднимается
+        отсюда — пачка остаётся в буфере до flush() / close() (см. DataStorage.save).
         """
+        data = await self._externalize_body(data)
         self._buffer.append(data)
         if len(self._buffer) >= self.batch_size:
-            await self._flush()
+            await self._flush_accepted(self._flush)
+
+    async def flush(self):
+        """Повторяет и ранее не записанные пачки; ошибка записи поднимается"""
+        await self._sync_blob_store()
+        await self._flush()
 
     async def close(self):
         """
         Сбрасываем оставшийся буфер и закрываем файл.
         """
+        await self._sync_blob_store(close=True)
         await self._flush()
         if self._file:
             await self._file.flush()
             await self._file.close()
             self._file = None
+        if self._executor:
+            if self._segments:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._segments.close)
+            if self._sync_file:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._sync_file.close)
+                self._sync_file = None
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -0,0 +1,155 @@
+# crawler/storage/multi_storage.py
+import asyncio
+import logging
+
+from .base import DataStorage
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class _Backend:
+    """Очередь и фоновый писатель одного хранилища"""
+
+    def __init__(self, storage: DataStorage, name: str, queue_size: int):
+        self.storage = storage
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: asyncio.Task | None = None
+        self.stats = {"saved": 0, "raw_saved": 0, "failed": 0, "retries": 0, "max_queue": 0}
+
+
+class MultiStorage(DataStorage):
+    """
+    Fan-out в несколько хранилищ (JSON + CSV + SQLite + ...).
+    - у каждого хранилища своя очередь (queue_size) и своя задача-писатель:
+      медленный SQLite не тормозит запись JSON
+    - save() кладёт запись во все очереди; ждёт только если очередь какого-то
+      хранилища заполнена — это и есть backpressure на воркеры краулера
+    - ошибки изолированы: запись повторяется retries раз, затем теряется
+      только для упавшего хранилища (счётчик failed), остальные пишут дальше.
+      Повтор save() не задваивает запись: ошибка save() значит, что она не принята
+      (см. DataStorage.save); упавший сброс буфера дописывает следующий flush / close
+    - close() дожидается опустошения всех очередей и закрывает каждое хранилище
+    """
+
+    def __init__(self, storages: list[DataStorage], queue_size: int = 1000, retries: int = 3, retry_delay: float = 1.0):
+        if not storages:
+            raise ValueError("MultiStorage требует хотя бы одно хранилище")
+        self.storages = list(storages)
+        self.queue_size = queue_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._backends: list[_Backend] | None = None
+        self._closed = False
+
+    # --- возможности вложенных хранилищ ---
+    @property
+    def wants_raw(self) -> bool:
+        return any(s.wants_raw for s in self.storages)
+
+    @property
+    def wants_body(self) -> bool:
+        return any(s.wants_body for s in self.storages)
+
+    def _ensure_started(self) -> list[_Backend]:
+        # очереди и задачи создаются в работающем event loop, при первой записи
+        if self._backends is None:
+            self._backends = []
+            for i, s in enumerate(self.storages):
+                name = type(s).__name__
+                # два хранилища одного типа различаем по номеру
+                if any(type(other) is type(s) for other in self.storages[:i]):
+                    name = f"{name}#{i}"
+                self._backends.append(_Backend(s, name, self.queue_size))
+            for b in self._backends:
+                b.task = asyncio.create_task(self._run(b), name=f"storage-{b.name}")
+        return self._backends
+
+    async def _enqueue(self, backend: _Backend, item):
+        await backend.queue.put(item)
+        backend.stats["max_queue"] = max(backend.stats["max_queue"], backend.queue.qsize())
+
+    async def save(self, data: dict) -> None:
+        if self._closed:
+            raise RuntimeError("MultiStorage закрыт")
+        backends = self._ensure_started()
+        await asyncio.gather(*(self._enqueue(b, ("save", data)) for b in backends))
+
+    async def save_raw(self, exchange: dict) -> None:
+        if self._closed:
+            raise RuntimeError("MultiStorage закрыт")
+        backends = [b for b in self._ensure_started() if b.storage.wants_raw]
+        await asyncio.gather(*(self._enqueue(b, ("raw", exchange)) for b in backends))
+
+    async def flush(self) -> None:
+        """Просим каждое хранилище сбросить буфер — в порядке его очереди, после уже поставленных записей"""
+        if self._closed or self._backends is None:
+            return
+        await asyncio.gather(*(self._enqueue(b, ("flush", None)) for b in self._backends))
+
+    async def _run(self, backend: _Backend):
+        while True:
+            item = await backend.queue.get()
+            try:
+                if item is _STOP:
+                    return
+                await self._write(backend, *item)
+            finally:
+                backend.queue.task_done()
+
+    async def _write(self, backend: _Backend, kind: str, data: dict):
+        storage = backend.storage
+        if kind == "flush":
+            try:
+                await storage.flush()
+            except Exception as e:
+                logger.error(f"❌ {backend.name}: flush failed: {e}")
+            return
+
+        if kind == "save" and "body" in data and not storage.wants_body:
+            # тело нужно только хранилищам с BlobStore
+            data = {k: v for k, v in data.items() if k not in ("body", "body_encoding")}
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                if kind == "raw":
+                    await storage.save_raw(data)
+                    backend.stats["raw_saved"] += 1
+                else:
+                    await storage.save(data)
+                    backend.stats["saved"] += 1
+                return
+            except Exception as e:
+                if attempt < self.retries:
+                    backend.stats["retries"] += 1
+                    logger.warning(f"⚠️ {backend.name}: save attempt {attempt} failed for {data.get('url')}: {e}")
+                    await asyncio.sleep(self.retry_delay)
+                else:
+                    backend.stats["failed"] += 1
+                    logger.error(f"❌ {backend.name}: dropped {data.get('url')} after {self.retries} attempts: {e}")
+
+    def get_stats(self) -> dict:
+        """По хранилищу: saved / failed / retries, текущая и максимальная глубина очереди"""
+        if self._backends is None:
+            return {}
+        return {
+            b.name: {**b.stats, "queue": b.queue.qsize()}
+            for b in self._backends
+        }
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._backends:
+            for b in self._backends:
+                await b.queue.put(_STOP)
+            await asyncio.gather(*(b.task for b in self._backends), return_exceptions=True)
+
+        results = await asyncio.gather(*(s.close() for s in self.storages), return_exceptions=True)
+        for storage, result in zip(self.storages, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Failed to close {type(storage).__name__}: {result}")
@@ -0,0 +1,166 @@
+# crawler/storage/parquet_storage.py
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .base import DataStorage
+
+try:
+    import pyarrow as pa  # опционально: колоночное хранилище
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORMATS = ("parquet", "arrow")
+
+
+def page_schema():
+    """Схема записи краулера; links / images / headers / metadata — вложенные типы"""
+    return pa.schema([
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("text", pa.string()),
+        ("text_length", pa.int64()),
+        ("links", pa.list_(pa.string())),
+        ("images", pa.list_(pa.struct([("src", pa.string()), ("alt", pa.string())]))),
+        ("headers", pa.struct([(level, pa.list_(pa.string())) for level in ("h1", "h2", "h3")])),
+        ("metadata", pa.map_(pa.string(), pa.string())),
+        ("crawled_at", pa.timestamp("us")),
+        ("status_code", pa.int32()),
+        ("content_type", pa.string()),
+        ("body_hash", pa.string()),
+        ("body_encoding", pa.string()),
+    ])
+
+
+def _columns(records: list[dict]) -> dict[str, list]:
+    cols = {name: [] for name in page_schema().names}
+    for d in records:
+        text = d.get("text")
+        crawled_at = d.get("crawled_at")
+        if isinstance(crawled_at, str):
+            crawled_at = datetime.fromisoformat(crawled_at)
+        headers = d.get("headers") or {}
+
+        cols["url"].append(d["url"])
+        cols["title"].append(d.get("title"))
+        cols["text"].append(text)
+        cols["text_length"].append(len(text) if text is not None else None)
+        cols["links"].append(list(d.get("links") or ()))
+        cols["images"].append([
+            {"src": img.get("src"), "alt": img.get("alt")} for img in d.get("images") or ()
+        ])
+        cols["headers"].append({level: list(headers.get(level) or ()) for level in ("h1", "h2", "h3")})
+        cols["metadata"].append([(str(k), str(v)) for k, v in (d.get("metadata") or {}).items()])
+        cols["crawled_at"].append(crawled_at)
+        cols["status_code"].append(d.get("status_code"))
+        cols["content_type"].append(d.get("content_type"))
+        cols["body_hash"].append(d.get("body_hash"))
+        cols["body_encoding"].append(d.get("body_encoding"))
+    return cols
+
+
+class ParquetStorage(DataStorage):
+    """
+    Колоночное хранилище: Parquet или Arrow IPC (format="arrow").
+    - записи копятся до row_group_size и пишутся одной row group (batch)
+    - аналитика читает только нужные колонки: url, status_code, text_length, ...
+    - файл пишется в <path>.part и переименовывается в close() — недописанный
+      Parquet без footer прочитать нельзя
+    - конвертация и сжатие — в отдельном потоке, вне event loop
+    compression: для parquet — zstd / snappy / gzip / None, для arrow — zstd / lz4 / None.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        format: str = "parquet",
+        row_group_size: int = 10_000,
+        compression: str | None = "zstd",
+        blob_store=None,
+    ):
+        if pa is None:
+            raise ImportError("ParquetStorage требует пакет pyarrow")
+        if format not in FORMATS:
+            raise ValueError(f"Неизвестный формат: {format}")
+        self.path = path
+        self.format = format
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.blob_store = blob_store
+
+        self.schema = page_schema()
+        self.rows = 0
+        self._buffer = []
+        self._writer = None
+        self._sink = None
+        self._lock = asyncio.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="parquet-writer")
+
+    def _open_sync(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        if self.format == "parquet":
+            self._writer = pq.ParquetWriter(self.path + ".part", self.schema, compression=self.compression or "none")
+        else:
+            self._sink = pa.OSFile(self.path + ".part", "wb")
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self._sink, self.schema, options=options)
+
+    def _write_sync(self, records: list[dict]):
+        if self._writer is None:
+            self._open_sync()
+        table = pa.Table.from_pydict(_columns(records), schema=self.schema)
+        if self.format == "parquet":
+            self._writer.write_table(table, row_group_size=self.row_group_size)
+        else:
+            self._writer.write_table(table, max_chunksize=self.row_group_size)
+        self.rows += len(records)
+
+    def _close_sync(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+        self._writer = None
+        os.replace(self.path + ".part", self.path)
+
+    async def _flush(self):
+        if not self._buffer:
+            return
+        async with self._lock:
+            items, self._buffer = self._buffer, []
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._executor, self._write_sync, items)
+            except Exception:
+                self._buffer[:0] = items
+                raise
+
+    async def save(self, data: dict) -> None:
+        """
+        Добавляем запись в буфер; полная row group уходит на запись.
+        Ошибка записи row group не поднимается из save(): записи остаются в буфере
+        и пишутся в close() (см. DataStorage.save).
+        """
+        data = await self._externalize_body(data)
+        self._buffer.append(data)
+        if len(self._buffer) >= self.row_group_size:
+            await self._flush_accepted(self._flush)
+
+    async def flush(self) -> None:
+        """Неполную row group по таймеру не пишем — мелкие row group портят чтение колонок"""
+        await self._sync_blob_store()
+
+    async def close(self) -> None:
+        """Дописываем последнюю row group, footer и публикуем файл"""
+        if self._executor is None:
+            return
+        await self._sync_blob_store(close=True)
+        await self._flush()
+        async with self._lock:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._close_sync)
+        self._executor.shutdown(wait=True)
+        self._executor = None
@@ -0,0 +1,518 @@
+# crawler/storage/readers.py
+import csv
+import gzip
+import io
+import json
+import mmap
+import os
+import re
+import sqlite3
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Iterator
+from urllib.parse import urlparse
+
+from .csv_storage import rotated_files
+
+try:
+    import orjson  # опционально: быстрее json.loads
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard  # опционально: чтение сегментов .jsonl.zst
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow.dataset as pa_dataset  # опционально: ParquetReader
+except ImportError:
+    pa_dataset = None
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+def _as_datetime(value) -> datetime | None:
+    """datetime / ISO-строка → naive UTC, как краулер пишет crawled_at (datetime.utcnow())"""
+    if value is None or value == "":
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+@dataclass
+class RecordFilter:
+    """
+    Условия выборки, общие для всех читателей.
+    domain — хост или его поддомены; status — код или набор кодов;
+    since / until — границы crawled_at (datetime или ISO-строка), until не включительно;
+    значения с часовым поясом приводятся к naive UTC.
+    Каждый читатель проталкивает что может в свой формат (SQL WHERE, фильтр
+    Parquet, поиск по байтам строки), а matches() — окончательная проверка.
+    """
+
+    domain: str | None = None
+    status: int | Iterable[int] | None = None
+    since: datetime | str | None = None
+    until: datetime | str | None = None
+
+    def __post_init__(self):
+        if self.domain:
+            self.domain = self.domain.lower()
+        if isinstance(self.status, int):
+            self.status = (self.status,)
+        elif self.status is not None:
+            self.status = tuple(self.status)
+        self.since = _as_datetime(self.since)
+        self.until = _as_datetime(self.until)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.domain or self.status or self.since or self.until)
+
+    def match_domain(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return host == self.domain or host.endswith("." + self.domain)
+
+    def matches(self, record: dict) -> bool:
+        if self.domain and not self.match_domain(record.get("url", "")):
+            return False
+        if self.status:
+            try:
+                if int(record.get("status_code")) not in self.status:
+                    return False
+            except (TypeError, ValueError):
+                return False
+        if self.since or self.until:
+            crawled_at = _as_datetime(record.get("crawled_at"))
+            if crawled_at is None:
+                return False
+            if self.since and crawled_at < self.since:
+                return False
+            if self.until and crawled_at >= self.until:
+                return False
+        return True
+
+
+class ResultReader(ABC):
+    """
+    Ленивое чтение сохранённых результатов.
+    iter(...) — генератор записей с фильтрами, get(url) — последняя запись для URL.
+    """
+
+    @abstractmethod
+    def iter(self, domain=None, status=None, since=None, until=None) -> Iterator[dict]:
+        pass
+
+    @abstractmethod
+    def get(self, url: str) -> dict | None:
+        pass
+
+    def __iter__(self):
+        return self.iter()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# =========================
+# JSON Lines (JSONStorage)
+# =========================
+class JSONLReader(ResultReader):
+    """
+    JSON Lines через mmap: файл любого размера читается постранично ОС,
+    в памяти — только текущая строка.
+    - фильтры сначала проверяются по байтам строки (домен, код ответа),
+      json разбирается только у строк-кандидатов
+    - get(url) — через индекс <файл>.idx (SQLite: url → offset, length);
+      индекс строится при первом обращении и дополняется, если файл дописали
+    Сжатые сегменты (.gz / .zst) читаются потоково, без mmap и индекса.
+    """
+
+    def __init__(self, path: str, index_path: str | None = None):
+        self.path = path
+        self.compressed = path.endswith((".gz", ".zst"))
+        self.index_path = index_path or path + ".idx"
+        self._file = None
+        self._mmap = None
+        self._index = None
+
+    # --- доступ к байтам ---
+    def _map(self) -> mmap.mmap | None:
+        size = os.path.getsize(self.path)
+        if self._mmap is not None and len(self._mmap) != size:
+            # файл дописан — переотображаем
+            self._mmap.close()
+            self._mmap = None
+        if self._mmap is None and size:
+            if self._file is None:
+                self._file = open(self.path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def _lines(self, start: int = 0, end: int | None = None) -> Iterator[tuple[int, bytes]]:
+        """(смещение, строка) без копирования всего файла"""
+        if self.compressed:
+            yield from self._compressed_lines()
+            return
+        mm = self._map()
+        if mm is None:
+            return
+        pos, end = start, len(mm) if end is None else end
+        while pos < end:
+            nl = mm.find(b"\n", pos)
+            if nl == -1:
+                nl = end
+            if nl > pos:
+                yield pos, mm[pos:nl]
+            pos = nl + 1
+
+    def _compressed_lines(self) -> Iterator[tuple[int, bytes]]:
+        if self.path.endswith(".gz"):
+            stream = gzip.open(self.path, "rb")
+        else:
+            if zstandard is None:
+                raise ValueError("чтение .zst требует пакет zstandard")
+            raw = zstandard.ZstdDecompressor().stream_reader(open(self.path, "rb"), closefd=True)
+            stream = io.BufferedReader(raw)
+        with stream:
+            offset = 0
+            for line in stream:
+                if line.strip():
+                    yield offset, line.rstrip(b"\n")
+                offset += len(line)
+
+    # --- итерация ---
+    def iter(self, domain=None, status=None, since=None, until=None) -> Iterator[dict]:
+        query = RecordFilter(domain, status, since, until)
+        # push-down не должен терять подходящие строки: хост в URL может быть
+        # в любом регистре, а не-ASCII домен — экранирован в \uXXXX, его не ищем
+        has_domain = None
+        if query.domain and query.domain.isascii():
+            has_domain = re.compile(re.escape(query.domain.encode()), re.IGNORECASE).search
+        codes = [str(code).encode() for code in query.status] if query.status else None
+
+        for _, line in self._lines():
+            # push-down: строка без нужных байтов точно не подходит
+            if has_domain and not has_domain(line):
+                continue
+            if codes and not any(code in line for code in codes):
+                continue
+            record = _loads(line)
+            if query.empty or query.matches(record):
+                yield record
+
+    # --- индекс по URL ---
+    def _open_index(self) -> sqlite3.Connection:
+        if self._index is None:
+            self._index = sqlite3.connect(self.index_path)
+            self._index.executescript("""
+                CREATE TABLE IF NOT EXISTS offsets (
+                    url TEXT PRIMARY KEY,
+                    pos INTEGER NOT NULL,
+                    len INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+        return self._index
+
+    def build_index(self) -> int:
+        """Индексирует новые строки; возвращает число проиндексированных"""
+        if self.compressed:
+            raise ValueError("индекс по смещениям строится только для несжатых файлов")
+        conn = self._open_index()
+        row = conn.execute("SELECT value FROM meta WHERE key = 'indexed_size'").fetchone()
+        indexed = int(row[0]) if row else 0
+        mm = self._map()
+        # индексируем только целые строки: хвост может дописываться прямо сейчас
+        size = mm.rfind(b"\n") + 1 if mm is not None else 0
+        if indexed > size:
+            # файл перезаписан — индекс недействителен
+            conn.execute("DELETE FROM offsets")
+            indexed = 0
+        if indexed == size:
+            return 0
+
+        count = 0
+        batch = []
+        for offset, line in self._lines(indexed, size):
+            batch.append((_loads(line)["url"], offset, len(line)))
+            if len(batch) >= 10_000:
+                count += len(batch)
+                conn.executemany("INSERT OR REPLACE INTO offsets VALUES (?, ?, ?)", batch)
+                batch = []
+        count += len(batch)
+        conn.executemany("INSERT OR REPLACE INTO offsets VALUES (?, ?, ?)", batch)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('indexed_size', ?)", (str(size),))
+        conn.commit()
+        return count
+
+    def get(self, url: str) -> dict | None:
+        if self.compressed:
+            # у сжатого сегмента нет смещений — последний по порядку выигрывает
+            found = None
+            for record in self.iter():
+                if record.get("url") == url:
+                    found = record
+            return found
+
+        self.build_index()
+        row = self._open_index().execute("SELECT pos, len FROM offsets WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        offset, length = row
+        return _loads(self._map()[offset:offset + length])
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+
+class ManifestReader(ResultReader):
+    """
+    Сегменты JSONStorage по манифесту (<база>.manifest.json).
+    get(url) открывает только сегменты, чей [min_url, max_url] содержит URL.
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        with open(manifest_path, encoding="utf-8") as f:
+            self.segments = json.load(f)["segments"]
+        directory = os.path.dirname(os.path.abspath(manifest_path))
+        self.paths = [os.path.join(directory, seg["file"]) for seg in self.segments]
+
+    def iter(self, domain=None, status=None, since=None, until=None) -> Iterator[dict]:
+        for path in self.paths:
+            with JSONLReader(path) as reader:
+                yield from reader.iter(domain, status, since, until)
+
+    def get(self, url: str) -> dict | None:
+        found = None
+        for seg, path in zip(self.segments, self.paths):
+            if seg.get("min_url") and not (seg["min_url"] <= url <= seg["max_url"]):
+                continue
+            with JSONLReader(path) as reader:
+                found = reader.get(url) or found
+        return found
+
+
+# =========================
+# CSV (CSVStorage)
+# =========================
+class CSVReader(ResultReader):
+    """
+    CSV-файлы CSVStorage. По одному пути читаются и ротированные <имя>-00001.csv, ...
+    с диска; список путей читается как есть.
+    Ячейки с JSON (flatten="json") разворачиваются обратно, status_code — int.
+    Индекс URL → (файл, смещение строки) строится в памяти при первом get().
+    """
+
+    def __init__(self, paths: str | list[str], encoding: str = "utf-8", delimiter: str = ",", decode_json: bool = True):
+        self.paths = (rotated_files(paths) or [paths]) if isinstance(paths, str) else list(paths)
+        self.encoding = encoding
+        self.delimiter = delimiter
+        self.decode_json = decode_json
+        self._index = None
+        self._headers: dict[str, list[str]] = {}
+
+    def _decode(self, row: dict) -> dict:
+        for key, value in row.items():
+            if self.decode_json and value[:1] in ("[", "{"):
+                try:
+                    row[key] = json.loads(value)
+                except ValueError:
+                    pass
+        if row.get("status_code"):
+            try:
+                row["status_code"] = int(row["status_code"])
+            except ValueError:
+                pass
+        return row
+
+    def _rows(self, path: str) -> Iterator[tuple[int, dict]]:
+        """(смещение начала строки CSV, запись) — многострочные поля учитываются"""
+        with open(path, "rb") as f:
+            state = {"start": None}
+
+            def lines():
+                while True:
+                    offset = f.tell()
+                    line = f.readline()
+                    if not line:
+                        return
+                    if state["start"] is None:
+                        state["start"] = offset
+                    yield line.decode(self.encoding)
+
+            reader = csv.reader(lines(), delimiter=self.delimiter)
+            header = next(reader, None)
+            if header is None:
+                return
+            self._headers[path] = header
+            state["start"] = None
+            for values in reader:
+                offset, state["start"] = state["start"], None
+                yield offset, dict(zip(header, values))
+
+    def iter(self, domain=None, status=None, since=None, until=None) -> Iterator[dict]:
+        query = RecordFilter(domain, status, since, until)
+        codes = {str(s) for s in query.status} if query.status else None
+        for path in self.paths:
+            for _, row in self._rows(path):
+                # push-down: код ответа сравниваем строкой, до разбора JSON-ячеек
+                if codes and row.get("status_code", "").strip() not in codes:
+                    continue
+                row = self._decode(row)
+                if query.empty or query.matches(row):
+                    yield row
+
+    def get(self, url: str) -> dict | None:
+        if self._index is None:
+            self._index = {}
+            for path in self.paths:
+                for offset, row in self._rows(path):
+                    self._index[row.get("url")] = (path, offset)
+        location = self._index.get(url)
+        if location is None:
+            return None
+        path, offset = location
+        with open(path, "rb") as f:
+            f.seek(offset)
+            values = next(csv.reader((line.decode(self.encoding) for line in f), delimiter=self.delimiter))
+        return self._decode(dict(zip(self._headers[path], values)))
+
+
+# =========================
+# SQLite (SQLiteStorage)
+# =========================
+class SQLiteReader(ResultReader):
+    """
+    Таблица pages SQLiteStorage. Фильтры уходят в WHERE (status_code, crawled_at,
+    шаблоны LIKE по домену), get(url) — по первичному ключу. Строки идут курсором пачками.
+    """
+
+    def __init__(self, db_path: str, fetch_size: int = 1000):
+        self.db_path = db_path
+        self.fetch_size = fetch_size
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        self._conn.row_factory = sqlite3.Row
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> dict:
+        record = dict(row)
+        for key in ("links", "metadata"):
+            if isinstance(record.get(key), str):
+                record[key] = json.loads(record[key])
+        return record
+
+    def iter(self, domain=None, status=None, since=None, until=None) -> Iterator[dict]:
+        query = RecordFilter(domain, status, since, until)
+        where, params = [], []
+        if query.domain:
+            patterns = [f"{scheme}://{sub}{query.domain}%" for scheme in ("http", "https") for sub in ("", "%.")]
+            where.append("(" + " OR ".join("url LIKE ?" for _ in patterns) + ")")
+            params += patterns
+        if query.status:
+            where.append(f"status_code IN ({', '.join('?' * len(query.status))})")
+            params += list(query.status)
+        if query.since:
+            where.append("crawled_at >= ?")
+            params.append(query.since.isoformat())
+        if query.until:
+            where.append("crawled_at < ?")
+            params.append(query.until.isoformat())
+
+        sql = "SELECT * FROM pages" + (" WHERE " + " AND ".join(where) if where else "")
+        cur = self._conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(self.fetch_size)
+            if not rows:
+                return
+            for row in rows:
+                record = self._decode(row)
+                # LIKE шире точного правила домена (порт, путь) — дочищаем
+                if not query.domain or query.match_domain(record["url"]):
+                    yield record
+
+    def get(self, url: str) -> dict | None:
+        row = self._conn.execute("SELECT * FROM pages WHERE url = ?", (url,)).fetchone()
+        return self._decode(row) if row else None
+
+    def close(self):
+        self._conn.close()
+
+
+# =========================
+# Parquet / Arrow (ParquetStorage)
+# =========================
+class ParquetReader(ResultReader):
+    """
+    Parquet или Arrow IPC через pyarrow.dataset: статус и даты проталкиваются
+    в фильтр (row group'ы пропускаются по статистике), columns — только нужные колонки.
+    """
+
+    def __init__(self, path: str, format: str = "parquet", batch_size: int = 10_000):
+        if pa_dataset is None:
+            raise ImportError("ParquetReader требует пакет pyarrow")
+        self.dataset = pa_dataset.dataset(path, format="ipc" if format == "arrow" else format)
+        self.batch_size = batch_size
+
+    def iter(self, domain=None, status=None, since=None, until=None, columns: list[str] | None = None) -> Iterator[dict]:
+        query = RecordFilter(domain, status, since, until)
+        field = pa_dataset.field
+        conditions = []
+        if query.status:
+            conditions.append(field("status_code").isin(list(query.status)))
+        if query.since:
+            conditions.append(field("crawled_at") >= query.since)
+        if query.until:
+            conditions.append(field("crawled_at") < query.until)
+        expr = None
+        for cond in conditions:
+            expr = cond if expr is None else expr & cond
+
+        if query.domain and columns is not None and "url" not in columns:
+            columns = columns + ["url"]
+        for batch in self.dataset.to_batches(columns=columns, filter=expr, batch_size=self.batch_size):
+            for record in batch.to_pylist():
+                if not query.domain or query.match_domain(record["url"]):
+                    yield record
+
+    def get(self, url: str) -> dict | None:
+        rows = self.dataset.to_table(filter=pa_dataset.field("url") == url).to_pylist()
+        return rows[-1] if rows else None
+
+
+def open_reader(path: str, **kwargs) -> ResultReader:
+    """Читатель по расширению файла"""
+    if path.endswith(".manifest.json"):
+        return ManifestReader(path)
+    if path.endswith((".csv", ".tsv")):
+        return CSVReader(path, **kwargs)
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteReader(path, **kwargs)
+    if path.endswith(".parquet"):
+        return ParquetReader(path, **kwargs)
+    if path.endswith((".arrow", ".feather")):
+        return ParquetReader(path, format="arrow", **kwargs)
+    return JSONLReader(path, **kwargs)
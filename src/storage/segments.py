@@ -0,0 +1,325 @@
+# crawler/storage/segments.py
+import glob
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Callable
+
+try:
+    import zstandard  # опционально: compression="zstd"
+except ImportError:
+    zstandard = None
+
+COMPRESSION_EXT = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+class _Identity:
+    def compress(self, data: bytes) -> bytes:
+        return data
+
+    def flush_block(self) -> bytes:
+        return b""
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush_block(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush_block(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+def _decompress_partial(data: bytes, compression: str | None) -> bytes:
+    """Всё, что удаётся распаковать из оборванного потока: хвост без завершения кадра не ошибка"""
+    if compression is None:
+        return data
+    if compression == "gzip":
+        obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        error = zlib.error
+    else:
+        if zstandard is None:
+            raise ValueError("восстановление .zst требует пакет zstandard")
+        obj = zstandard.ZstdDecompressor().decompressobj()
+        error = zstandard.ZstdError
+    out = []
+    for i in range(0, len(data), 64 * 1024):
+        try:
+            out.append(obj.decompress(data[i:i + 64 * 1024]))
+        except error:
+            break  # битый хвост — берём то, что распаковалось до него
+    return b"".join(out)
+
+
+def make_compressor(compression: str | None, level: int | None = None):
+    """
+    Потоковый компрессор на сегмент: compress() / flush_block() / flush().
+    flush_block() после каждой пачки: размер на диске точен для ротации,
+    а .part после сбоя читается до последней целой пачки.
+    """
+    if compression is None:
+        return _Identity()
+    if compression == "gzip":
+        return _Gzip(6 if level is None else level)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("compression='zstd' требует пакет zstandard")
+        return _Zstd(3 if level is None else level)
+    raise ValueError(f"Неизвестное сжатие: {compression}")
+
+
+def _track(seg: dict, chunk: list[dict], raw_bytes: int, written: int):
+    seg["records"] += len(chunk)
+    seg["raw_bytes"] += raw_bytes
+    seg["bytes"] += written
+    urls = [r["url"] for r in chunk if r.get("url")]
+    if not urls:
+        return
+    seg["first_url"] = seg["first_url"] or urls[0]
+    seg["last_url"] = urls[-1]
+    seg["min_url"] = min(urls + ([seg["min_url"]] if seg["min_url"] else []))
+    seg["max_url"] = max(urls + ([seg["max_url"]] if seg["max_url"] else []))
+
+
+class SegmentWriter:
+    """
+    Синхронный писатель сегментов: <base>-00000<suffix>[.gz|.zst].
+    - сегмент пишется в <имя>.part и переименовывается только после flush/fsync —
+      читатель никогда не увидит недописанный файл
+    - ротация по max_bytes (байты на диске) и/или max_records
+    - <base>.manifest.json: для каждого готового сегмента число записей и диапазон URL,
+      чтобы последующие задачи обрабатывали сегменты параллельно
+    - .part, оставшийся после сбоя, при первой записи запечатывается в готовый сегмент:
+      целые строки до последней сброшенной пачки попадают в манифест, оборванная — отбрасывается
+    - манифест читается и .part восстанавливаются в write() / close(), а не в конструкторе:
+      это дисковая работа, ей место в потоке-писателе, а не на event loop
+    - last_written — сколько записей последнего write() уже на диске: при ошибке
+      вызывающий повторяет только хвост, без дублей
+    Вызывается из одного потока (писатель хранилища), своих блокировок не держит.
+    """
+
+    def __init__(
+        self,
+        base_path: str,
+        suffix: str = ".jsonl",
+        compression: str | None = None,
+        level: int | None = None,
+        max_bytes: int | None = None,
+        max_records: int | None = None,
+    ):
+        make_compressor(compression, level)  # ошибку конфигурации показываем сразу
+        self.base_path = base_path
+        self.suffix = suffix
+        self.compression = compression
+        self.level = level
+        self.max_bytes = max_bytes
+        self.max_records = max_records
+        self.manifest_path = base_path + ".manifest.json"
+
+        self.segments: list[dict] = []
+        self._serial = 0
+        self._file = None
+        self._compressor = None
+        self._current = None
+        self._ready = False
+        self.last_written = 0
+
+    def _prepare(self):
+        """Манифест прошлого запуска и запечатывание .part — один раз, до первого _open"""
+        if self._ready:
+            return
+        self.segments = self._load_manifest()
+        self._serial = len(self.segments)
+        self._recover()
+        self._ready = True
+
+    def _load_manifest(self) -> list[dict]:
+        # повторный запуск дописывает новые сегменты после уже готовых
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, encoding="utf-8") as f:
+            return json.load(f).get("segments", [])
+
+    def _recover(self):
+        """Запечатывает .part, оставшиеся от прерванного запуска, до того как _open займёт их имена"""
+        pattern = f"{glob.escape(self.base_path)}-[0-9][0-9][0-9][0-9][0-9]{glob.escape(self.suffix)}*.part"
+        recovered = False
+        for part in sorted(glob.glob(pattern)):
+            name = part[:-len(".part")]
+            compression = next(
+                (c for c, ext in COMPRESSION_EXT.items() if ext and name.endswith(ext)), None
+            )
+            with open(part, "rb") as f:
+                raw = _decompress_partial(f.read(), compression)
+
+            # последняя строка без \n — пачка, оборванная на середине
+            lines = raw[:raw.rfind(b"\n") + 1].splitlines(keepends=True)
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+            if not records:
+                os.remove(part)
+                continue
+
+            raw = b"".join(lines)
+            compressor = make_compressor(compression, self.level)
+            data = compressor.compress(raw) + compressor.flush()
+            tmp = name + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, name)
+            os.remove(part)
+
+            seg = self._new_segment(name)
+            seg.pop("path")
+            _track(seg, records, len(raw), len(data))
+            seg["compression"] = compression
+            seg["finished_at"] = datetime.now(timezone.utc).isoformat()
+            seg["recovered"] = True
+            self.segments.append(seg)
+            recovered = True
+        if recovered:
+            self._write_manifest()
+
+    @staticmethod
+    def _new_segment(name: str) -> dict:
+        return {
+            "file": os.path.basename(name),
+            "path": name,
+            "records": 0,
+            "bytes": 0,
+            "raw_bytes": 0,
+            "first_url": None,
+            "last_url": None,
+            "min_url": None,
+            "max_url": None,
+        }
+
+    def _open(self):
+        while True:
+            name = f"{self.base_path}-{self._serial:05d}{self.suffix}{COMPRESSION_EXT[self.compression]}"
+            self._serial += 1
+            if not os.path.exists(name) and not os.path.exists(name + ".part"):
+                break
+        os.makedirs(os.path.dirname(os.path.abspath(name)), exist_ok=True)
+        self._file = open(name + ".part", "xb")
+        self._compressor = make_compressor(self.compression, self.level)
+        self._current = self._new_segment(name)
+
+    def write(self, records: list[dict], encode: Callable[[list[dict]], bytes]) -> None:
+        """
+        Пишет записи, при необходимости разрезая пачку по границе max_records.
+        При ошибке last_written — сколько записей из records уже в сегментах.
+        """
+        self.last_written = 0
+        self._prepare()
+        while records:
+            if self._file is None:
+                self._open()
+            chunk = records
+            if self.max_records:
+                chunk = records[:self.max_records - self._current["records"]]
+            records = records[len(chunk):]
+
+            raw = encode(chunk)
+            try:
+                data = self._compressor.compress(raw) + self._compressor.flush_block()
+                self._file.write(data)
+                # блок — в ОС: после падения процесса .part читается до этой пачки
+                self._file.flush()
+            except Exception:
+                self._abandon()
+                raise
+            _track(self._current, chunk, len(raw), len(data))
+            self.last_written += len(chunk)
+
+            if self._full():
+                self.finish_segment()
+
+    def _abandon(self):
+        """
+        Пачка записалась не целиком: компрессор уже учёл её, дописывать сегмент нельзя.
+        Обрезаем .part до последней целой пачки и запечатываем его как после сбоя.
+        """
+        path = self._current["path"] + ".part"
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        os.truncate(path, self._current["bytes"])
+        self._file = self._compressor = self._current = None
+        self._recover()
+
+    def _full(self) -> bool:
+        seg = self._current
+        if self.max_records and seg["records"] >= self.max_records:
+            return True
+        return bool(self.max_bytes and seg["bytes"] >= self.max_bytes)
+
+    def finish_segment(self) -> dict | None:
+        """Дописывает хвост компрессора, атомарно публикует сегмент и обновляет манифест"""
+        if self._file is None:
+            return None
+        tail = self._compressor.flush()
+        self._file.write(tail)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+        seg = self._current
+        path = seg.pop("path")
+        seg["bytes"] += len(tail)
+        seg["compression"] = self.compression
+        seg["finished_at"] = datetime.now(timezone.utc).isoformat()
+        self._file = self._compressor = self._current = None
+
+        if seg["records"] == 0:
+            os.remove(path + ".part")
+            return None
+        os.replace(path + ".part", path)
+        self.segments.append(seg)
+        self._write_manifest()
+        return seg
+
+    def _write_manifest(self):
+        manifest = {
+            "segments": self.segments,
+            "records": sum(s["records"] for s in self.segments),
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def close(self):
+        self._prepare()
+        self.finish_segment()
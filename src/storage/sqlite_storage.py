@@ -2,25 +2,129 @@
 from .base import DataStorage
 import aiosqlite
 import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
 from datetime import datetime
 import asyncio
 
+PAGE_COLUMNS = (
+    "url", "title", "text", "links", "metadata", "crawled_at",
+    "status_code", "content_type", "body_hash", "body_encoding",
+)
 
-class SQLiteStorage(DataStorage):
+INSERT_PAGE = (
+    f"INSERT OR REPLACE INTO pages ({', '.join(PAGE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' * len(PAGE_COLUMNS))})"
+)
+
+# нормализованный граф ссылок: URL интернируются в urls, рёбра — пары id
+GRAPH_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS urls (
+        id INTEGER PRIMARY KEY,
+        url TEXT NOT NULL UNIQUE
+    );
+    CREATE TABLE IF NOT EXISTS edges (
+        src_id INTEGER NOT NULL,
+        dst_id INTEGER NOT NULL,
+        PRIMARY KEY (src_id, dst_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_edges_dst ON edges (dst_id, src_id);
+"""
+
+# полнотекстовый индекс: rowid совпадает с rowid строки в pages
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(
+        title, text, description,
+        tokenize = 'unicode61 remove_diacritics 2'
+    );
+"""
+
+# веса bm25 по колонкам: title, text, description
+FTS_WEIGHTS = (5.0, 1.0, 2.0)
+
+_STOP = object()
+
+logger = logging.getLogger(__name__)
+
+
+def _page_row(d: dict) -> tuple:
+    return (
+        d["url"],
+        d["title"],
+        d.get("text", ""),
+        json.dumps(d["links"], ensure_ascii=False),
+        json.dumps(d["metadata"], ensure_ascii=False),
+        d["crawled_at"].isoformat() if isinstance(d["crawled_at"], datetime) else str(d["crawled_at"]),
+        d["status_code"],
+        d["content_type"],
+        d.get("body_hash"),
+        d.get("body_encoding"),
+    )
+
+
+def _graph_statements(batch: list[dict]) -> list[tuple[str, list]]:
     """
-    Асинхронное SQLite-хранилище с поддержкой batch-вставок.
+    Пачка страниц → bulk-операции над urls/edges (executemany на каждую).
+    При повторном сохранении страницы её старые исходящие рёбра заменяются.
     """
+    urls = set()
+    sources = []
+    edges = []
+    for d in batch:
+        src = d["url"]
+        urls.add(src)
+        sources.append((src,))
+        for dst in set(d.get("links") or ()):
+            urls.add(dst)
+            edges.append((src, dst))
+    return [
+        ("INSERT OR IGNORE INTO urls (url) VALUES (?)", [(u,) for u in urls]),
+        ("DELETE FROM edges WHERE src_id = (SELECT id FROM urls WHERE url = ?)", sources),
+        (
+            "INSERT OR IGNORE INTO edges (src_id, dst_id) "
+            "SELECT s.id, d.id FROM urls s, urls d WHERE s.url = ? AND d.url = ?",
+            edges,
+        ),
+    ]
 
-    def __init__(self, db_path: str, batch_size: int = 50):
-        self.db_path = db_path
-        self._conn = None
-        self._batch = []
-        self.batch_size = batch_size
-        self._lock = asyncio.Lock()
 
-    async def init_db(self):
-        self._conn = await aiosqlite.connect(self.db_path)
-        await self._conn.execute("""
+def _batch_statements(batch: list[dict], link_graph: bool, fts: bool) -> list[tuple[str, list]]:
+    """Всё, что пишется для пачки страниц, в порядке выполнения (по executemany на пункт)"""
+    # один URL дважды в пачке (перекраул, повтор save) — остаётся последняя запись,
+    # иначе второй INSERT в pages_fts получит тот же rowid
+    batch = list({d["url"]: d for d in batch}.values())
+    urls = [(d["url"],) for d in batch]
+    statements = []
+    if fts:
+        # INSERT OR REPLACE меняет rowid — старую строку индекса удаляем заранее
+        statements.append(("DELETE FROM pages_fts WHERE rowid IN (SELECT rowid FROM pages WHERE url = ?)", urls))
+    statements.append((INSERT_PAGE, [_page_row(d) for d in batch]))
+    if fts:
+        statements.append((
+            "INSERT INTO pages_fts (rowid, title, text, description) "
+            "SELECT rowid, title, text, json_extract(metadata, '$.description') FROM pages WHERE url = ?",
+            urls,
+        ))
+    if link_graph:
+        statements += _graph_statements(batch)
+    return statements
+
+
+def _fts_query(query: str) -> str:
+    """Пользовательский запрос → FTS5: каждое слово в кавычках (AND), без синтаксических ошибок"""
+    terms = [t.replace('"', '""') for t in query.split()]
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def _init_schema(db_path: str, journal_mode: str, link_graph: bool = False, fts: bool = False):
+    """Схема и journal_mode (WAL сохраняется в файле БД) — синхронно, один раз"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(f"PRAGMA journal_mode={journal_mode}")
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS pages (
                 url TEXT PRIMARY KEY,
                 title TEXT,
@@ -29,50 +133,381 @@ class SQLiteStorage(DataStorage):
                 metadata TEXT,
                 crawled_at TEXT,
                 status_code INTEGER,
-                content_type TEXT
+                content_type TEXT,
+                body_hash TEXT,
+                body_encoding TEXT
             )
         """)
-        await self._conn.commit()
+        # базы, созданные до появления BlobStore
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(pages)")}
+        for column in ("body_hash", "body_encoding"):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE pages ADD COLUMN {column} TEXT")
+        if link_graph:
+            conn.executescript(GRAPH_SCHEMA)
+        if fts:
+            conn.executescript(FTS_SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class _WriterThread(threading.Thread):
+    """
+    Отдельный поток со своим sqlite3-соединением: забирает пачки из очереди,
+    сам кодирует строки (json.dumps) и пишет executemany; коммит — раз в commit_interval.
+    - каждая пачка — под SAVEPOINT: упавшая откатывается целиком, не задевая
+      соседние незакоммиченные; её записи уходят в failed, ошибка — в take_error()
+    - threading.Event в очереди — барьер flush(): commit всего, что было до него, и set()
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        pragmas: list[str],
+        commit_interval: float,
+        queue_size: int,
+        link_graph: bool = False,
+        fts: bool = False,
+        failed: list | None = None,
+    ):
+        super().__init__(name="sqlite-writer", daemon=True)
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self.commit_interval = commit_interval
+        self.link_graph = link_graph
+        self.fts = fts
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.ready = threading.Event()
+        self.failed = failed if failed is not None else []
+        self.rows_written = 0
+        self._error = None
+        self._error_lock = threading.Lock()
+
+    def take_error(self) -> Exception | None:
+        """Последняя ошибка записи; после чтения сбрасывается — поднимается один раз"""
+        with self._error_lock:
+            error, self._error = self._error, None
+        return error
+
+    def _write(self, conn: sqlite3.Connection, batch: list[dict]) -> bool:
+        if not conn.in_transaction:
+            # иначе RELEASE внешнего SAVEPOINT закоммитит пачку сразу
+            conn.execute("BEGIN")
+        conn.execute("SAVEPOINT batch")
+        try:
+            for sql, params in _batch_statements(batch, self.link_graph, self.fts):
+                conn.executemany(sql, params)
+        except Exception as e:
+            conn.execute("ROLLBACK TO batch")
+            conn.execute("RELEASE batch")
+            self.failed.extend(batch)
+            logger.error(f"❌ SQLite writer: batch of {len(batch)} rows failed (first: {batch[0].get('url')}): {e}")
+            with self._error_lock:
+                self._error = e
+            return False
+        conn.execute("RELEASE batch")
+        return True
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path)
+        for pragma in self.pragmas:
+            conn.execute(pragma)
+        self.ready.set()
+
+        pending = 0
+        last_commit = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.commit_interval or None)
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    break
+                if isinstance(item, threading.Event):
+                    # барьер flush(): пачки, стоявшие в очереди раньше, уже выполнены
+                    conn.commit()
+                    pending = 0
+                    last_commit = time.monotonic()
+                    item.set()
+                    continue
+                if item and self._write(conn, item):
+                    pending += len(item)
+                    self.rows_written += len(item)
+
+                if pending and time.monotonic() - last_commit >= self.commit_interval:
+                    conn.commit()
+                    pending = 0
+                    last_commit = time.monotonic()
+        finally:
+            conn.commit()
+            conn.close()
+
+
+class SQLiteStorage(DataStorage):
+    """
+    Асинхронное SQLite-хранилище с поддержкой batch-вставок.
+    - пачка пишется одним executemany (один переход в поток aiosqlite вместо N)
+    - WAL + synchronous=NORMAL, увеличенные cache_size и mmap_size
+    - commit не чаще commit_interval секунд (0 — коммит на каждую пачку)
+    - каждая пачка — под SAVEPOINT: упавшая откатывается целиком, её записи уходят
+      в failed_records, ошибка поднимается один раз из следующего flush / close
+    - writer_thread=True — запись в отдельном потоке через очередь,
+      event loop не тратит время даже на json.dumps строк
+    - link_graph=True — ссылки дополнительно пишутся в таблицы urls/edges,
+      запросы inlinks / in_degree / orphans идут по индексам, без разбора JSON
+    - fts=True — FTS5-индекс по title, text и metadata.description, поиск через search()
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        batch_size: int = 50,
+        blob_store=None,
+        journal_mode: str = "WAL",
+        synchronous: str = "NORMAL",
+        cache_size_kb: int = 64 * 1024,
+        mmap_size: int = 256 * 1024 * 1024,
+        commit_interval: float = 1.0,
+        writer_thread: bool = False,
+        queue_size: int = 64,
+        link_graph: bool = False,
+        fts: bool = False,
+    ):
+        self.db_path = db_path
+        self.blob_store = blob_store
+        self._conn = None
+        self._batch = []
+        self.batch_size = batch_size
+        self._lock = asyncio.Lock()
+
+        self.journal_mode = journal_mode
+        self.pragmas = [
+            f"PRAGMA synchronous={synchronous}",
+            f"PRAGMA cache_size=-{cache_size_kb}",  # отрицательное значение — в KiB
+            f"PRAGMA mmap_size={mmap_size}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+        self.commit_interval = commit_interval
+        self.writer_thread = writer_thread
+        self.link_graph = link_graph
+        self.fts = fts
+        self._reader = None
+        self.queue_size = queue_size
+        self._writer: _WriterThread | None = None
+        self.failed_records: list[dict] = []
+        self._write_error: Exception | None = None
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    async def init_db(self):
+        await asyncio.to_thread(_init_schema, self.db_path, self.journal_mode, self.link_graph, self.fts)
+
+        if self.writer_thread:
+            self._writer = _WriterThread(
+                self.db_path, self.pragmas, self.commit_interval, self.queue_size, self.link_graph, self.fts,
+                failed=self.failed_records,
+            )
+            self._writer.start()
+            await asyncio.to_thread(self._writer.ready.wait)
+            return
+
+        self._conn = await aiosqlite.connect(self.db_path)
+        for pragma in self.pragmas:
+            await self._conn.execute(pragma)
 
     async def save(self, data: dict):
         """
         Добавляем запись в буфер и сохраняем при достижении batch_size.
+        Ошибки записи отсюда не поднимаются — запись уже принята (см. DataStorage.save).
         """
+        data = await self._externalize_body(data)
         async with self._lock:
             self._batch.append(data)
             if len(self._batch) >= self.batch_size:
-                await self._flush()
+                await self._flush_accepted(self._flush)
 
-    async def _flush(self):
+    async def flush(self):
+        """Буфер в базу и commit, даже если commit_interval ещё не прошёл"""
+        await self._sync_blob_store()
+        async with self._lock:
+            await self._flush(force_commit=True)
+
+    async def _flush(self, force_commit: bool = False):
         """
         Сбрасываем буфер в базу данных. Не берём lock внутри!
         """
-        if not self._batch or not self._conn:
+        if self._writer:
+            if self._batch:
+                batch, self._batch = self._batch, []
+                await self._put(batch)
+            if force_commit:
+                # ошибки потока — только из flush / close: save их не поглощает
+                await self._commit_barrier()
+                error = self._writer.take_error()
+                if error:
+                    raise error
             return
 
-        async with self._conn.execute("BEGIN"):
-            for d in self._batch:
-                await self._conn.execute(
-                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                    (
-                        d["url"],
-                        d["title"],
-                        d["text"],
-                        json.dumps(d["links"], ensure_ascii=False),
-                        json.dumps(d["metadata"], ensure_ascii=False),
-                        d["crawled_at"].isoformat() if isinstance(d["crawled_at"], datetime) else str(d["crawled_at"]),
-                        d["status_code"],
-                        d["content_type"]
-                    )
-                )
-        await self._conn.commit()
-        self._batch = []
+        if not self._conn:
+            return
+
+        if self._batch:
+            batch, self._batch = self._batch, []
+            if not self._conn.in_transaction:
+                # иначе RELEASE внешнего SAVEPOINT закоммитит пачку сразу
+                await self._conn.execute("BEGIN")
+            await self._conn.execute("SAVEPOINT batch")
+            try:
+                for sql, params in _batch_statements(batch, self.link_graph, self.fts):
+                    await self._conn.executemany(sql, params)
+            except Exception as e:
+                # как в _WriterThread: пачка откатывается целиком и уходит в failed_records,
+                # иначе одна битая запись отравила бы все следующие flush
+                await self._conn.execute("ROLLBACK TO batch")
+                await self._conn.execute("RELEASE batch")
+                if not self._pending:
+                    # в транзакции больше ничего — не держим её открытой до следующей пачки
+                    await self._conn.rollback()
+                self.failed_records.extend(batch)
+                logger.error(f"❌ SQLite: batch of {len(batch)} rows failed (first: {batch[0].get('url')}): {e}")
+                self._write_error = e
+            else:
+                await self._conn.execute("RELEASE batch")
+                self._pending += len(batch)
+
+        now = time.monotonic()
+        if self._pending and (force_commit or now - self._last_commit >= self.commit_interval):
+            await self._conn.commit()
+            self._pending = 0
+            self._last_commit = now
+
+        if force_commit and self._write_error:
+            # как take_error() у потока: ошибка поднимается один раз из flush / close
+            error, self._write_error = self._write_error, None
+            raise error
+
+    async def _put(self, item):
+        try:
+            self._writer.queue.put_nowait(item)
+        except queue.Full:
+            # очередь полна — ждём в пуле потоков, не блокируя event loop
+            await asyncio.to_thread(self._writer.queue.put, item)
+
+    async def _commit_barrier(self):
+        """Ждём, пока поток запишет всё поставленное раньше и сделает commit"""
+        barrier = threading.Event()
+        await self._put(barrier)
+        while not await asyncio.to_thread(barrier.wait, 1.0):
+            if not self._writer.is_alive():
+                raise RuntimeError("SQLite writer thread is not running")
+
+    # ---------------- Граф ссылок (link_graph=True) ----------------
+
+    async def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """
+        Чтение через основное соединение, а в режиме writer_thread — через отдельное
+        (WAL позволяет читать параллельно с записью; видны закоммиченные данные).
+        """
+        conn = self._conn
+        if conn is None:
+            if self._reader is None:
+                self._reader = await aiosqlite.connect(self.db_path)
+            conn = self._reader
+        async with conn.execute(sql, params) as cursor:
+            return await cursor.fetchall()
+
+    async def inlinks(self, url: str, limit: int = 100) -> list[str]:
+        """Кто ссылается на url"""
+        rows = await self._query(
+            "SELECT s.url FROM urls d JOIN edges e ON e.dst_id = d.id JOIN urls s ON s.id = e.src_id "
+            "WHERE d.url = ? LIMIT ?",
+            (url, limit),
+        )
+        return [r[0] for r in rows]
+
+    async def outlinks(self, url: str, limit: int = 1000) -> list[str]:
+        rows = await self._query(
+            "SELECT d.url FROM urls s JOIN edges e ON e.src_id = s.id JOIN urls d ON d.id = e.dst_id "
+            "WHERE s.url = ? LIMIT ?",
+            (url, limit),
+        )
+        return [r[0] for r in rows]
+
+    async def in_degree(self, url: str) -> int:
+        rows = await self._query(
+            "SELECT COUNT(*) FROM edges WHERE dst_id = (SELECT id FROM urls WHERE url = ?)", (url,)
+        )
+        return rows[0][0]
+
+    async def top_in_degree(self, n: int = 10) -> list[tuple[str, int]]:
+        """Самые «цитируемые» URL: [(url, in_degree), ...]"""
+        rows = await self._query(
+            "SELECT u.url, c.cnt FROM (SELECT dst_id, COUNT(*) AS cnt FROM edges GROUP BY dst_id "
+            "ORDER BY cnt DESC LIMIT ?) c JOIN urls u ON u.id = c.dst_id ORDER BY c.cnt DESC",
+            (n,),
+        )
+        return [(r[0], r[1]) for r in rows]
+
+    async def orphans(self, limit: int = 1000) -> list[str]:
+        """Сохранённые страницы, на которые не ссылается ни одна другая страница"""
+        rows = await self._query(
+            "SELECT p.url FROM pages p JOIN urls u ON u.url = p.url "
+            "WHERE NOT EXISTS (SELECT 1 FROM edges e WHERE e.dst_id = u.id AND e.src_id != u.id) LIMIT ?",
+            (limit,),
+        )
+        return [r[0] for r in rows]
+
+    # ---------------- Полнотекстовый поиск (fts=True) ----------------
+
+    async def search(self, query: str, limit: int = 20, raw: bool = False) -> list[dict]:
+        """
+        Поиск по title / text / description, лучшие совпадения первыми (bm25).
+        raw=True — query передаётся как есть в синтаксисе FTS5 (OR, NEAR, префиксы*).
+        Возвращает [{"url", "title", "snippet", "rank"}, ...].
+        """
+        match = query if raw else _fts_query(query)
+        if not match:
+            return []
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        rows = await self._query(
+            "SELECT p.url, p.title, "
+            "snippet(pages_fts, -1, '[', ']', '…', 12), "
+            f"bm25(pages_fts, {weights}) AS rank "
+            "FROM pages_fts JOIN pages p ON p.rowid = pages_fts.rowid "
+            "WHERE pages_fts MATCH ? ORDER BY rank LIMIT ?",
+            (match, limit),
+        )
+        return [{"url": r[0], "title": r[1], "snippet": r[2], "rank": r[3]} for r in rows]
 
     async def close(self):
         """
         Сбрасываем остаток буфера и закрываем соединение.
+        Поток записи и соединения закрываются, даже если последний flush упал.
         """
-        await self._flush()
+        try:
+            await self._sync_blob_store(close=True)
+            async with self._lock:
+                await self._flush(force_commit=True)
+        finally:
+            await self._shutdown()
+
+    async def _shutdown(self):
+        if self._writer:
+            writer, self._writer = self._writer, None
+            await asyncio.to_thread(writer.queue.put, _STOP)
+            await asyncio.to_thread(writer.join)
+            error = writer.take_error()
+        else:
+            error = None
+
         if self._conn:
             await self._conn.close()
             self._conn = None
+        if self._reader:
+            await self._reader.close()
+            self._reader = None
+        if error:
+            raise error
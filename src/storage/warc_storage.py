@@ -0,0 +1,219 @@
+# crawler/storage/warc_storage.py
+import asyncio
+import base64
+import hashlib
+import os
+import uuid
+import zlib
+from datetime import datetime, timezone
+from http import HTTPStatus
+
+import aiofiles
+
+from .base import DataStorage
+
+# заголовки, которые не описывают сохранённые байты (тело уже собрано из чанков)
+_HOP_HEADERS = {"transfer-encoding"}
+
+
+def _sha1(data: bytes) -> str:
+    return "sha1:" + base64.b32encode(hashlib.sha1(data).digest()).decode("ascii")
+
+
+def _warc_date(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _http_headers(lines: list[tuple[str, str]]) -> bytes:
+    return b"".join(f"{k}: {v}\r\n".encode("latin-1", "replace") for k, v in lines)
+
+
+class WARCStorage(DataStorage):
+    """
+    WARC 1.1: пары записей response + request для каждого HTTP-обмена.
+    - тело пишется как пришло по сети (save_raw), без повторной сериализации
+    - gzip=True — каждая запись отдельным gzip-member (стандарт .warc.gz)
+    - файлы ротируются по max_file_size
+    - CDX-индекс (<файл>.cdx): смещение и длина записи для произвольного чтения
+    """
+
+    wants_raw = True
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "crawl",
+        max_file_size: int = 1024 * 1024 * 1024,
+        gzip: bool = True,
+        cdx: bool = True,
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_file_size = max_file_size
+        self.gzip = gzip
+        self.cdx = cdx
+
+        self._file = None
+        self._cdx_file = None
+        self._filename = None
+        self._offset = 0
+        self._serial = 0
+        self._lock = asyncio.Lock()
+        self.files: list[str] = []
+        self.records = 0
+
+    async def save(self, data: dict) -> None:
+        """Разобранные записи WARC не нужны — только сырой обмен через save_raw"""
+
+    async def save_raw(self, exchange: dict) -> None:
+        # sha1 и gzip больших тел — в пуле потоков, чтобы не останавливать загрузки
+        response_record, request_record, cdx_line = await asyncio.to_thread(self._build_records, exchange)
+
+        async with self._lock:
+            if self._file is None or self._offset >= self.max_file_size:
+                await self._rotate()
+
+            offset = self._offset
+            await self._file.write(response_record)
+            self._offset += len(response_record)
+            await self._file.write(request_record)
+            self._offset += len(request_record)
+            self.records += 2
+
+            if self._cdx_file:
+                await self._cdx_file.write(
+                    f"{cdx_line} {len(response_record)} {offset} {os.path.basename(self._filename)}\n"
+                )
+
+    def _build_records(self, exchange: dict) -> tuple[bytes, bytes, str]:
+        """Записи response и request (уже сжатые) и начало строки CDX — без ввода-вывода"""
+        fetched_at = exchange.get("fetched_at") or datetime.now(timezone.utc)
+        url = exchange["url"]
+        body = exchange.get("body", b"")
+        status = exchange["status"]
+
+        # --- response ---
+        try:
+            reason = HTTPStatus(status).phrase
+        except ValueError:
+            reason = ""
+        response_headers = [(k, v) for k, v in exchange.get("response_headers", []) if k.lower() not in _HOP_HEADERS]
+        http_response = f"HTTP/1.1 {status} {reason}\r\n".encode("ascii") + _http_headers(response_headers) + b"\r\n" + body
+
+        response_id = f"<urn:uuid:{uuid.uuid4()}>"
+        payload_digest = _sha1(body)
+        extra = [("WARC-Payload-Digest", payload_digest)]
+        if exchange.get("truncated"):
+            extra.append(("WARC-Truncated", "length"))
+        response_record = self._record("response", url, fetched_at, response_id, http_response, "application/http;msgtype=response", extra)
+
+        # --- request ---
+        parts = url.split("/", 3)
+        path = "/" + (parts[3] if len(parts) > 3 else "")
+        host = parts[2] if len(parts) > 2 else ""
+        request_headers = [("Host", host)] + list((exchange.get("request_headers") or {}).items())
+        http_request = f"GET {path} HTTP/1.1\r\n".encode("latin-1", "replace") + _http_headers(request_headers) + b"\r\n"
+        request_record = self._record(
+            "request", url, fetched_at, f"<urn:uuid:{uuid.uuid4()}>", http_request,
+            "application/http;msgtype=request", [("WARC-Concurrent-To", response_id)]
+        )
+
+        content_type = next((v for k, v in response_headers if k.lower() == "content-type"), "-")
+        mime = content_type.split(";", 1)[0].strip() or "-"
+        cdx_line = (
+            f"{url} {fetched_at.astimezone(timezone.utc):%Y%m%d%H%M%S} {url} {mime} {status} "
+            f"{payload_digest[5:]} - -"
+        )
+        return response_record, request_record, cdx_line
+
+    def _record(self, warc_type, url, fetched_at, record_id, block: bytes, content_type, extra) -> bytes:
+        headers = [
+            ("WARC-Type", warc_type),
+            ("WARC-Record-ID", record_id),
+            ("WARC-Date", _warc_date(fetched_at)),
+            ("WARC-Target-URI", url),
+            ("WARC-Block-Digest", _sha1(block)),
+            *extra,
+            ("Content-Type", content_type),
+            ("Content-Length", str(len(block))),
+        ]
+        return self._pack(headers, block)
+
+    async def _rotate(self):
+        await self._close_files()
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        ext = ".warc.gz" if self.gzip else ".warc"
+        while True:
+            self._filename = os.path.join(self.directory, f"{self.prefix}-{stamp}-{self._serial:05d}{ext}")
+            self._serial += 1
+            try:
+                # "xb": штамп с точностью до секунды — другой запуск в ту же секунду не перезапишет файл
+                self._file = await aiofiles.open(self._filename, "xb")
+                break
+            except FileExistsError:
+                continue
+        self._offset = 0
+        self.files.append(self._filename)
+
+        warcinfo = self._warcinfo(b"software: AsyncCrawler\r\nformat: WARC File Format 1.1\r\n")
+        await self._file.write(warcinfo)
+        self._offset += len(warcinfo)
+
+        if self.cdx:
+            self._cdx_file = await aiofiles.open(self._filename + ".cdx", "w", encoding="utf-8")
+            await self._cdx_file.write(" CDX a b A m s k r M S V g\n")
+
+    def _warcinfo(self, info: bytes) -> bytes:
+        headers = [
+            ("WARC-Type", "warcinfo"),
+            ("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>"),
+            ("WARC-Date", _warc_date(datetime.now(timezone.utc))),
+            ("WARC-Filename", os.path.basename(self._filename)),
+            ("Content-Type", "application/warc-fields"),
+            ("Content-Length", str(len(info))),
+        ]
+        return self._pack(headers, info)
+
+    def _pack(self, headers: list[tuple[str, str]], block: bytes) -> bytes:
+        record = b"WARC/1.1\r\n" + _http_headers(headers) + b"\r\n" + block + b"\r\n\r\n"
+        if self.gzip:
+            # отдельный gzip-member на запись — читается по смещению независимо
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            record = compressor.compress(record) + compressor.flush()
+        return record
+
+    async def _close_files(self):
+        if self._file:
+            await self._file.flush()
+            await self._file.close()
+            self._file = None
+        if self._cdx_file:
+            await self._cdx_file.close()
+            self._cdx_file = None
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._close_files()
+
+
+def read_warc_record(path: str, offset: int, length: int | None = None) -> tuple[dict, bytes]:
+    """
+    Читает одну запись по смещению из CDX: (WARC-заголовки, блок).
+    Для .warc.gz распаковывается только нужный gzip-member.
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        if path.endswith(".gz"):
+            raw = f.read(length) if length else f.read()
+            data = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(raw)
+        else:
+            data = f.read(length) if length else f.read()
+
+    head, _, rest = data.partition(b"\r\n\r\n")
+    headers = {}
+    for line in head.split(b"\r\n")[1:]:
+        key, _, value = line.decode("utf-8", "replace").partition(":")
+        headers[key.strip()] = value.strip()
+    block = rest[:int(headers.get("Content-Length", len(rest)))]
+    return headers, block
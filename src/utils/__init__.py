@@ -1,2 +1,2 @@
-from .io_utils import save_json, load_json
+from .io_utils import save_json, load_json, iter_jsonl
 from .stats import compute_page_stats, compute_overall_stats
@@ -1,6 +1,6 @@
 import json
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 def save_json(path: str, data: Any, ensure_ascii: bool = False, indent: int = 2):
     """Сохраняет данные в JSON файл"""
@@ -8,7 +8,27 @@ def save_json(path: str, data: Any, ensure_ascii: bool = False, indent: int = 2)
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=ensure_ascii, indent=indent)
 
-def load_json(path: str) -> Any:
-    """Загружает JSON файл"""
+def load_json(path: str) -> list:
+    """
+    Загружает результаты из JSON файла — всегда списком записей.
+    JSON Lines (формат JSONStorage) — список строк; одиночный объект,
+    в том числе JSON Lines из одной строки, — список из одного элемента.
+    """
+    if str(path).endswith(".jsonl"):
+        return list(iter_jsonl(path))
     with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            if e.msg != "Extra data":
+                raise
+            # несколько JSON-значений подряд — это JSON Lines
+            return list(iter_jsonl(path))
+    return data if isinstance(data, list) else [data]
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    """Лениво читает JSON Lines по строке; для фильтров и индекса по URL — storage.readers"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -41,6 +41,29 @@ class CrawlerStats:
         self.domain_counts = Counter()
         self.request_times = []
 
+        # ошибки и повторы (заполняются из AsyncCrawler.fetch_url)
+        self.errors = Counter()
+        self.success_retries = 0
+        self.retry_times = []
+
+        # произвольные счётчики подсистем: retries_scheduled, retries_dropped, ...
+        self.counters = Counter()
+
+        # трафик по доменам: байты на проводе (сжатые) и после распаковки
+        self.wire_bytes = Counter()
+        self.decoded_bytes = Counter()
+
+    def __getitem__(self, key):
+        """Доступ в стиле словаря: stats["errors"], stats["retry_times"]"""
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def incr(self, name: str, n: int = 1):
+        """Увеличиваем именованный счётчик"""
+        self.counters[name] += n
+
     def start(self):
         self.start_time = time.time()
 
@@ -60,6 +83,23 @@ class CrawlerStats:
         if request_time:
             self.request_times.append(request_time)
 
+    def record_transfer(self, url: str, wire_bytes: int, decoded_bytes: int):
+        domain = urlparse(url).netloc
+        self.wire_bytes[domain] += wire_bytes
+        self.decoded_bytes[domain] += decoded_bytes
+
+    def transfer_summary(self) -> dict:
+        """{domain: {wire, decoded, ratio}} — ratio < 1 значит сжатие работает"""
+        summary = {}
+        for domain in self.decoded_bytes.keys() | self.wire_bytes.keys():
+            wire, decoded = self.wire_bytes[domain], self.decoded_bytes[domain]
+            summary[domain] = {
+                "wire": wire,
+                "decoded": decoded,
+                "ratio": round(wire / decoded, 3) if decoded else None,
+            }
+        return summary
+
     @property
     def elapsed_time(self):
         if not self.start_time:
@@ -87,5 +127,9 @@ class CrawlerStats:
             "top_domains": self.top_domains(),
             "elapsed_time": self.elapsed_time,
             "avg_speed_pages_per_sec": self.avg_speed,
-            "avg_request_time_sec": self.avg_request_time
+            "avg_request_time_sec": self.avg_request_time,
+            "errors": dict(self.errors),
+            "success_retries": self.success_retries,
+            "counters": dict(self.counters),
+            "transfer": self.transfer_summary(),
         }
@@ -1,6 +1,7 @@
 import logging
 
 import pytest
+import pytest_asyncio
 import asyncio
 from aiohttp import web
 from src.crawler.async_crawler import AsyncCrawler
@@ -45,6 +46,42 @@ async def test_server(unused_tcp_port):
 
     await runner.cleanup()
 
+# --- Локальные aiohttp-серверы для тестов ---
+class LocalServers:
+    """
+    base = await serve(app) — приложение на свободном порту 127.0.0.1.
+    await serve.stop(base) — остановить раньше конца теста (проверка офлайн-режима).
+    Остальные серверы останавливаются после теста.
+    """
+
+    def __init__(self):
+        self._runners: dict[str, web.AppRunner] = {}
+
+    async def __call__(self, app: web.Application) -> str:
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        self._runners[base] = runner
+        return base
+
+    async def stop(self, base: str):
+        runner = self._runners.pop(base, None)
+        if runner:
+            await runner.cleanup()
+
+    async def close(self):
+        for base in list(self._runners):
+            await self.stop(base)
+
+
+@pytest_asyncio.fixture
+async def serve():
+    servers = LocalServers()
+    yield servers
+    await servers.close()
+
 # --- Фикстура AsyncCrawler ---
 @pytest.fixture
 async def async_crawler():
@@ -43,6 +43,7 @@ async def test_rate_limiting_single_domain():
         max_concurrent=2,
         requests_per_second=2,
         respect_robots=True,
+        robots_retries=0,
         min_delay=0,
         jitter=0,
         max_depth=1,
@@ -68,15 +69,15 @@ async def test_rate_limiting_single_domain():
 
 @pytest.mark.asyncio
 async def test_rate_limiting_multiple_domains():
-    crawler = AsyncCrawler(max_concurrent=2, requests_per_second=1, min_delay=0, jitter=0)
+    crawler = AsyncCrawler(max_concurrent=2, requests_per_second=1, min_delay=0, jitter=0, robots_retries=0)
     with aioresponses() as m:
         m.get("https://example1.com", body=HTML_PAGE, status=200)
         m.get("https://example2.com", body=HTML_PAGE, status=200)
 
         await crawler.crawl(["https://example1.com", "https://example2.com"], max_pages=2)
 
-    assert "https://example1.com" in crawler.processed_urls
-    assert "https://example2.com" in crawler.processed_urls
+    assert "https://example1.com/" in crawler.processed_urls
+    assert "https://example2.com/" in crawler.processed_urls
 
 
 @pytest.mark.asyncio
@@ -100,7 +101,8 @@ async def test_delay_statistics_real_http():
         requests_per_second=1,
         min_delay=0.5,
         jitter=0,
-        max_depth=1
+        max_depth=1,
+        robots_retries=0
     )
 
     await crawler.crawl([
@@ -0,0 +1,125 @@
+import json
+import pytest
+import aiosqlite
+from datetime import datetime
+
+from storage.blob_store import BlobStore, blob_hash
+from storage.json_storage import JSONStorage
+from storage.sqlite_storage import SQLiteStorage
+
+
+def record(url, body):
+    return {
+        "url": url, "title": "T", "text": "extracted", "links": [], "metadata": {},
+        "crawled_at": datetime.utcnow(), "status_code": 200, "content_type": "text/html",
+        "body": body, "body_encoding": "utf-8",
+    }
+
+
+@pytest.mark.asyncio
+async def test_blob_store_dedup_and_refcount(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    template = b"<html>" + b"same template " * 1000 + b"</html>"
+
+    h1 = await store.put("http://a.com/1", template)
+    h2 = await store.put("http://mirror.com/1", template)
+    assert h1 == h2 == blob_hash(template)
+    stats = await store.get_stats()
+    assert stats["blobs"] == 1 and stats["urls"] == 2
+    assert stats["stored_bytes"] < len(template) // 10
+
+    # страница изменилась: старое тело остаётся у зеркала
+    await store.put("http://a.com/1", b"<html>new</html>")
+    assert await store.gc() == 0
+    await store.release("http://mirror.com/1")
+    assert await store.gc() == 1
+    assert await store.get(h1) is None
+    assert await store.get_for_url("http://a.com/1") == b"<html>new</html>"
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_blob_store_commits_index_in_batches(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"), batch_size=3)
+    await store._ensure_open()
+    commits = []
+    commit = store._conn.commit
+
+    async def counting_commit():
+        commits.append(1)
+        await commit()
+
+    store._conn.commit = counting_commit
+    for i in range(5):
+        await store.put(f"http://a.com/{i}", f"<html>{i % 2}</html>".encode())
+    assert len(commits) == 1
+    # незаписанная пачка уже видна через get_for_url
+    assert await store.get_for_url("http://a.com/4") == b"<html>0</html>"
+    await store.close()
+    assert len(commits) == 2
+
+    store = BlobStore(str(tmp_path / "blobs"))
+    stats = await store.get_stats()
+    async with store._conn.execute("SELECT refs FROM blobs ORDER BY refs") as cur:
+        refs = [row[0] for row in await cur.fetchall()]
+    await store.close()
+    assert stats["blobs"] == 2 and stats["urls"] == 5
+    assert refs == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_storages_keep_only_body_hash(tmp_path):
+    store = BlobStore(str(tmp_path / "blobs"))
+    body = "<html><title>Т</title></html>".encode()
+
+    json_storage = JSONStorage(str(tmp_path / "out.jsonl"), blob_store=store)
+    await json_storage.save(record("http://a.com/", body))
+    await json_storage.close()
+
+    sqlite_storage = SQLiteStorage(str(tmp_path / "out.db"), blob_store=store, fts=True)
+    await sqlite_storage.init_db()
+    await sqlite_storage.save(record("http://b.com/", body))
+    await sqlite_storage.flush()
+    # извлечённый текст не уходит вместе с телом — FTS его находит
+    assert [r["url"] for r in await sqlite_storage.search("extracted")] == ["http://b.com/"]
+    await sqlite_storage.close()
+
+    saved = json.loads((tmp_path / "out.jsonl").read_text(encoding="utf-8"))
+    assert "body" not in saved and saved["text"] == "extracted"
+    assert saved["body_hash"] == blob_hash(body)
+
+    async with aiosqlite.connect(str(tmp_path / "out.db")) as db:
+        async with db.execute("SELECT body_hash, body_encoding FROM pages") as cursor:
+            assert await cursor.fetchall() == [(blob_hash(body), "utf-8")]
+
+    assert await store.get(saved["body_hash"]) == body
+    assert (await store.get_stats())["blobs"] == 1
+    await store.close()
+
+
+async def open_storage(kind, tmp_path, store):
+    if kind == "json":
+        return JSONStorage(str(tmp_path / "out.jsonl"), blob_store=store)
+    if kind == "sqlite":
+        storage = SQLiteStorage(str(tmp_path / "out.db"), blob_store=store)
+        await storage.init_db()
+        return storage
+    pytest.importorskip("pyarrow")
+    from storage.parquet_storage import ParquetStorage
+    return ParquetStorage(str(tmp_path / "out.parquet"), blob_store=store)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("kind", ["json", "sqlite", "parquet"])
+async def test_storage_close_writes_blob_index_tail(tmp_path, kind):
+    # меньше batch_size тел: индекс пишет только close() хранилища
+    storage = await open_storage(kind, tmp_path, BlobStore(str(tmp_path / "blobs")))
+    for i in range(3):
+        await storage.save(record(f"http://a.com/{i}", f"<html>{i % 2}</html>".encode()))
+    await storage.close()
+
+    store = BlobStore(str(tmp_path / "blobs"))
+    assert await store.get_for_url("http://a.com/2") == b"<html>0</html>"
+    async with store._conn.execute("SELECT refs FROM blobs ORDER BY refs") as cur:
+        assert [row[0] for row in await cur.fetchall()] == [1, 2]
+    await store.close()
@@ -0,0 +1,110 @@
+import time
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def test_breaker_state_transitions():
+    transitions = []
+    cb = CircuitBreaker(
+        max_errors=2,
+        reset_timeout=0.05,
+        half_open_max_probes=1,
+        on_state_change=lambda d, s: transitions.append(s),
+    )
+
+    cb.record_error("a.com")
+    assert cb.get_state("a.com") == CLOSED
+    cb.record_error("a.com")
+    assert cb.get_state("a.com") == OPEN
+    assert not cb.allow_request("a.com")
+
+    time.sleep(0.06)
+    assert cb.allow_request("a.com")       # первая проба
+    assert not cb.allow_request("a.com")   # лимит проб исчерпан
+    assert cb.get_state("a.com") == HALF_OPEN
+
+    cb.record_error("a.com")               # проба провалилась
+    assert cb.get_state("a.com") == OPEN
+
+    time.sleep(0.06)
+    assert cb.allow_request("a.com")
+    cb.record_success("a.com")
+    assert cb.get_state("a.com") == CLOSED
+    assert transitions == [OPEN, HALF_OPEN, OPEN, HALF_OPEN, CLOSED]
+
+
+@pytest.mark.asyncio
+async def test_blocked_domain_urls_are_parked_and_released(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    state = {"calls": 0}
+
+    async def handler(request):
+        state["calls"] += 1
+        if state["calls"] <= 2:
+            return web.Response(text="down", status=503)
+        return web.Response(text="<html><title>up</title></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    base = await serve(app)
+    urls = [f"{base}/p{i}" for i in range(4)]
+
+    async with AsyncCrawler(
+        respect_robots=False,
+        requests_per_second=100,
+        max_concurrent=1,
+        max_depth=0,
+        breaker_max_errors=2,
+        breaker_reset_timeout=0.2,
+    ) as crawler:
+        results = await crawler.crawl(urls, max_pages=4, progress_interval=0.1)
+
+    assert sorted(r["url"] for r in results) == sorted(urls)
+    assert crawler.stats.counters["parked_urls"] >= 1
+    assert crawler.stats.counters["parked_released"] >= 1
+    assert crawler.circuit_breaker.get_state("127.0.0.1:" + base.rsplit(":", 1)[1]) == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_robots_blocked_probe_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    domain = "example.test"
+    private, public = f"http://{domain}/private", f"http://{domain}/a"
+
+    async with AsyncCrawler(respect_robots=True, breaker_max_errors=1, breaker_reset_timeout=60) as crawler:
+        async def can_fetch(url, user_agent):
+            return "/private" not in url
+
+        async def no_delay(url, user_agent):
+            return 0
+
+        monkeypatch.setattr(crawler.robots_parser, "can_fetch", can_fetch)
+        monkeypatch.setattr(crawler.robots_parser, "get_crawl_delay", no_delay)
+
+        crawler.circuit_breaker.record_error(domain)
+        crawler._park(domain, private, 0, {})
+        crawler._park(domain, public, 0, {})
+        assert crawler._probe_scheduled == {domain: private}
+
+        # проба заблокирована robots.txt — отметка снята, пробой становится следующий URL
+        await crawler._process_url(private, 0, {}, deferred=True)
+
+    assert crawler._probe_scheduled == {domain: public}
+    assert crawler.failed_urls[private] == "Blocked by robots.txt"
+
+
+@pytest.mark.asyncio
+async def test_urls_left_parked_at_crawl_end_are_failed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    url = "http://example.test/a"
+
+    async with AsyncCrawler(respect_robots=False) as crawler:
+        crawler._parked["example.test"].append((url, 0, {}))
+        await crawler.crawl([], max_pages=1, progress_interval=0.1)
+
+    assert crawler.failed_urls[url] == "Circuit breaker still open at crawl end"
+    assert not crawler._parked
+    assert crawler.stats.counters["parked_dropped"] == 1
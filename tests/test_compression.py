@@ -0,0 +1,89 @@
+import gzip
+import zlib
+from urllib.parse import urlsplit
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler import compression
+from crawler.compression import accept_encoding, make_decoder
+
+PAGE = ("<html><title>Сжатие</title><body>" + "<p>повторяющийся текст</p>" * 500 + "</body></html>").encode()
+
+
+def test_decoders_roundtrip():
+    raw_deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    raw = raw_deflate.compress(PAGE) + raw_deflate.flush()
+    for encoding, data in (("gzip", gzip.compress(PAGE)), ("deflate", zlib.compress(PAGE)), ("deflate", raw)):
+        decoder = make_decoder(encoding)
+        out = b"".join(decoder.decompress(data[i:i + 100]) for i in range(0, len(data), 100)) + decoder.flush()
+        assert out == PAGE
+    assert "gzip" in accept_encoding()
+    with pytest.raises(ValueError):
+        make_decoder("compress")
+
+
+def test_decoders_bound_output_on_compression_bombs():
+    bombs = [("gzip", gzip.compress(b"\0" * (20 << 20)))]
+    if compression.brotli is not None:
+        bombs.append(("br", compression.brotli.compress(b"\0" * (20 << 20))))
+    if compression.zstandard is not None:
+        bombs.append(("zstd", compression.zstandard.ZstdCompressor().compress(b"\0" * (20 << 20))))
+    for encoding, data in bombs:
+        decoder = make_decoder(encoding)
+        out = decoder.decompress(data[:64 * 1024], 1001)
+        # 64 KiB сжатого входа — это мегабайты нулей, а отдано не больше лимита
+        # (zstd разворачивает вход целыми блоками — перебор не больше одного блока)
+        if encoding == "gzip":
+            assert len(out) == 1001
+        elif encoding == "zstd":
+            assert 1001 <= len(out) <= 1001 + 128 * 1024
+        else:
+            # brotli округляет лимит вверх до своих буферов, но перебор ограничен
+            assert 1001 < len(out) <= 64 * 1024
+            continue
+        assert decoder.unconsumed_tail
+
+
+def test_brotli_without_output_limit_is_not_advertised(monkeypatch):
+    class OldDecompressor:
+        def process(self, data):
+            return data
+
+    class OldBrotli:
+        Decompressor = OldDecompressor
+
+    # brotli < 1.2 и brotlicffi не умеют output_buffer_limit — ограничить ответ нечем
+    monkeypatch.setattr(compression, "brotli", OldBrotli)
+    assert not compression._brotli_output_limit()
+
+
+@pytest.mark.asyncio
+async def test_compressed_transfer_is_decoded_and_accounted(serve):
+    seen = {}
+    app = web.Application()
+
+    async def page(request):
+        seen["accept"] = request.headers.get("Accept-Encoding")
+        return web.Response(
+            body=gzip.compress(PAGE),
+            headers={"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip"},
+        )
+
+    app.router.add_get("/", page)
+    host = urlsplit(await serve(app)).netloc
+
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100) as crawler:
+        result = await crawler.fetch(f"http://{host}/")
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, max_body_size=1000) as capped:
+        truncated = await capped.fetch(f"http://{host}/")
+
+    assert seen["accept"] == accept_encoding()
+    assert result.body == PAGE
+    transfer = crawler.stats.get_summary()["transfer"][host]
+    assert transfer["decoded"] == len(PAGE)
+    assert transfer["wire"] == len(gzip.compress(PAGE))
+    assert transfer["ratio"] < 0.1
+
+    # лимит применяется к распакованным байтам
+    assert truncated.truncated and len(truncated.body) == 1000
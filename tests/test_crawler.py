@@ -101,6 +101,20 @@ async def test_crawler_queue_priority():
     assert third[0] == "url_low"
 
 
+@pytest.mark.asyncio
+async def test_crawler_queue_idle_counts_entries_in_work():
+    queue = CrawlerQueue()
+    assert queue.idle
+    await queue.add_url("http://a.com/")
+    url, depth, attempts = await queue.get_entry()
+    assert not queue.idle  # очередь пуста, но URL ещё у воркера
+    await queue.requeue(url, depth, {})
+    queue.task_done()
+    assert not queue.idle
+    await queue.get_entry()
+    queue.task_done()
+    assert queue.idle
+
 # -----------------------------
 # 5️⃣ Тест ограничения глубины
 # -----------------------------
@@ -150,6 +164,7 @@ async def test_url_filtering():
     urls = ["http://example.com/start", "http://notallowed.com/page"]
     crawler = AsyncCrawler(
         allowed_domains=["example.com"],
+        respect_robots=False,
         include_patterns=[r"/start"],
         exclude_patterns=[r"/forbidden"]
     )
@@ -180,7 +195,7 @@ async def test_url_filtering():
 @pytest.mark.asyncio
 async def test_no_duplicates_in_visited():
     urls = ["http://example.com/start"]
-    crawler = AsyncCrawler(max_concurrent=2)
+    crawler = AsyncCrawler(max_concurrent=2, respect_robots=False)
 
     async def fake_parse(url, html):
         return {
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+import pytest
+from datetime import datetime
+
+from storage.csv_storage import CSVStorage, RowEncoder, flatten_record, rotated_files
+
+
+PAGE = {
+    "url": "http://a.com",
+    "links": ["http://a.com/1", "http://a.com/2"],
+    "metadata": {"description": "d", "keywords": "k"},
+    "crawled_at": datetime(2024, 1, 2, 3, 4, 5),
+}
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_flatten_strategies():
+    assert flatten_record(PAGE, "json") == {
+        "url": "http://a.com",
+        "links": '["http://a.com/1","http://a.com/2"]',
+        "metadata": '{"description":"d","keywords":"k"}',
+        "crawled_at": "2024-01-02T03:04:05",
+    }
+    dotted = flatten_record(PAGE, "dotted")
+    assert dotted["metadata.description"] == "d"
+    assert json.loads(dotted["links"]) == PAGE["links"]
+    assert flatten_record(PAGE, "join")["links"] == "http://a.com/1|http://a.com/2"
+
+
+@pytest.mark.asyncio
+async def test_new_columns_rotate_to_file_with_extended_header(tmp_path):
+    path = tmp_path / "pages.csv"
+    storage = CSVStorage(str(path), batch_size=10, flatten="dotted")
+    await storage.save(PAGE)
+    await storage.save(dict(PAGE, url="http://b.com"))
+    await storage.save(dict(PAGE, url="http://c.com", status_code=200))
+    await storage.save(dict(PAGE, url="http://d.com"))
+    await storage.close()
+
+    assert storage.files == [str(path), str(tmp_path / "pages-00001.csv")]
+    first, second = read_rows(storage.files[0]), read_rows(storage.files[1])
+    assert [r["url"] for r in first] == ["http://a.com", "http://b.com"]
+    assert "status_code" not in first[0]
+    assert [r["url"] for r in second] == ["http://c.com", "http://d.com"]
+    assert second[0]["status_code"] == "200" and second[1]["status_code"] == ""
+    assert second[1]["metadata.keywords"] == "k"
+
+
+@pytest.mark.parametrize("delimiter", [",", ";"])
+def test_row_encoder_matches_csv_writer(delimiter):
+    fields = ["a", "b", "c"]
+    rows = [
+        {"a": "plain", "b": 'say "hi"', "c": "x,y;z"},
+        {"a": "line\nbreak", "b": "cr\rhere", "c": 3},
+        {"a": None, "b": "", "c": 1.5},
+        {"a": "only a"},
+    ]
+    expected = io.StringIO()
+    writer = csv.writer(expected, delimiter=delimiter)
+    writer.writerow(fields)
+    writer.writerows([[r.get(f, "") for f in fields] for r in rows])
+
+    encoder = RowEncoder(fields, delimiter)
+    assert encoder.header() + encoder.encode(rows) == expected.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_rotation_after_restart_starts_a_new_file(tmp_path):
+    path = tmp_path / "pages.csv"
+    for run in ("first", "second"):
+        storage = CSVStorage(str(path), flatten="dotted")
+        await storage.save(dict(PAGE, url=f"http://{run}.com"))
+        await storage.save(dict(PAGE, url=f"http://{run}.com/x", status_code=200))
+        await storage.close()
+
+    assert storage.files[-1] == str(tmp_path / "pages-00002.csv")
+    assert rotated_files(str(path)) == [str(path), str(tmp_path / "pages-00001.csv"), str(tmp_path / "pages-00002.csv")]
+    assert [r["url"] for r in read_rows(tmp_path / "pages-00001.csv")] == ["http://first.com/x"]
+    assert [r["url"] for r in read_rows(tmp_path / "pages-00002.csv")] == ["http://second.com/x"]
+    # тот же заголовок — второй запуск дописал pages.csv без повторного заголовка
+    assert [r["url"] for r in read_rows(path)] == ["http://first.com", "http://second.com"]
+
+
+@pytest.mark.asyncio
+async def test_restart_with_other_columns_does_not_append_to_base_file(tmp_path):
+    path = tmp_path / "pages.csv"
+    storage = CSVStorage(str(path), flatten="dotted")
+    await storage.save(PAGE)
+    await storage.close()
+
+    storage = CSVStorage(str(path), flatten="dotted")
+    await storage.save({"url": "http://b.com", "status_code": 200})
+    await storage.close()
+
+    assert storage.files == [str(tmp_path / "pages-00001.csv")]
+    assert [r["url"] for r in read_rows(path)] == ["http://a.com"]
+    assert read_rows(tmp_path / "pages-00001.csv") == [{"url": "http://b.com", "status_code": "200"}]
@@ -0,0 +1,80 @@
+import asyncio
+import socket
+from urllib.parse import urlsplit
+import pytest
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.dns_resolver import CachingResolver
+
+
+class StubResolver(AbstractResolver):
+    """Локальный резолвер: *.test → 127.0.0.1, остальное — NXDOMAIN"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        self.calls.append(host)
+        await asyncio.sleep(self.delay)
+        if not host.endswith(".test"):
+            raise socket.gaierror(socket.EAI_NONAME, f"Unknown host {host}")
+        return [{
+            "hostname": host, "host": "127.0.0.1", "port": port,
+            "family": socket.AF_INET, "proto": 0, "flags": socket.AI_NUMERICHOST,
+        }]
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_cache_single_flight_and_negative_cache():
+    stub = StubResolver(delay=0.05)
+    resolver = CachingResolver(stub, ttl=60, negative_ttl=60)
+
+    results = await asyncio.gather(*(resolver.resolve("a.test", 80) for _ in range(10)))
+    assert stub.calls == ["a.test"]
+    assert all(r[0]["host"] == "127.0.0.1" and r[0]["port"] == 80 for r in results)
+    assert (await resolver.resolve("a.test", 443))[0]["port"] == 443
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            await resolver.resolve("missing.example")
+    assert stub.calls.count("missing.example") == 1
+    assert resolver.stats["negative_hits"] == 1
+
+    resolver.prefetch("b.test")
+    resolver.prefetch("127.0.0.1")
+    await asyncio.sleep(0.1)
+    await resolver.resolve("b.test", family=socket.AF_UNSPEC)  # так зовёт TCPConnector
+    assert stub.calls.count("b.test") == 1
+    assert resolver.stats["prefetched"] == 1
+    await resolver.close()
+
+
+@pytest.mark.asyncio
+async def test_crawler_resolves_through_stub_and_prefetches(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    app = web.Application()
+    port_holder = {}
+
+    async def page(request):
+        port = port_holder["port"]
+        return web.Response(
+            text=f'<html><title>{request.host}</title><a href="http://b.test:{port}/">b</a></html>',
+            content_type="text/html",
+        )
+
+    app.router.add_get("/", page)
+    port = port_holder["port"] = urlsplit(await serve(app)).port
+
+    stub = StubResolver()
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, resolver=stub) as crawler:
+        await crawler.crawl([f"http://a.test:{port}/"], max_pages=5, progress_interval=0.1)
+
+    assert f"http://b.test:{port}/" in crawler.processed_urls
+    assert sorted(stub.calls) == ["a.test", "b.test"]
+    assert crawler.stats.counters["dns_prefetched"] == 2
@@ -0,0 +1,53 @@
+import codecs
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.encoding import resolve_charset
+from crawler.parser import HTMLParser
+
+TITLE = "Привет, мир"
+
+
+def test_resolve_charset_order():
+    cp1251 = f"<html><title>{TITLE}</title></html>".encode("cp1251")
+    meta = b'<html><head><meta charset="windows-1251"></head></html>'
+
+    assert resolve_charset("text/html; charset=Windows-1251", cp1251) == ("cp1251", "header")
+    assert resolve_charset("text/html", meta) == ("cp1251", "meta")
+    assert resolve_charset("text/html; charset=cp1251", codecs.BOM_UTF8 + b"<html>") == ("utf-8-sig", "bom")
+    assert resolve_charset("text/html; charset=bogus", b"<html>") == ("utf-8", "default")
+
+
+@pytest.mark.asyncio
+async def test_parser_decodes_bytes_with_given_encoding():
+    body = f"<html><title>{TITLE}</title><body><p>Текст</p></body></html>".encode("koi8-r")
+    parsed = await HTMLParser().parse_html(body, "http://test.com", encoding="koi8-r")
+    assert parsed["title"] == TITLE
+    assert "Текст" in parsed["text"]
+
+
+@pytest.mark.asyncio
+async def test_crawler_handles_non_utf8_pages(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    app = web.Application()
+
+    async def header(request):
+        body = f'<html><title>{TITLE}</title><a href="/meta">m</a></html>'.encode("cp1251")
+        return web.Response(body=body, headers={"Content-Type": "text/html; charset=windows-1251"})
+
+    async def meta(request):
+        body = f'<html><head><meta charset="windows-1251"><title>{TITLE}</title></head></html>'.encode("cp1251")
+        return web.Response(body=body, headers={"Content-Type": "text/html"})
+
+    app.router.add_get("/", header)
+    app.router.add_get("/meta", meta)
+    base = await serve(app)
+
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100) as crawler:
+        await crawler.crawl([base + "/"], max_pages=5, progress_interval=0.1)
+
+    assert crawler.processed_urls[base + "/"]["title"] == TITLE
+    assert crawler.processed_urls[base + "/meta"]["title"] == TITLE
+    assert crawler.stats.counters["charset_header"] == 1
+    assert crawler.stats.counters["charset_meta"] == 1
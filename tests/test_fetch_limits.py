@@ -0,0 +1,45 @@
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+
+
+def make_app() -> web.Application:
+    app = web.Application()
+
+    async def big(request):
+        return web.Response(text="<html>" + "x" * 50_000 + "</html>", content_type="text/html")
+
+    async def image(request):
+        return web.Response(body=b"\x89PNG" + b"\0" * 1000, content_type="image/png")
+
+    async def octet_html(request):
+        return web.Response(body=b"<!DOCTYPE html><html><title>t</title></html>", content_type="application/octet-stream")
+
+    async def octet_binary(request):
+        return web.Response(body=b"\0\1\2" * 1000, content_type="application/octet-stream")
+
+    app.router.add_get("/big", big)
+    app.router.add_get("/image", image)
+    app.router.add_get("/octet-html", octet_html)
+    app.router.add_get("/octet-binary", octet_binary)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_body_cap_and_content_type_filter(serve):
+    base = await serve(make_app())
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, max_body_size=10_000, chunk_size=4096) as crawler:
+        big = await crawler.fetch(f"{base}/big")
+        image = await crawler.fetch(f"{base}/image")
+        octet_html = await crawler.fetch(f"{base}/octet-html")
+        octet_binary = await crawler.fetch(f"{base}/octet-binary")
+
+    assert big.truncated and len(big.body) == 10_000
+    assert image is None
+    assert octet_html.text.startswith("<!DOCTYPE html>")
+    assert octet_binary is None
+    assert crawler.stats.counters["body_truncated"] == 1
+    assert crawler.stats.counters["skipped_content_type"] == 1
+    assert crawler.stats.counters["skipped_sniffed"] == 1
+    assert "image/png" in crawler.failed_urls[f"{base}/image"]
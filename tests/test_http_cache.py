@@ -0,0 +1,176 @@
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.http_cache import HTTPCache
+from crawler.url_utils import canonicalize_url
+from storage.json_storage import JSONStorage
+
+ETAG = '"v1"'
+
+
+def make_app(hits: list) -> web.Application:
+    """Страница с ETag: на If-None-Match отвечает 304"""
+    app = web.Application()
+
+    async def page(request):
+        hits.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == ETAG:
+            return web.Response(status=304, headers={"ETag": ETAG})
+        return web.Response(
+            text="<html><title>Cached</title><body><p>hello</p></body></html>",
+            content_type="text/html",
+            headers={"ETag": ETAG, "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"},
+        )
+
+    app.router.add_get("/", page)
+    return app
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("HTTP://Example.COM:80") == "http://example.com/"
+    assert canonicalize_url("https://example.com:443/a?b=1#frag") == "https://example.com/a?b=1"
+    assert canonicalize_url("http://example.com:8080/a") == "http://example.com:8080/a"
+
+
+@pytest.mark.asyncio
+async def test_second_crawl_uses_conditional_get(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    hits = []
+    url = await serve(make_app(hits)) + "/"
+    cache_path = str(tmp_path / "cache.db")
+    storage = JSONStorage(str(tmp_path / "first.jsonl"))
+    async with AsyncCrawler(storage=storage, http_cache=HTTPCache(cache_path)) as crawler:
+        await crawler.crawl([url], max_pages=1, progress_interval=0.1)
+    await storage.close()
+    assert crawler.processed_urls[url]["title"] == "Cached"
+
+    storage = JSONStorage(str(tmp_path / "second.jsonl"))
+    async with AsyncCrawler(storage=storage, http_cache=HTTPCache(cache_path)) as crawler:
+        parsed = []
+        original = crawler.parse_html
+
+        async def tracking_parse(page_url, html, encoding=None):
+            parsed.append(page_url)
+            return await original(page_url, html, encoding=encoding)
+
+        crawler.parse_html = tracking_parse
+        await crawler.crawl([url], max_pages=1, progress_interval=0.1)
+    await storage.close()
+
+    assert hits == [None, ETAG]
+    assert parsed == []
+    assert crawler.processed_urls[url]["title"] == "Cached"
+    assert crawler.stats.counters["http_not_modified"] == 1
+    assert not (tmp_path / "second.jsonl").exists() or (tmp_path / "second.jsonl").read_text() == ""
+
+
+@pytest.mark.asyncio
+async def test_unchanged_body_skips_parse_but_follows_links(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    app = web.Application()
+
+    async def index(request):
+        # без ETag / Last-Modified — сравнивается только хэш тела
+        return web.Response(text='<html><title>Index</title><a href="/next">n</a></html>', content_type="text/html")
+
+    async def nxt(request):
+        return web.Response(text="<html><title>Next</title></html>", content_type="text/html")
+
+    app.router.add_get("/", index)
+    app.router.add_get("/next", nxt)
+    base = await serve(app)
+    cache_path = str(tmp_path / "cache.db")
+
+    async with AsyncCrawler(http_cache=HTTPCache(cache_path)) as crawler:
+        await crawler.crawl([base + "/"], max_pages=5, progress_interval=0.1)
+
+    async with AsyncCrawler(http_cache=HTTPCache(cache_path)) as crawler:
+        parsed = []
+
+        async def no_parse(page_url, html, encoding=None):
+            parsed.append(page_url)
+            return {}
+
+        crawler.parse_html = no_parse
+        await crawler.crawl([base + "/"], max_pages=5, progress_interval=0.1)
+
+    assert parsed == []
+    assert base + "/next" in crawler.processed_urls
+    assert crawler.processed_urls[base + "/"]["title"] == "Index"
+    assert crawler.stats.counters["content_unchanged"] == 2
+
+
+@pytest.mark.asyncio
+async def test_not_modified_without_record_refetches_via_retry_queue(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    hits = []
+    url = await serve(make_app(hits)) + "/"
+    cache = HTTPCache(str(tmp_path / "cache.db"))
+    await cache.put(url, etag=ETAG, last_modified=None, body_hash=None, record=None)
+
+    async with AsyncCrawler(http_cache=cache) as crawler:
+        await crawler.crawl([url], max_pages=1, progress_interval=0.1)
+
+    # 304 → повтор без валидаторов через RetryQueue, а не внутри воркера
+    assert hits == [ETAG, None]
+    assert crawler.processed_urls[url]["title"] == "Cached"
+    assert crawler.stats.counters["not_modified_refetch"] == 1
+    # повтор — не новый запрос: бюджет повторов не раздувается
+    assert crawler.retry_budget.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_not_modified_to_unconditional_request_fails_once(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    hits = []
+    app = web.Application()
+
+    async def always_304(request):
+        hits.append(request.headers.get("If-None-Match"))
+        return web.Response(status=304, headers={"ETag": ETAG})
+
+    app.router.add_get("/", always_304)
+    url = await serve(app) + "/"
+    cache = HTTPCache(str(tmp_path / "cache.db"))
+    await cache.put(url, etag=ETAG, last_modified=None, body_hash=None, record=None)
+
+    async with AsyncCrawler(http_cache=cache) as crawler:
+        await crawler.crawl([url], max_pages=1, progress_interval=0.1)
+        # 304 и без валидаторов — страница не удалась, устаревшая запись удалена, без повторов по кругу
+        assert hits == [ETAG, None]
+        assert url not in crawler.processed_urls
+        assert crawler.stats.counters["not_modified_refetch"] == 1
+        assert await cache.get(url) is None
+
+
+@pytest.mark.asyncio
+async def test_touch_is_batched_with_puts(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = HTTPCache(path)
+    for i in range(3):
+        await cache.put(f"http://example.com/{i}", etag=None, last_modified=None, body_hash="old", record={"i": i})
+    await cache.close()
+
+    cache = HTTPCache(path, batch_size=10)
+    await cache._ensure_open()
+    commits = []
+    commit = cache._conn.commit
+
+    async def counting_commit():
+        commits.append(1)
+        await commit()
+
+    cache._conn.commit = counting_commit
+    for i in range(3):
+        await cache.touch(f"http://example.com/{i}", etag=f'"e{i}"', last_modified=None, body_hash="new")
+    assert commits == []
+    # ещё не записанный touch уже виден в get
+    assert (await cache.get("http://example.com/1"))["etag"] == '"e1"'
+    await cache.close()
+    assert commits == [1]
+
+    cache = HTTPCache(path)
+    entry = await cache.get("http://example.com/2")
+    await cache.close()
+    assert entry["etag"] == '"e2"' and entry["content_hash"] == "new" and entry["record"] == {"i": 2}
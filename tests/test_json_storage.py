@@ -0,0 +1,165 @@
+import json
+import pytest
+from datetime import datetime
+
+from storage import json_storage
+from storage.json_storage import JSONStorage
+
+
+def record(i):
+    return {"url": f"http://a.com/{i}", "title": f"Заголовок {i}", "links": [], "crawled_at": datetime(2024, 1, 2, 3, 4, 5)}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("thread_writer", [False, True])
+@pytest.mark.parametrize("use_orjson", [False, True])
+async def test_batches_written_as_json_lines(tmp_path, monkeypatch, thread_writer, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_storage, "orjson", None)
+
+    path = tmp_path / "out.jsonl"
+    storage = JSONStorage(str(path), batch_size=4, thread_writer=thread_writer)
+    for i in range(10):
+        await storage.save(record(i))
+    await storage.close()
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["url"] for line in lines] == [f"http://a.com/{i}" for i in range(10)]
+    assert lines[0]["title"] == "Заголовок 0"
+    assert lines[0]["crawled_at"] == "2024-01-02T03:04:05"
+
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_stays_buffered_and_save_does_not_raise(tmp_path, monkeypatch):
+    path = tmp_path / "out.jsonl"
+    storage = JSONStorage(str(path), batch_size=2, thread_writer=True)
+    write_sync = storage._write_sync
+    calls = []
+
+    def flaky(items):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        write_sync(items)
+
+    monkeypatch.setattr(storage, "_write_sync", flaky)
+    for i in range(2):
+        await storage.save(record(i))  # запись принята, хотя сброс пачки упал
+    assert len(storage._buffer) == 2
+
+    await storage.save(record(2))
+    await storage.close()
+
+    urls = [json.loads(line)["url"] for line in path.read_text(encoding="utf-8").splitlines()]
+    assert urls == [f"http://a.com/{i}" for i in range(3)]
+
+@pytest.mark.asyncio
+async def test_gzip_segments_rotate_by_records_with_manifest(tmp_path):
+    import gzip
+
+    storage = JSONStorage(str(tmp_path / "pages.jsonl"), batch_size=3, compression="gzip", max_records=4)
+    for i in range(10):
+        await storage.save(record(i))
+    await storage.close()
+
+    manifest = json.loads((tmp_path / "pages.manifest.json").read_text(encoding="utf-8"))
+    segments = manifest["segments"]
+    assert [s["records"] for s in segments] == [4, 4, 2]
+    assert manifest["records"] == 10
+    assert segments[0]["file"] == "pages-00000.jsonl.gz"
+    assert segments[1]["first_url"] == "http://a.com/4" and segments[1]["last_url"] == "http://a.com/7"
+    assert not list(tmp_path.glob("*.part"))
+
+    urls = []
+    for seg in segments:
+        with gzip.open(tmp_path / seg["file"], "rt", encoding="utf-8") as f:
+            urls += [json.loads(line)["url"] for line in f]
+    assert urls == [f"http://a.com/{i}" for i in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_zstd_segments_rotate_by_size(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+
+    storage = JSONStorage(str(tmp_path / "pages.jsonl"), batch_size=1, compression="zstd", max_file_size=1)
+    for i in range(3):
+        await storage.save(record(i))
+    await storage.close()
+
+    manifest = json.loads((tmp_path / "pages.manifest.json").read_text(encoding="utf-8"))
+    assert [s["file"] for s in manifest["segments"]] == [f"pages-{i:05d}.jsonl.zst" for i in range(3)]
+    data = zstandard.ZstdDecompressor().decompressobj().decompress((tmp_path / "pages-00002.jsonl.zst").read_bytes())
+    assert json.loads(data)["url"] == "http://a.com/2"
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+def test_part_left_by_crash_is_sealed_on_restart(tmp_path, compression):
+    if compression == "zstd":
+        pytest.importorskip("zstandard")
+    from storage.segments import SegmentWriter, _decompress_partial
+    from storage.readers import JSONLReader
+
+    def encode(records):
+        return "".join(json.dumps(r) + "\n" for r in records).encode()
+
+    base = str(tmp_path / "pages")
+    writer = SegmentWriter(base, ".jsonl", compression=compression)
+    writer.write([{"url": "http://a.com/0"}, {"url": "http://a.com/1"}], encode)
+    # пачка уже на диске, хотя файл не закрыт и не сброшен вручную
+    part = next(tmp_path.glob("*.part"))
+    assert _decompress_partial(part.read_bytes(), compression).count(b"\n") == 2
+    writer._file.write(writer._compressor.compress(b'{"url": "http://a.com/2"'))  # пачка оборвана сбоем
+    writer._file.close()
+
+    writer = SegmentWriter(base, ".jsonl", compression=compression)
+    assert list(tmp_path.glob("*.part"))  # конструктор диск не трогает — восстановление в потоке писателя
+    writer.write([{"url": "http://a.com/3"}], encode)
+    writer.close()
+
+    assert not list(tmp_path.glob("*.part"))
+    segments = json.loads((tmp_path / "pages.manifest.json").read_text(encoding="utf-8"))["segments"]
+    assert [(s["records"], s.get("recovered", False)) for s in segments] == [(2, True), (1, False)]
+    assert segments[0]["last_url"] == "http://a.com/1"
+    with JSONLReader(str(tmp_path / segments[0]["file"])) as reader:
+        assert [r["url"] for r in reader.iter()] == ["http://a.com/0", "http://a.com/1"]
+
+
+@pytest.mark.asyncio
+async def test_partial_segment_write_puts_back_only_unwritten_tail(tmp_path):
+    from storage.readers import ManifestReader
+
+    storage = JSONStorage(str(tmp_path / "pages.jsonl"), batch_size=5, compression="gzip", max_records=2)
+    segments = storage._segments
+    open_segment = segments._open
+    opened = []
+
+    class DiskFull:
+        def __init__(self, file):
+            self._file = file
+
+        def write(self, data):
+            self._file.write(data[:3])  # блок оборван посередине
+            raise OSError("disk full")
+
+        def __getattr__(self, name):
+            return getattr(self._file, name)
+
+    def flaky_open():
+        open_segment()
+        opened.append(segments._file)
+        if len(opened) == 2:
+            segments._file = DiskFull(segments._file)
+
+    segments._open = flaky_open
+    for i in range(5):
+        await storage.save(record(i))
+    # первый сегмент [0, 1] записан — в буфере только хвост
+    assert [r["url"] for r in storage._buffer] == [f"http://a.com/{i}" for i in (2, 3, 4)]
+    await storage.close()
+
+    assert not list(tmp_path.glob("*.part"))
+    with ManifestReader(str(tmp_path / "pages.manifest.json")) as reader:
+        assert [r["url"] for r in reader.iter()] == [f"http://a.com/{i}" for i in range(5)]
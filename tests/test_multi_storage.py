@@ -0,0 +1,95 @@
+import asyncio
+import json
+import pytest
+
+from storage.base import DataStorage
+from storage.multi_storage import MultiStorage
+
+
+class MemoryStorage(DataStorage):
+    def __init__(self, delay=0.0, fail=False, wants_raw=False):
+        self.delay = delay
+        self.fail = fail
+        self.wants_raw = wants_raw
+        self.saved = []
+        self.raw = []
+        self.closed = False
+
+    async def save(self, data):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise IOError("disk full")
+        self.saved.append(data)
+
+    async def save_raw(self, exchange):
+        self.raw.append(exchange)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_fan_out_isolates_failing_backend():
+    good, bad = MemoryStorage(), MemoryStorage(fail=True)
+    multi = MultiStorage([good, bad], retries=2, retry_delay=0)
+    for i in range(5):
+        await multi.save({"url": f"http://a.com/{i}"})
+    await multi.close()
+
+    assert [d["url"] for d in good.saved] == [f"http://a.com/{i}" for i in range(5)]
+    assert good.closed and bad.closed
+    stats = multi.get_stats()
+    assert stats["MemoryStorage"]["saved"] == 5
+    assert stats["MemoryStorage#1"]["failed"] == 5
+    assert stats["MemoryStorage#1"]["retries"] == 5
+
+
+@pytest.mark.asyncio
+async def test_slow_backend_applies_backpressure_without_blocking_fast_one():
+    fast, slow = MemoryStorage(), MemoryStorage(delay=0.05)
+    multi = MultiStorage([fast, slow], queue_size=2)
+
+    for i in range(4):
+        await multi.save({"url": f"http://a.com/{i}"})
+    # save() вернулся только когда в очереди медленного хранилища появилось место
+    assert multi._backends[1].queue.qsize() <= 2
+    assert len(fast.saved) >= 3
+    await multi.close()
+    assert len(slow.saved) == 4
+
+
+@pytest.mark.asyncio
+async def test_raw_exchanges_go_only_to_raw_backends():
+    plain, warc = MemoryStorage(), MemoryStorage(wants_raw=True)
+    multi = MultiStorage([plain, warc])
+    assert multi.wants_raw
+    await multi.save_raw({"url": "http://a.com/", "body": b"x"})
+    await multi.close()
+    assert warc.raw and not plain.raw
+
+
+@pytest.mark.asyncio
+async def test_failed_child_flush_does_not_duplicate_records(tmp_path, monkeypatch):
+    from storage.json_storage import JSONStorage
+
+    path = tmp_path / "out.jsonl"
+    jsonl = JSONStorage(str(path), batch_size=2, thread_writer=True)
+    write_sync = jsonl._write_sync
+    calls = []
+
+    def flaky(items):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        write_sync(items)
+
+    monkeypatch.setattr(jsonl, "_write_sync", flaky)
+    memory = MemoryStorage()
+    multi = MultiStorage([jsonl, memory], retry_delay=0)
+    for i in range(5):
+        await multi.save({"url": f"http://a.com/{i}"})
+    await multi.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["url"] for line in lines] == [f"http://a.com/{i}" for i in range(5)]
+    assert multi.get_stats()["JSONStorage"]["retries"] == 0
@@ -0,0 +1,83 @@
+import pytest
+from datetime import datetime
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+from storage.parquet_storage import ParquetStorage
+
+
+def record(i):
+    return {
+        "url": f"http://a.com/{i}",
+        "title": f"Page {i}",
+        "text": "x" * i,
+        "links": [f"http://a.com/{i + 1}", f"http://a.com/{i + 2}"],
+        "metadata": {"description": f"d{i}"},
+        "crawled_at": datetime(2024, 1, 2, 3, 4, 5),
+        "status_code": 200,
+        "content_type": "text/html",
+        "images": [{"src": "http://a.com/i.png", "alt": "logo"}],
+        "headers": {"h1": [f"H {i}"], "h2": [], "h3": []},
+    }
+
+
+@pytest.mark.asyncio
+async def test_parquet_round_trip_with_row_groups(tmp_path):
+    path = tmp_path / "pages.parquet"
+    storage = ParquetStorage(str(path), row_group_size=4, compression="zstd")
+    for i in range(10):
+        await storage.save(record(i))
+    assert not path.exists()  # до close() виден только .part
+    await storage.close()
+
+    meta = pq.ParquetFile(path).metadata
+    assert meta.num_rows == 10
+    assert meta.num_row_groups == 3
+
+    table = pq.read_table(path, columns=["url", "status_code", "text_length"])
+    assert table.column_names == ["url", "status_code", "text_length"]
+    assert table.column("text_length").to_pylist() == list(range(10))
+
+    row = pq.read_table(path).slice(3, 1).to_pylist()[0]
+    assert row["links"] == ["http://a.com/4", "http://a.com/5"]
+    assert row["headers"]["h1"] == ["H 3"]
+    assert row["images"] == [{"src": "http://a.com/i.png", "alt": "logo"}]
+    assert dict(row["metadata"]) == {"description": "d3"}
+    assert row["crawled_at"] == datetime(2024, 1, 2, 3, 4, 5)
+
+
+@pytest.mark.asyncio
+async def test_arrow_ipc_round_trip(tmp_path):
+    path = tmp_path / "pages.arrow"
+    storage = ParquetStorage(str(path), format="arrow", row_group_size=3, compression="lz4")
+    for i in range(5):
+        await storage.save(record(i))
+    await storage.close()
+
+    with pa.ipc.open_file(str(path)) as reader:
+        assert reader.num_record_batches == 2
+        table = reader.read_all()
+    assert table.column("url").to_pylist() == [f"http://a.com/{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_failed_row_group_is_written_once_on_close(tmp_path, monkeypatch):
+    path = tmp_path / "pages.parquet"
+    storage = ParquetStorage(str(path), row_group_size=2)
+    write_sync = storage._write_sync
+    calls = []
+
+    def flaky(records):
+        calls.append(len(records))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        write_sync(records)
+
+    monkeypatch.setattr(storage, "_write_sync", flaky)
+    for i in range(3):
+        await storage.save(record(i))
+    await storage.close()
+
+    assert pq.read_table(path).column("url").to_pylist() == [f"http://a.com/{i}" for i in range(3)]
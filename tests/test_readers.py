@@ -0,0 +1,154 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from storage.csv_storage import CSVStorage
+from storage.json_storage import JSONStorage
+from storage.readers import CSVReader, JSONLReader, ManifestReader, ResultReader, SQLiteReader, open_reader
+from storage.sqlite_storage import SQLiteStorage
+from utils.io_utils import load_json
+
+
+def pages():
+    hosts = ["a.com", "blog.a.com", "b.org"]
+    return [
+        {
+            "url": f"http://{hosts[i % 3]}/p{i}",
+            "title": f"P{i}",
+            "text": "line one\nline, two",
+            "links": [f"http://a.com/p{i + 1}"],
+            "metadata": {"description": f"d{i}"},
+            "crawled_at": datetime(2024, 1, 1 + i),
+            "status_code": 404 if i % 4 == 3 else 200,
+            "content_type": "text/html",
+        }
+        for i in range(9)
+    ]
+
+
+async def fill(storage):
+    for page in pages():
+        await storage.save(page)
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_jsonl_reader_filters_and_indexed_lookup(tmp_path):
+    path = str(tmp_path / "results.json")
+    await fill(JSONStorage(path, batch_size=4))
+
+    with JSONLReader(path) as reader:
+        assert len(list(reader)) == 9
+        assert [r["url"] for r in reader.iter(domain="a.com", status=200)] == [
+            "http://a.com/p0", "http://blog.a.com/p1", "http://blog.a.com/p4", "http://a.com/p6",
+        ]
+        assert [r["url"] for r in reader.iter(since="2024-01-08")] == ["http://blog.a.com/p7", "http://b.org/p8"]
+
+        assert reader.get("http://b.org/p5")["title"] == "P5"
+        assert reader.get("http://missing/") is None
+
+    # дописанный файл индексируется с места остановки
+    storage = JSONStorage(path, batch_size=1)
+    await storage.save(dict(pages()[0], url="http://c.net/new", title="new"))
+    await storage.close()
+    with JSONLReader(path) as reader:
+        assert reader.build_index() == 1
+        assert reader.get("http://c.net/new")["title"] == "new"
+
+    assert len(load_json(path)) == 10
+
+
+def test_jsonl_domain_push_down_ignores_case_and_load_json_returns_list(tmp_path):
+    path = tmp_path / "single.json"
+    path.write_text('{"url": "http://Blog.A.COM/x", "status_code": 200}\n', encoding="utf-8")
+
+    with JSONLReader(str(path)) as reader:
+        assert [r["url"] for r in reader.iter(domain="a.com")] == ["http://Blog.A.COM/x"]
+        assert list(reader.iter(domain="b.org")) == []
+    assert load_json(str(path)) == [{"url": "http://Blog.A.COM/x", "status_code": 200}]
+
+
+def test_result_reader_is_abstract():
+    with pytest.raises(TypeError):
+        ResultReader()
+
+
+@pytest.mark.asyncio
+async def test_manifest_reader_over_gzip_segments(tmp_path):
+    await fill(JSONStorage(str(tmp_path / "results.jsonl"), compression="gzip", max_records=4))
+
+    reader = open_reader(str(tmp_path / "results.manifest.json"))
+    assert isinstance(reader, ManifestReader)
+    assert len(list(reader.iter(status=404))) == 2
+    assert reader.get("http://a.com/p6")["title"] == "P6"
+
+
+@pytest.mark.asyncio
+async def test_csv_reader_decodes_cells_and_finds_multiline_rows(tmp_path):
+    path = str(tmp_path / "results.csv")
+    await fill(CSVStorage(path, batch_size=4))
+
+    reader = CSVReader(path)
+    rows = list(reader.iter(status=404))
+    assert [r["url"] for r in rows] == ["http://a.com/p3", "http://blog.a.com/p7"]
+    assert rows[0]["links"] == ["http://a.com/p4"] and rows[0]["status_code"] == 404
+
+    row = reader.get("http://blog.a.com/p4")
+    assert row["text"] == "line one\nline, two"
+    assert row["metadata"] == {"description": "d4"}
+
+
+@pytest.mark.asyncio
+async def test_open_reader_reads_rotated_csv_files(tmp_path):
+    path = str(tmp_path / "results.csv")
+    storage = CSVStorage(path, batch_size=4)
+    await storage.save(pages()[0])
+    await storage.save(dict(pages()[1], extra="new column"))  # ротация в results-00001.csv
+    await storage.close()
+
+    reader = open_reader(path)
+    assert reader.paths == storage.files
+    assert [r["url"] for r in reader.iter()] == ["http://a.com/p0", "http://blog.a.com/p1"]
+    assert reader.get("http://blog.a.com/p1")["extra"] == "new column"
+
+
+@pytest.mark.asyncio
+async def test_time_bounds_with_timezone(tmp_path):
+    path = str(tmp_path / "results.json")
+    await fill(JSONStorage(path))
+
+    msk = timezone(timedelta(hours=3))
+    with JSONLReader(path) as reader:
+        # 2024-01-08 03:00 MSK — это 2024-01-08 00:00 UTC
+        urls = [r["url"] for r in reader.iter(since=datetime(2024, 1, 8, 3, tzinfo=msk))]
+        assert urls == ["http://blog.a.com/p7", "http://b.org/p8"]
+        assert len(list(reader.iter(until="2024-01-02T00:00:00+00:00"))) == 1
+
+@pytest.mark.asyncio
+async def test_sqlite_reader_pushes_filters_into_sql(tmp_path):
+    path = str(tmp_path / "results.db")
+    storage = SQLiteStorage(path, batch_size=4)
+    await storage.init_db()
+    await fill(storage)
+
+    with SQLiteReader(path) as reader:
+        urls = sorted(r["url"] for r in reader.iter(domain="blog.a.com", until=datetime(2024, 1, 6)))
+        assert urls == ["http://blog.a.com/p1", "http://blog.a.com/p4"]
+        assert reader.get("http://a.com/p0")["links"] == ["http://a.com/p1"]
+
+
+@pytest.mark.asyncio
+async def test_parquet_reader_filters_and_columns(tmp_path):
+    pytest.importorskip("pyarrow")
+    from storage.parquet_storage import ParquetStorage
+
+    path = str(tmp_path / "results.parquet")
+    await fill(ParquetStorage(path, row_group_size=4))
+
+    reader = open_reader(path)
+    rows = list(reader.iter(domain="b.org", status=200, columns=["status_code"]))
+    assert rows == [
+        {"status_code": 200, "url": "http://b.org/p2"},
+        {"status_code": 200, "url": "http://b.org/p5"},
+        {"status_code": 200, "url": "http://b.org/p8"},
+    ]
+    assert reader.get("http://a.com/p3")["status_code"] == 404
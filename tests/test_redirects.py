@@ -0,0 +1,126 @@
+import pytest
+from aiohttp import web
+from collections import Counter
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.redirects import RedirectCache
+
+
+def test_redirect_cache_resolves_chains():
+    cache = RedirectCache()
+    cache.record(["http://Example.com/a", "https://example.com/a"], "https://example.com/a/")
+    assert cache.resolve("http://example.com:80/a#top") == "https://example.com/a/"
+    assert cache.resolve("https://example.com/other") == "https://example.com/other"
+
+    cache.record(["https://example.com/loop"], "https://example.com/loop2")
+    cache.record(["https://example.com/loop2"], "https://example.com/loop")
+    assert cache.resolve("https://example.com/loop") in ("https://example.com/loop", "https://example.com/loop2")
+
+
+@pytest.mark.asyncio
+async def test_crawl_dedups_by_final_url(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    hits = Counter()
+    app = web.Application()
+
+    async def index(request):
+        hits["/"] += 1
+        return web.Response(text='<html><a href="/old">o</a></html>', content_type="text/html")
+
+    async def old(request):
+        hits["/old"] += 1
+        raise web.HTTPMovedPermanently("/new")
+
+    async def new(request):
+        hits["/new"] += 1
+        return web.Response(text='<html><title>New</title><a href="/x">x</a></html>', content_type="text/html")
+
+    async def x(request):
+        hits["/x"] += 1
+        return web.Response(text='<html><a href="/old">again</a><a href="/new">direct</a></html>', content_type="text/html")
+
+    for path, handler in (("/", index), ("/old", old), ("/new", new), ("/x", x)):
+        app.router.add_get(path, handler)
+    base = await serve(app)
+
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, max_concurrent=1) as crawler:
+        await crawler.crawl([base + "/"], max_pages=10, progress_interval=0.1)
+
+    assert hits["/new"] == 1 and hits["/old"] == 1
+    assert base + "/new" in crawler.processed_urls
+    assert base + "/old" not in crawler.processed_urls
+    assert crawler.processed_urls[base + "/new"]["url"] == base + "/new"
+    assert base + "/old" in crawler.redirects
+    assert crawler.stats.counters["redirects_rewritten"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_redirect_target_is_filtered_like_links(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    hits = Counter()
+
+    async def page(request):
+        hits[request.path] += 1
+        return web.Response(text=f'<html><a href="{base}/leak">l</a></html>', content_type="text/html")
+
+    other = web.Application()
+    other.router.add_get("/{tail:.*}", page)
+    other_base = await serve(other)
+
+    async def robots(request):
+        return web.Response(text="User-agent: *\nDisallow: /private\n")
+
+    async def index(request):
+        return web.Response(
+            text='<html><a href="/away">a</a><a href="/hidden">h</a></html>',
+            content_type="text/html",
+        )
+
+    async def away(request):
+        raise web.HTTPFound(other_base + "/landing")
+
+    async def hidden(request):
+        raise web.HTTPFound("/private/page")
+
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots)
+    app.router.add_get("/", index)
+    app.router.add_get("/away", away)
+    app.router.add_get("/hidden", hidden)
+    app.router.add_get("/private/page", page)
+    app.router.add_get("/leak", page)
+    base = await serve(app)
+
+    async with AsyncCrawler(
+        respect_robots=True, requests_per_second=100, max_concurrent=1,
+        allowed_domains=[base.split("//", 1)[1]],
+    ) as crawler:
+        # стартовый URL без пути: страница хранится под каноническим base + "/"
+        await crawler.crawl([base], max_pages=10, progress_interval=0.1)
+
+    assert set(crawler.processed_urls) == {base + "/"}
+    assert hits["/private/page"] == 1 and hits["/landing"] == 1  # запрошены, но не сохранены
+    assert hits["/leak"] == 0  # ссылки отфильтрованных страниц в очередь не попали
+    assert crawler.stats.counters["redirects_blocked"] == 2
+    assert base + "/private/page" in crawler.blocked_urls_by_robots
+
+
+@pytest.mark.asyncio
+async def test_two_spellings_of_one_page_are_fetched_once(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    hits = Counter()
+
+    async def index(request):
+        hits[request.path] += 1
+        return web.Response(text="<html><title>Index</title></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", index)
+    base = await serve(app)
+
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, max_concurrent=2) as crawler:
+        # оба написания берут воркеры одновременно: канонический адрес занят до загрузки
+        await crawler.crawl([base, base + "/"], max_pages=10, progress_interval=0.1)
+
+    assert hits["/"] == 1
+    assert set(crawler.processed_urls) == {base + "/"}
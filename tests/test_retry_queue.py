@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.retry_queue import RetryQueue, RetryBudget
+
+
+@pytest.mark.asyncio
+async def test_retry_queue_releases_in_due_order():
+    rq = RetryQueue()
+    released = []
+
+    async def release(url, depth, attempts):
+        released.append((url, attempts))
+
+    rq.schedule("late", 0, {"n": 2}, 0.05)
+    rq.schedule("early", 0, {"n": 1}, 0.0)
+    task = asyncio.create_task(rq.run(release))
+    await asyncio.wait_for(rq.join(), timeout=1)
+    task.cancel()
+
+    assert released == [("early", {"n": 1}), ("late", {"n": 2})]
+    assert rq.drained
+
+
+def test_retry_budget_limits_retries():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    for _ in range(4):
+        budget.record_request()
+
+    granted = [budget.try_acquire() for _ in range(5)]
+    assert granted == [True, True, True, False, False]
+    assert budget.get_stats()["rejected"] == 2
+
+
+@pytest.mark.asyncio
+async def test_crawl_reschedules_transient_failure(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    calls = {"flaky": 0}
+
+    async def flaky(request):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            return web.Response(text="busy", status=503)
+        return web.Response(text="<html><title>ok</title></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/flaky", flaky)
+    base = await serve(app)
+
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, max_depth=0) as crawler:
+        results = await crawler.crawl([f"{base}/flaky"], max_pages=1, progress_interval=0.1)
+
+    assert calls["flaky"] == 2
+    assert [r["url"] for r in results] == [f"{base}/flaky"]
+    assert crawler.stats.counters["retries_scheduled"] == 1
+    assert crawler.stats.errors["TransientError"] == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_budget_drops_retries(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+
+    async def down(request):
+        return web.Response(text="busy", status=503)
+
+    app = web.Application()
+    app.router.add_get("/down", down)
+    base = await serve(app)
+
+    async with AsyncCrawler(
+        respect_robots=False,
+        requests_per_second=100,
+        retry_budget_ratio=0.0,
+        min_retry_budget=0,
+    ) as crawler:
+        results = await crawler.crawl([f"{base}/down"], max_pages=1, progress_interval=0.1)
+
+    assert results == []
+    assert crawler.stats.counters["retries_dropped_budget"] == 1
+    assert f"{base}/down" in crawler.failed_urls
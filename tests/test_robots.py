@@ -0,0 +1,166 @@
+import asyncio
+import aiohttp
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.errors import RobotsUnavailable
+from crawler.robots_parser import RobotsParser
+from crawler.robots_rules import parse_robots, url_path, ALLOW_ALL
+
+ROBOTS = "User-agent: *\nDisallow: /private\nCrawl-delay: 2\n"
+
+
+def make_app(routes: dict) -> tuple[web.Application, dict]:
+    hits = {path: 0 for path in routes}
+
+    def make_handler(path, status, body):
+        async def handler(request):
+            hits[path] += 1
+            await asyncio.sleep(0.05)  # чтобы параллельные запросы пересеклись
+            return web.Response(text=body, status=status)
+        return handler
+
+    app = web.Application()
+    for path, (status, body) in routes.items():
+        app.router.add_get(path, make_handler(path, status, body))
+
+    return app, hits
+
+
+@pytest.mark.asyncio
+async def test_single_flight_and_rules(serve):
+    app, hits = make_app({"/robots.txt": (200, ROBOTS)})
+    base = await serve(app)
+    async with aiohttp.ClientSession() as session:
+        robots = RobotsParser(session=session)
+        results = await asyncio.gather(
+            *(robots.can_fetch(f"{base}/private/{i}", "TestBot") for i in range(10))
+        )
+        assert results == [False] * 10
+        assert await robots.can_fetch(f"{base}/public", "TestBot")
+        assert await robots.get_crawl_delay(f"{base}/public", "TestBot") == 2
+
+    assert hits["/robots.txt"] == 1
+    assert robots.stats["fetches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_4xx_allows_and_5xx_is_unavailable_for_short_ttl(serve):
+    app_404, _ = make_app({"/other": (200, "")})
+    app_503, hits_503 = make_app({"/robots.txt": (503, "down")})
+    base_404 = await serve(app_404)
+    base_503 = await serve(app_503)
+    async with aiohttp.ClientSession() as session:
+        robots = RobotsParser(session=session, error_ttl=0.1)
+        assert await robots.can_fetch(f"{base_404}/page", "TestBot")
+        # 5xx — не запрет, а «правила неизвестны, повторить позже»
+        for _ in range(2):
+            with pytest.raises(RobotsUnavailable) as exc_info:
+                await robots.can_fetch(f"{base_503}/page", "TestBot")
+            assert 0 < exc_info.value.retry_after <= 0.1
+        assert hits_503["/robots.txt"] == 1
+
+        await asyncio.sleep(0.15)  # негативная запись истекла → повторная загрузка
+        with pytest.raises(RobotsUnavailable):
+            await robots.can_fetch(f"{base_503}/page", "TestBot")
+        assert hits_503["/robots.txt"] == 2
+
+
+@pytest.mark.asyncio
+async def test_crawler_defers_urls_while_robots_is_unavailable(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    hits = {"/robots.txt": 0, "/": 0}
+
+    async def robots_txt(request):
+        hits["/robots.txt"] += 1
+        if hits["/robots.txt"] == 1:
+            return web.Response(status=503, text="down")
+        return web.Response(text="User-agent: *\nDisallow: /private\n")
+
+    async def index(request):
+        hits["/"] += 1
+        return web.Response(text="<html><title>Index</title></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots_txt)
+    app.router.add_get("/", index)
+    base = await serve(app)
+
+    async with AsyncCrawler(requests_per_second=100) as crawler:
+        crawler.robots_parser.error_ttl = 0.2
+        await crawler.crawl([base + "/"], max_pages=5, progress_interval=0.1)
+
+    # 503 у robots.txt отложил URL, а не запретил хост
+    assert hits == {"/robots.txt": 2, "/": 1}
+    assert base + "/" in crawler.processed_urls
+    assert not crawler.blocked_urls_by_robots
+    assert crawler.stats.counters["robots_deferred"] == 1
+
+
+@pytest.mark.asyncio
+async def test_prefetch_loads_each_origin_once(serve):
+    app, hits = make_app({"/robots.txt": (200, ROBOTS)})
+    base = await serve(app)
+    async with aiohttp.ClientSession() as session:
+        robots = RobotsParser(session=session)
+        await robots.prefetch([f"{base}/a", f"{base}/b", base])
+        assert await robots.can_fetch(f"{base}/a", "TestBot")
+
+    assert hits["/robots.txt"] == 1
+    assert robots.stats["cache_hits"] == 1
+
+
+def test_compiled_rules_longest_match_and_wildcards():
+    text = """
+    User-agent: *
+    Disallow: /shop
+    Allow: /shop/public
+    Disallow: /*.pdf$
+    Allow: /docs/*.pdf$
+    Disallow: /tmp
+    Allow: /tmp
+    """
+    rules = parse_robots(text, "AsyncCrawler/1.0")
+
+    assert rules.can_fetch("http://a.com/")
+    assert not rules.can_fetch("http://a.com/shop/cart")
+    assert rules.can_fetch("http://a.com/shop/public/item")
+    assert not rules.can_fetch("http://a.com/files/report.pdf")
+    assert rules.can_fetch("http://a.com/files/report.pdf?x=1")   # $ якорит конец
+    assert rules.can_fetch("http://a.com/docs/guide.pdf")         # длиннее правило Allow
+    assert rules.can_fetch("http://a.com/tmp/x")                  # равная длина → Allow
+
+
+def test_compiled_rules_pick_agent_group():
+    text = """
+    User-agent: *
+    Disallow: /
+
+    User-agent: asynccrawler
+    Disallow: /private
+    Crawl-delay: 1.5
+
+    Sitemap: http://a.com/sitemap.xml
+    """
+    ours = parse_robots(text, "AsyncCrawler/1.0")
+    other = parse_robots(text, "OtherBot/2.0")
+
+    assert ours.allowed(url_path("http://a.com/page"))
+    assert not ours.allowed(url_path("http://a.com/private/1"))
+    assert ours.crawl_delay == 1.5
+    assert ours.sitemaps == ("http://a.com/sitemap.xml",)
+    assert not other.allowed("/page")
+    assert parse_robots("", "AsyncCrawler/1.0") is ALLOW_ALL
+
+
+@pytest.mark.asyncio
+async def test_robots_cache_is_bounded(serve):
+    app, _ = make_app({"/robots.txt": (200, ROBOTS)})
+    base = await serve(app)
+    async with aiohttp.ClientSession() as session:
+        robots = RobotsParser(session=session, max_hosts=1)
+        await robots.fetch_robots(base)
+        await robots.fetch_robots(base.replace("127.0.0.1", "localhost"))
+
+    assert len(robots._cache) == 1
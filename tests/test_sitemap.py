@@ -0,0 +1,158 @@
+import gzip
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.sitemap_parser import SitemapParser
+
+NS = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+
+
+def urlset(base, paths, priority=None):
+    items = "".join(
+        f"<url><loc>{base}{p}</loc><lastmod>2024-01-0{i + 1}</lastmod>"
+        + (f"<priority>{priority}</priority>" if priority is not None else "")
+        + "</url>"
+        for i, p in enumerate(paths)
+    )
+    return f'<?xml version="1.0"?><urlset {NS}>{items}</urlset>'
+
+
+def make_site() -> web.Application:
+    """Сайт: robots.txt → sitemap index → обычный и .gz sitemap"""
+    app = web.Application()
+
+    def origin(request) -> str:
+        return f"http://{request.host}"
+
+    async def robots(request):
+        return web.Response(text=f"User-agent: *\nDisallow: /private\nSitemap: {origin(request)}/index.xml\n")
+
+    async def index(request):
+        base = origin(request)
+        body = (
+            f'<?xml version="1.0"?><sitemapindex {NS}>'
+            f"<sitemap><loc>{base}/plain.xml</loc></sitemap>"
+            f"<sitemap><loc>{base}/packed.xml.gz</loc></sitemap>"
+            f"</sitemapindex>"
+        )
+        return web.Response(text=body, content_type="application/xml")
+
+    async def plain(request):
+        return web.Response(text=urlset(origin(request), ["/a", "/b"], priority=0.9), content_type="application/xml")
+
+    async def packed(request):
+        data = gzip.compress(urlset(origin(request), ["/c", "/private/d"]).encode())
+        return web.Response(body=data, content_type="application/x-gzip")
+
+    async def page(request):
+        return web.Response(text=f"<html><title>{request.path}</title></html>", content_type="text/html")
+
+    app.router.add_get("/robots.txt", robots)
+    app.router.add_get("/index.xml", index)
+    app.router.add_get("/plain.xml", plain)
+    app.router.add_get("/packed.xml.gz", packed)
+    app.router.add_get("/{tail:.*}", page)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_iter_urls_streams_index_and_gzip(serve):
+    base = await serve(make_site())
+    parser = SitemapParser()
+    entries = [e async for e in parser.iter_urls([f"{base}/index.xml"])]
+
+    by_loc = {e.loc: e for e in entries}
+    assert set(by_loc) == {f"{base}/a", f"{base}/b", f"{base}/c", f"{base}/private/d"}
+    assert by_loc[f"{base}/a"].priority == 0.9
+    assert by_loc[f"{base}/c"].lastmod == "2024-01-01"
+
+
+@pytest.mark.asyncio
+async def test_crawl_seeds_frontier_from_robots_sitemaps(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    base = await serve(make_site())
+    async with AsyncCrawler(
+        respect_robots=True,
+        use_sitemaps=True,
+        requests_per_second=100,
+        max_depth=0,
+    ) as crawler:
+        await crawler.crawl([f"{base}/"], max_pages=10, progress_interval=0.1)
+
+    for path in ("/", "/a", "/b", "/c"):
+        assert f"{base}{path}" in crawler.processed_urls
+    assert f"{base}/private/d" in crawler.blocked_urls_by_robots
+    assert crawler.processed_urls[f"{base}/a"]["metadata"]["sitemap_lastmod"] == "2024-01-01"
+    assert crawler.stats.counters["sitemap_urls"] == 4
+
+
+@pytest.mark.asyncio
+async def test_sitemap_stream_closed_on_early_stop(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    base = await serve(make_site())
+    events = []
+    original = SitemapParser.iter_urls
+
+    async def tracking_iter(self, sitemap_urls):
+        try:
+            async for entry in original(self, sitemap_urls):
+                yield entry
+        finally:
+            events.append("closed")
+
+    monkeypatch.setattr(SitemapParser, "iter_urls", tracking_iter)
+    async with AsyncCrawler(respect_robots=True, use_sitemaps=True, requests_per_second=100, max_depth=0) as crawler:
+        incr = crawler.stats.incr
+
+        def tracking_incr(name, value=1):
+            if name == "sitemap_urls":
+                events.append("finished")
+            incr(name, value)
+
+        crawler.stats.incr = tracking_incr
+        await crawler.crawl([f"{base}/"], max_pages=2, progress_interval=0.1)
+
+    # генератор закрыт сразу после break, а не сборщиком мусора после выхода из функции
+    assert events == ["closed", "finished"]
+
+
+@pytest.mark.asyncio
+async def test_decoder_tail_is_flushed(monkeypatch, serve):
+    from crawler import sitemap_parser
+
+    class HoldBack:
+        """Декодер, отдающий последние байты только во flush()"""
+        unconsumed_tail = b""
+
+        def __init__(self):
+            self.held = b""
+
+        def decompress(self, data, max_length=0):
+            data, self.held = self.held + data, b""
+            self.held, data = data[-20:], data[:-20]
+            return data
+
+        def flush(self):
+            return self.held
+
+    monkeypatch.setattr(sitemap_parser, "make_decoder", lambda encoding: HoldBack())
+    base = await serve(make_site())
+    locs = await SitemapParser().fetch_sitemap(f"{base}/packed.xml.gz")
+    assert sorted(locs) == [f"{base}/c", f"{base}/private/d"]
+
+
+@pytest.mark.asyncio
+async def test_gzip_bomb_is_capped(serve):
+    body = urlset("http://a.com", [f"/{i}" for i in range(5000)]).encode()
+
+    async def bomb(request):
+        return web.Response(body=gzip.compress(body), content_type="application/x-gzip")
+
+    app = web.Application()
+    app.router.add_get("/bomb.xml.gz", bomb)
+    base = await serve(app)
+
+    parser = SitemapParser(max_size=10_000, chunk_size=1024)
+    locs = await parser.fetch_sitemap(f"{base}/bomb.xml.gz")
+    assert 0 < len(locs) < 200  # разобрано только начало, в пределах лимита
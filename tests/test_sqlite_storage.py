@@ -0,0 +1,161 @@
+import pytest
+import aiosqlite
+from datetime import datetime
+
+from storage.sqlite_storage import SQLiteStorage
+
+
+def page(i):
+    return {
+        "url": f"http://a.com/{i}", "title": f"T{i}", "text": "", "links": [f"http://a.com/{i + 1}"],
+        "metadata": {"k": i}, "crawled_at": datetime.utcnow(), "status_code": 200, "content_type": "text/html",
+    }
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("writer_thread", [False, True])
+async def test_batched_write_path(tmp_path, writer_thread):
+    db_path = str(tmp_path / "pages.db")
+    storage = SQLiteStorage(db_path, batch_size=7, commit_interval=60, writer_thread=writer_thread)
+    await storage.init_db()
+    for i in range(50):
+        await storage.save(page(i))
+    await storage.close()  # close коммитит, даже если интервал не истёк
+
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute("PRAGMA journal_mode") as cursor:
+            assert (await cursor.fetchone())[0] == "wal"
+        async with db.execute("SELECT COUNT(*), MAX(links) FROM pages") as cursor:
+            count, links = await cursor.fetchone()
+    assert count == 50
+    assert links.startswith('["http://a.com/')
+
+
+@pytest.mark.asyncio
+async def test_link_graph_queries(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "graph.db"), batch_size=3, commit_interval=0, link_graph=True)
+    await storage.init_db()
+    pages = {
+        "http://a.com/": ["http://a.com/x", "http://a.com/y"],
+        "http://a.com/x": ["http://a.com/y", "http://a.com/x"],
+        "http://a.com/y": [],
+        "http://a.com/orphan": ["http://a.com/y"],
+    }
+    for url, links in pages.items():
+        await storage.save(dict(page(0), url=url, links=links))
+    # повторное сохранение заменяет исходящие рёбра
+    await storage.save(dict(page(0), url="http://a.com/", links=["http://a.com/x"]))
+    await storage.close()
+
+    storage = SQLiteStorage(str(tmp_path / "graph.db"), link_graph=True)
+    await storage.init_db()
+    assert sorted(await storage.inlinks("http://a.com/y")) == ["http://a.com/orphan", "http://a.com/x"]
+    assert await storage.in_degree("http://a.com/x") == 2  # с / и ссылка на себя
+    assert await storage.outlinks("http://a.com/") == ["http://a.com/x"]
+    assert (await storage.top_in_degree(1))[0][1] == 2
+    assert sorted(await storage.orphans()) == ["http://a.com/", "http://a.com/orphan"]
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_full_text_search(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "fts.db"), batch_size=2, commit_interval=0, fts=True)
+    await storage.init_db()
+    docs = [
+        ("http://a.com/1", "Асинхронный краулер", "обход сайтов на asyncio", "краулер"),
+        ("http://a.com/2", "Рецепты", "как приготовить борщ", "кухня"),
+        ("http://a.com/3", "Заметки", "в тексте упоминается краулер один раз", ""),
+    ]
+    for url, title, text, description in docs:
+        await storage.save(dict(page(0), url=url, title=title, text=text, metadata={"description": description}))
+    # перезапись страницы обновляет индекс, а не дублирует его
+    await storage.save(dict(page(0), url="http://a.com/2", title="Рецепты", text="борщ без свёклы", metadata={}))
+
+    results = await storage.search("краулер")
+    assert [r["url"] for r in results] == ["http://a.com/1", "http://a.com/3"]
+    assert "[" in results[1]["snippet"]
+
+    assert [r["url"] for r in await storage.search("борщ")] == ["http://a.com/2"]
+    assert await storage.search("приготовить") == []
+    assert await storage.search('"unbalanced') == []
+    await storage.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("writer_thread", [False, True])
+async def test_writer_thread_flush_barrier_and_errors(tmp_path, writer_thread):
+    db_path = str(tmp_path / "pages.db")
+    storage = SQLiteStorage(db_path, batch_size=2, commit_interval=60, writer_thread=writer_thread)
+    await storage.init_db()
+    await storage.save(page(0))
+    await storage.save(page(1))
+    await storage.save(page(2))
+    await storage.save({"title": "без url"})  # пачка [2, bad] падает и откатывается целиком
+
+    with pytest.raises(KeyError):
+        await storage.flush()
+    assert [r.get("url") for r in storage.failed_records] == ["http://a.com/2", None]
+
+    # ошибка поднимается один раз; flush дождался commit — строки видны другому соединению
+    await storage.save(page(3))
+    await storage.flush()
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute("SELECT url FROM pages ORDER BY url") as cursor:
+            urls = [row[0] for row in await cursor.fetchall()]
+    assert urls == ["http://a.com/0", "http://a.com/1", "http://a.com/3"]
+    await storage.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("writer_thread", [False, True])
+async def test_duplicate_url_in_one_batch(tmp_path, writer_thread):
+    db_path = str(tmp_path / "dup.db")
+    storage = SQLiteStorage(db_path, batch_size=10, fts=True, link_graph=True, writer_thread=writer_thread)
+    await storage.init_db()
+    await storage.save(dict(page(0), text="старый текст"))
+    await storage.save(page(1))
+    await storage.save(dict(page(0), text="новый текст"))
+    await storage.flush()
+
+    assert [r["url"] for r in await storage.search("новый")] == ["http://a.com/0"]
+    assert await storage.search("старый") == []
+    await storage.close()
+
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute("SELECT COUNT(*) FROM pages") as cursor:
+            assert (await cursor.fetchone())[0] == 2
+        async with db.execute("SELECT COUNT(*) FROM pages_fts") as cursor:
+            assert (await cursor.fetchone())[0] == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("writer_thread", [False, True])
+async def test_close_releases_resources_when_flush_fails(tmp_path, writer_thread):
+    storage = SQLiteStorage(str(tmp_path / "pages.db"), batch_size=10, writer_thread=writer_thread)
+    await storage.init_db()
+    writer = storage._writer
+    await storage.save({"title": "без url"})
+
+    with pytest.raises(KeyError):
+        await storage.close()
+    assert storage._writer is None and storage._conn is None
+    if writer:
+        assert not writer.is_alive()
+
+
+@pytest.mark.asyncio
+async def test_save_does_not_raise_writer_errors(tmp_path):
+    db_path = str(tmp_path / "pages.db")
+    storage = SQLiteStorage(db_path, batch_size=1, commit_interval=60, writer_thread=True)
+    await storage.init_db()
+    await storage.save({"title": "без url"})
+    await storage.save(page(0))  # ошибка прошлой пачки не мешает принять запись
+    await storage.save(page(0))
+
+    with pytest.raises(KeyError):
+        await storage.flush()
+    await storage.close()
+
+    async with aiosqlite.connect(db_path) as db:
+        async with db.execute("SELECT url FROM pages") as cursor:
+            assert [row[0] for row in await cursor.fetchall()] == ["http://a.com/0"]
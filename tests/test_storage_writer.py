@@ -0,0 +1,91 @@
+import asyncio
+import json
+import pytest
+
+from crawler.storage_writer import StorageWriter
+from storage.base import DataStorage
+
+
+class SlowStorage(DataStorage):
+    def __init__(self, delay=0.0, fail_first=0):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.saved = []
+        self.flushes = 0
+
+    async def save(self, data):
+        await asyncio.sleep(self.delay)
+        if self.fail_first:
+            self.fail_first -= 1
+            raise IOError("locked")
+        self.saved.append(data["url"])
+
+    async def flush(self):
+        self.flushes += 1
+
+    async def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_submit_does_not_wait_for_storage_and_close_drains():
+    storage = SlowStorage(delay=0.01)
+    writer = StorageWriter(storage, queue_size=100, batch_size=10)
+    writer.start()
+
+    loop = asyncio.get_running_loop()
+    t0 = loop.time()
+    for i in range(20):
+        await writer.submit({"url": f"http://a.com/{i}"})
+    assert loop.time() - t0 < 0.05  # воркер не ждал 20 × 10 мс
+    assert writer.depth > 0
+
+    await writer.close()
+    assert storage.saved == [f"http://a.com/{i}" for i in range(20)]
+    assert writer.depth == 0
+    assert storage.flushes >= 2
+    assert writer.stats["written"] == 20 and writer.stats["queue_max"] >= 10
+
+
+@pytest.mark.asyncio
+async def test_retries_in_writer_and_time_triggered_flush():
+    storage = SlowStorage(fail_first=2)
+    writer = StorageWriter(storage, batch_size=100, flush_interval=0.05, retry_delay=0)
+    writer.start()
+
+    await writer.submit({"url": "http://a.com/"})
+    await asyncio.sleep(0.15)
+    assert storage.saved == ["http://a.com/"]
+    assert storage.flushes == 1  # пачка не набралась — сработал таймер
+    assert writer.stats["retries"] == 2
+
+    await writer.close()
+    assert not writer.running
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_does_not_duplicate_records(tmp_path, monkeypatch):
+    from storage.json_storage import JSONStorage
+
+    path = tmp_path / "out.jsonl"
+    storage = JSONStorage(str(path), batch_size=2, thread_writer=True)
+    write_sync = storage._write_sync
+    calls = []
+
+    def flaky(items):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise OSError("disk full")
+        write_sync(items)
+
+    monkeypatch.setattr(storage, "_write_sync", flaky)
+    writer = StorageWriter(storage, batch_size=100, flush_interval=60, retry_delay=0)
+    writer.start()
+    for i in range(5):
+        await writer.submit({"url": f"http://a.com/{i}"})
+    await writer.close()
+    await storage.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["url"] for line in lines] == [f"http://a.com/{i}" for i in range(5)]
+    assert writer.stats["retries"] == 0 and writer.stats["written"] == 5
@@ -0,0 +1,76 @@
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from crawler.transport import RecordTransport, ReplayTransport
+
+
+def make_app() -> web.Application:
+    app = web.Application()
+
+    async def index(request):
+        return web.Response(text='<html><title>Index</title><a href="/a">a</a><a href="/old">o</a></html>', content_type="text/html")
+
+    async def a(request):
+        return web.Response(text="<html><title>A</title></html>", content_type="text/html")
+
+    async def old(request):
+        raise web.HTTPFound("/a")
+
+    app.router.add_get("/", index)
+    app.router.add_get("/a", a)
+    app.router.add_get("/old", old)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_record_then_replay_offline(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    archive = str(tmp_path / "crawl.rec")
+
+    base = await serve(make_app())
+    recorder = RecordTransport(archive)
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, max_concurrent=1, transport=recorder) as live:
+        await live.crawl([base + "/"], max_pages=10, progress_interval=0.1)
+    await serve.stop(base)  # дальше сети нет
+
+    replay = ReplayTransport(archive)
+    assert len(replay) == recorder.recorded
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, max_concurrent=1, transport=replay) as offline:
+        await offline.crawl([base + "/"], max_pages=10, progress_interval=0.1)
+
+    assert set(offline.processed_urls) == set(live.processed_urls)
+    assert {u: p["title"] for u, p in offline.processed_urls.items()} == {u: p["title"] for u, p in live.processed_urls.items()}
+    assert replay.stats["misses"] == 0
+
+    # URL вне архива — 404 без сети
+    async with AsyncCrawler(respect_robots=False, transport=ReplayTransport(archive, latency=0.01)) as crawler:
+        assert await crawler.fetch(base + "/missing") is None
+
+
+@pytest.mark.asyncio
+async def test_replay_serves_robots_from_archive(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    archive = str(tmp_path / "crawl.rec")
+    app = make_app()
+
+    async def robots(request):
+        return web.Response(text="User-agent: *\nDisallow: /old\n")
+
+    app.router.add_get("/robots.txt", robots)
+    base = await serve(app)
+    recorder = RecordTransport(archive)
+    async with AsyncCrawler(requests_per_second=100, max_concurrent=1, use_sitemaps=True, transport=recorder) as live:
+        await live.crawl([base + "/"], max_pages=10, progress_interval=0.1)
+    await serve.stop(base)
+
+    # robots.txt и sitemap тоже из архива: иначе офлайн-запрос robots.txt упал бы и заблокировал весь обход
+    replay = ReplayTransport(archive)
+    async with AsyncCrawler(requests_per_second=100, max_concurrent=1, use_sitemaps=True, transport=replay) as offline:
+        await offline.crawl([base + "/"], max_pages=10, progress_interval=0.1)
+
+    assert set(live.processed_urls) == {base + "/", base + "/a"}
+    assert set(offline.processed_urls) == set(live.processed_urls)
+    assert offline.blocked_urls_by_robots == {base + "/old"}
+    assert replay.stats["misses"] == 0
+    assert recorder.recorded == len(replay) == 4  # /, /a, robots.txt, sitemap.xml
@@ -0,0 +1,110 @@
+import gzip
+import pytest
+from aiohttp import web
+
+from crawler.async_crawler import AsyncCrawler
+from storage.warc_storage import WARCStorage, read_warc_record
+
+PAGE = "<html><title>Архив</title><body>" + "<p>данные</p>" * 200 + "</body></html>"
+
+
+@pytest.mark.asyncio
+async def test_warc_records_raw_exchange_with_cdx(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    app = web.Application()
+
+    async def page(request):
+        # тело сжато на сервере — в WARC должно попасть как есть
+        return web.Response(
+            body=gzip.compress(PAGE.encode()),
+            headers={"Content-Type": "text/html; charset=utf-8", "Content-Encoding": "gzip"},
+        )
+
+    app.router.add_get("/{name}", page)
+    base = await serve(app)
+
+    storage = WARCStorage(str(tmp_path / "warc"), max_file_size=1)  # ротация на каждой записи
+    async with AsyncCrawler(respect_robots=False, requests_per_second=100, storage=storage) as crawler:
+        await crawler.crawl([f"{base}/a", f"{base}/b"], max_pages=2, progress_interval=0.1)
+
+    assert len(storage.files) == 2
+    lines = []
+    for path in storage.files:
+        with open(path + ".cdx", encoding="utf-8") as f:
+            header, *rows = f.read().splitlines()
+        assert header.startswith(" CDX")
+        lines += [(path, row.split()) for row in rows]
+    assert sorted(fields[0] for _, fields in lines) == [f"{base}/a", f"{base}/b"]
+
+    for path, fields in lines:
+        length, offset = int(fields[8]), int(fields[9])
+        headers, block = read_warc_record(path, offset, length)
+        assert headers["WARC-Type"] == "response"
+        assert headers["WARC-Target-URI"] == fields[0]
+        http_head, _, body = block.partition(b"\r\n\r\n")
+        assert http_head.startswith(b"HTTP/1.1 200 OK")
+        assert b"Content-Encoding: gzip" in http_head
+        assert gzip.decompress(body).decode() == PAGE
+
+
+@pytest.mark.asyncio
+async def test_rejected_redirect_target_is_not_archived(tmp_path, monkeypatch, serve):
+    monkeypatch.chdir(tmp_path)
+    async def landing(request):
+        return web.Response(text=PAGE, content_type="text/html")
+
+    other = web.Application()
+    other.router.add_get("/landing", landing)
+    other_base = await serve(other)
+
+    async def index(request):
+        return web.Response(text='<html><a href="/away">a</a></html>', content_type="text/html")
+
+    async def away(request):
+        raise web.HTTPFound(other_base + "/landing")
+
+    app = web.Application()
+    app.router.add_get("/", index)
+    app.router.add_get("/away", away)
+    base = await serve(app)
+
+    storage = WARCStorage(str(tmp_path / "warc"))
+    async with AsyncCrawler(
+        respect_robots=False, requests_per_second=100, storage=storage,
+        allowed_domains=[base.split("//", 1)[1]],
+    ) as crawler:
+        await crawler.crawl([base + "/"], max_pages=5, progress_interval=0.1)
+
+    # редирект за пределы allowed_domains отброшен — его обмена в WARC нет
+    assert crawler.stats.counters["redirects_blocked"] == 1
+    with open(storage.files[0] + ".cdx", encoding="utf-8") as f:
+        _, *rows = f.read().splitlines()
+    assert [row.split()[0] for row in rows] == [base + "/"]
+
+
+@pytest.mark.asyncio
+async def test_runs_in_the_same_second_do_not_overwrite_each_other(tmp_path, monkeypatch):
+    import storage.warc_storage as warc_storage
+    from datetime import datetime, timezone
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+    monkeypatch.setattr(warc_storage, "datetime", FrozenDatetime)
+    exchange = {
+        "url": "http://a.com/", "status": 200, "request_headers": [], "response_headers": [],
+        "body": b"<html></html>", "truncated": False, "fetched_at": FrozenDatetime.now(),
+    }
+    runs = []
+    for _ in range(2):
+        storage = WARCStorage(str(tmp_path / "warc"))
+        await storage.save_raw(exchange)
+        await storage.close()
+        runs.append(storage.files)
+
+    assert runs[0] != runs[1]
+    for files in runs:
+        with open(files[0] + ".cdx", encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == 2